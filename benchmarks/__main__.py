@@ -0,0 +1,43 @@
+"""python -m benchmarks [-o baseline.json] [--compare baseline.json]"""
+import argparse
+import sys
+
+from .suite import compare, format_results, load, run_all, save
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("-o", "--output", help="save results as a JSON baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a saved baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="relative change reported as regression"
+    )
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--min-iterations", type=int, default=50)
+    parser.add_argument(
+        "--startup",
+        type=int,
+        default=0,
+        metavar="N",
+        help="also measure import and cold start of an app with N handlers",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_all(args.min_time, args.min_iterations, args.startup)
+    baseline = load(args.compare) if args.compare else None
+    print(format_results(results, baseline))
+    if args.output:
+        save(results, args.output)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r.metric}: {r.baseline} -> {r.current} ({r.change:+.1%})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
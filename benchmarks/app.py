@@ -0,0 +1,167 @@
+"""基准测试用的应用：demo 中的 Handler 加上字段很多、嵌套很深的合成 Handler"""
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from cibo import (
+    BaseApiBody,
+    BaseApiQuery,
+    BaseApiSuccessResp,
+    Blueprint,
+    Flask,
+    Handler,
+    SimpleContext,
+)
+
+bench = Blueprint("bench", __name__, openapi_tag="bench")
+
+CORS_CONFIG = {"Access-Control-Allow-Origin": ["https://app.example.com", "https://*.example.org"]}
+
+
+class Address(BaseModel):
+    country: str
+    city: str
+    street: str
+    zipcode: Optional[str] = None
+
+
+class Item(BaseModel):
+    id: int
+    name: str = Field(max_length=64)
+    price: float
+    tags: List[str] = []
+    attrs: Dict[str, int] = {}
+
+
+class Order(BaseModel):
+    id: int
+    items: List[Item]
+    shipping: Address
+    note: Optional[str] = None
+
+
+class Customer(BaseModel):
+    id: int
+    name: str
+    emails: List[str] = []
+    addresses: List[Address] = []
+
+
+@bench.get("/large")
+class LargeQueryHandler(Handler):
+    cors_config = CORS_CONFIG
+
+    class Query(BaseApiQuery):
+        q: str
+        page: int = 1
+        size: int = 20
+        sort: Optional[str] = None
+        ids: Optional[List[int]] = None
+        tags: Optional[List[str]] = None
+        price_min: Optional[float] = None
+        price_max: Optional[float] = None
+        filters: Optional[Dict[str, str]] = None
+        weights: Optional[Dict[str, int]] = None
+        f0: Optional[str] = None
+        f1: Optional[str] = None
+        f2: Optional[int] = None
+        f3: Optional[int] = None
+        f4: Optional[bool] = None
+
+    class Resp(BaseApiSuccessResp):
+        total: int
+        ids: List[int]
+
+    def handle(self, context: SimpleContext, query: Query):
+        """large query"""
+        return context.success(total=len(query.ids or []), ids=query.ids or [])
+
+
+@bench.post("/large")
+class LargeBodyHandler(Handler):
+    class Body(BaseApiBody):
+        customer: Customer
+        orders: List[Order]
+        meta: Dict[str, Any] = {}
+
+    class Resp(BaseApiSuccessResp):
+        customer: Customer
+        orders: List[Order]
+
+    def handle(self, context: SimpleContext, body: Body):
+        """large nested body"""
+        return context.success(customer=body.customer, orders=body.orders)
+
+
+@bench.post("/large-fast")
+class FastLargeBodyHandler(Handler):
+    fast_resp = True
+
+    class Body(LargeBodyHandler.Body):
+        ...
+
+    class Resp(LargeBodyHandler.Resp):
+        ...
+
+    def handle(self, context: SimpleContext, body: Body):
+        """large nested body with a compiled response plan"""
+        return context.success(customer=body.customer, orders=body.orders)
+
+
+@bench.post("/form")
+class FormHandler(Handler):
+    class Body(BaseApiBody):
+        name: str
+        age: int
+        ids: List[int]
+        tags: List[str]
+        attrs: Dict[str, int]
+
+    def handle(self, context: SimpleContext, body: Body):
+        """form body"""
+        return context.success(name=body.name)
+
+
+def make_address(i: int) -> Dict[str, Any]:
+    return {"country": "CN", "city": f"city-{i}", "street": f"street {i}", "zipcode": "100000"}
+
+
+def make_orders(n_orders: int, n_items: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i,
+            "items": [
+                {
+                    "id": j,
+                    "name": f"item-{j}",
+                    "price": j * 1.5,
+                    "tags": ["a", "b", "c"],
+                    "attrs": {"w": j, "h": j * 2},
+                }
+                for j in range(n_items)
+            ],
+            "shipping": make_address(i),
+        }
+        for i in range(n_orders)
+    ]
+
+
+def make_large_body(n_orders: int = 10, n_items: int = 10) -> Dict[str, Any]:
+    return {
+        "customer": {
+            "id": 1,
+            "name": "customer",
+            "emails": ["a@example.com", "b@example.com"],
+            "addresses": [make_address(i) for i in range(3)],
+        },
+        "orders": make_orders(n_orders, n_items),
+        "meta": {"source": "bench"},
+    }
+
+
+def create_app() -> Flask:
+    from demo import create_app as create_demo_app
+
+    app = create_demo_app()
+    app.register_blueprint(bench, url_prefix="/bench")
+    return app
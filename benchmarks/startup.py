@@ -0,0 +1,123 @@
+"""冷启动基准：在新的子进程中测量 `import cibo` 和注册大量 Handler 的 app 的启动耗时"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from cibo import (
+    BaseApiBody,
+    BaseApiPath,
+    BaseApiQuery,
+    BaseApiSuccessResp,
+    Blueprint,
+    Flask,
+    Handler,
+    SimpleContext,
+)
+
+STAGES = ("import", "define_handlers", "create_app", "first_request", "first_spec")
+
+
+class Item(BaseModel):
+    id: int
+    name: str = Field(max_length=32)
+    tags: List[str] = []
+
+
+def make_handler(i: int) -> type:
+    class Path(BaseApiPath):
+        id: int
+
+    class Query(BaseApiQuery):
+        q: str = ""
+        page: int = Field(1, gt=0)
+        tags: Optional[List[str]] = None
+
+    class Body(BaseApiBody):
+        name: str = Field(max_length=32)
+        items: List[Item] = []
+
+    class Resp(BaseApiSuccessResp):
+        id: int
+        name: str
+
+    def handle(self, context: SimpleContext, path: Path, query: Query, body: Body):
+        return context.success(id=path.id, name=body.name)
+
+    handle.__doc__ = f"handler {i}"
+    namespace = {"Path": Path, "Query": Query, "Body": Body, "Resp": Resp, "handle": handle}
+    namespace["__module__"] = __name__
+    return type(f"Handler{i}", (Handler,), namespace)
+
+
+def make_blueprint(n: int) -> Blueprint:
+    bp = Blueprint("startup", __name__)
+    for i in range(n):
+        bp.post(f"/r{i}/<int:id>")(make_handler(i))
+    return bp
+
+
+def _measure(n: int, enable_doc: bool) -> Dict[str, float]:
+    """在子进程中执行，stage 依次为 import、定义并注册 Handler、创建 app、第一个请求、第一次生成 spec"""
+    # 本模块顶层已经 import cibo，import 的耗时由子进程在导入本模块前测量
+    times = {"import": _import_time}
+    start = time.perf_counter()
+    bp = make_blueprint(n)
+    times["define_handlers"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app = Flask(__name__, title="startup", version="0.1.0", enable_doc=enable_doc)
+    app.register_blueprint(bp)
+    times["create_app"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    resp = app.test_client().post(f"/r{n - 1}/1", json={"name": "a"})
+    assert resp.json["success"], resp.json
+    times["first_request"] = time.perf_counter() - start
+
+    if enable_doc:
+        start = time.perf_counter()
+        app.build_spec()
+        times["first_spec"] = time.perf_counter() - start
+    return {k: round(v * 1000, 2) for k, v in times.items()}
+
+
+def run_startup(n: int = 1000, repeat: int = 3, enable_doc: bool = True) -> Dict[str, float]:
+    """各 stage 的毫秒数，取 repeat 次子进程的中位数"""
+    code = "; ".join(
+        [
+            "import time",
+            "_t = time.perf_counter()",
+            "import cibo",
+            "_t = time.perf_counter() - _t",
+            "import benchmarks.startup as s",
+            "s._import_time = _t",
+            "import json",
+            f"print(json.dumps(s._measure({n}, {enable_doc})))",
+        ]
+    )
+    runs = []  # type: List[Dict[str, float]]
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE
+        ).stdout
+        runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+    return {stage: statistics.median(run[stage] for run in runs) for stage in runs[0]}
+
+
+_import_time = 0.0
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__)
+    parser.add_argument("-n", "--handlers", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-doc", action="store_true", help="Flask(enable_doc=False)")
+    args = parser.parse_args()
+    for stage, ms in run_startup(args.handlers, args.repeat, not args.no_doc).items():
+        print(f"{stage:<20} {ms:>10.2f} ms")
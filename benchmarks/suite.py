@@ -0,0 +1,354 @@
+"""cibo 请求管道的基准测试
+
+- pipeline: 通过 Flask test client 和直接调用 `app.wsgi_app` 两种方式测量 req/s
+- phases: 单独测量各阶段每次操作的微秒数
+"""
+import json
+import platform
+import sys
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import g
+from werkzeug.datastructures import MultiDict
+from werkzeug.test import EnvironBuilder
+from werkzeug.urls import url_decode
+
+import cibo
+from cibo.cors import CorsPolicy
+from cibo.decorators import inject_context_decorator
+
+from .app import (
+    CORS_CONFIG,
+    FastLargeBodyHandler,
+    FormHandler,
+    LargeBodyHandler,
+    LargeQueryHandler,
+    create_app,
+    make_large_body,
+)
+
+
+class Case(NamedTuple):
+    name: str
+    method: str
+    path: str
+    query_string: str = ""
+    headers: Dict[str, str] = {}
+    json: Any = None
+    data: Any = None
+
+
+LARGE_QUERY = "&".join(
+    [
+        "q=shoes&page=2&size=50&sort=price&ids=1&ids=2&ids=3&ids=4&ids=5&tags=[a,b,c]",
+        'price_min=1.5&price_max=99.9&filters[color]=red&filters[size]=42&weights={"a":1,"b":2}',
+        "f0=x&f1=y&f2=1&f3=2&f4=true",
+    ]
+)
+FORM_DATA = {
+    "name": "bench",
+    "age": "18",
+    "ids": "[1,2,3,4,5]",
+    "tags": '["a","b"]',
+    "attrs": '{"a":1,"b":2}',
+}
+
+CASES = (
+    Case("ping", "GET", "/api/ping"),
+    Case(
+        "echo",
+        "POST",
+        "/api/echo",
+        query_string='a=x&b=[1,2,3]&c={"k":1}',
+        headers={"token": "123"},
+        json={"d": [1, 2, 3], "e": [{"1": [1]}, {"2": [2]}], "f": 1},
+    ),
+    Case(
+        "user",
+        "POST",
+        "/api/user",
+        json={
+            "user": {"name": "a", "emails": ["a@example.com"]},
+            "inviter": "b",
+            "invitees": ["c", "d"],
+            "teacher": {"id": 1, "name": "t"},
+        },
+    ),
+    Case("callback", "GET", "/api/callback/1/abc", query_string="echostr=x"),
+    Case(
+        "large_query",
+        "GET",
+        "/bench/large",
+        query_string=LARGE_QUERY,
+        headers={"Origin": "https://a.example.org"},
+    ),
+    Case("large_body", "POST", "/bench/large", json=make_large_body()),
+    Case("large_body_fast_resp", "POST", "/bench/large-fast", json=make_large_body()),
+    Case("form", "POST", "/bench/form", data=FORM_DATA),
+    Case(
+        "cors_preflight",
+        "OPTIONS",
+        "/bench/large",
+        headers={"Origin": "https://app.example.com", "Access-Control-Request-Method": "GET"},
+    ),
+)
+
+
+def _timeit(fn: Callable[[], Any], min_time: float, min_iterations: int) -> Tuple[int, float]:
+    """至少运行 min_time 秒和 min_iterations 次，返回 (次数, 耗时)"""
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or iterations < min_iterations:
+        fn()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+    return iterations, elapsed
+
+
+def _builder(case: Case) -> EnvironBuilder:
+    return EnvironBuilder(
+        path=case.path,
+        method=case.method,
+        query_string=case.query_string,
+        headers=case.headers,
+        json=case.json,
+        data=case.data,
+    )
+
+
+def _client_runner(app: cibo.Flask, case: Case) -> Callable[[], Any]:
+    client = app.test_client()
+
+    def run():
+        resp = client.open(_builder(case))
+        assert resp.status_code < 500, (case.name, resp.data)
+        resp.close()
+
+    return run
+
+
+def _wsgi_runner(app: cibo.Flask, case: Case) -> Callable[[], Any]:
+    """预先生成 environ，每次只复制 environ 和请求体，排除 test client 的开销"""
+    builder = _builder(case)
+    environ = builder.get_environ()
+    body = environ["wsgi.input"].read()
+    builder.close()
+
+    def start_response(status, headers, exc_info=None):
+        assert int(status[:3]) < 500, (case.name, status)
+
+    def run():
+        env = dict(environ)
+        env["wsgi.input"] = BytesIO(body)
+        iterable = app.wsgi_app(env, start_response)
+        try:
+            for _ in iterable:
+                pass
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    return run
+
+
+HARNESSES = {"client": _client_runner, "wsgi": _wsgi_runner}
+
+
+def run_pipeline(
+    min_time: float = 0.5, min_iterations: int = 50, cases: Optional[List[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """各 harness 下每个 case 的 req/s"""
+    app = create_app()
+    results = dict()  # type: Dict[str, Dict[str, float]]
+    for harness, make_runner in HARNESSES.items():
+        results[harness] = dict()
+        for case in CASES:
+            if cases and case.name not in cases:
+                continue
+            run = make_runner(app, case)
+            run()  # 预热
+            iterations, elapsed = _timeit(run, min_time, min_iterations)
+            results[harness][case.name] = round(iterations / elapsed, 1)
+    return results
+
+
+def _request_phase(
+    app: cibo.Flask, builder_kwargs: Dict[str, Any], fn: Callable[[], Any]
+) -> Callable[[], float]:
+    """每次在新的请求上下文中执行 fn，只计 fn 的耗时"""
+
+    def run() -> float:
+        with app.test_request_context(**builder_kwargs):
+            start = time.perf_counter()
+            fn()
+            return time.perf_counter() - start
+
+    return run
+
+
+def _phase_benchmarks(app: cibo.Flask) -> Dict[str, Callable[[], float]]:
+    large_body = make_large_body()
+    query = url_decode(LARGE_QUERY)
+    form = MultiDict(FORM_DATA)
+    body = LargeBodyHandler.Body.parse_obj(large_body)
+    # 与 handler 中一样传入已解析的模型
+    success_data = {"customer": body.customer, "orders": body.orders}
+    policy = CorsPolicy(CORS_CONFIG)
+    context_view = inject_context_decorator(LargeQueryHandler)(lambda **kwargs: None)
+
+    def _timed(fn: Callable[[], Any]) -> Callable[[], float]:
+        def run() -> float:
+            start = time.perf_counter()
+            fn()
+            return time.perf_counter() - start
+
+        return run
+
+    def _resp_plan_success():
+        g._resp_plan = FastLargeBodyHandler.resp_plan
+        cibo.SimpleContext.success(**success_data)
+
+    def _spec_cold() -> float:
+        fresh = create_app()
+        start = time.perf_counter()
+        fresh.build_spec()
+        return time.perf_counter() - start
+
+    json_ctx = {"path": "/bench/large", "method": "POST", "json": large_body}
+    cors_ctx = {"path": "/bench/large", "headers": {"Origin": "https://a.example.org"}}
+    return {
+        "query_parsing": _timed(lambda: LargeQueryHandler.Query.parse_request_args(query)),
+        "form_parsing": _timed(lambda: FormHandler.Body.parse_form_args(form)),
+        "json_body_binding": _request_phase(
+            app, json_ctx, lambda: LargeBodyHandler.binder.bind({})
+        ),
+        "context_creation": _request_phase(app, {"path": "/bench/large"}, context_view),
+        "envelope_serialization": _request_phase(
+            app, {"path": "/bench/large"}, lambda: cibo.SimpleContext.success(**success_data)
+        ),
+        "envelope_serialization_fast_resp": _request_phase(
+            app, {"path": "/bench/large"}, _resp_plan_success
+        ),
+        "cors": _request_phase(app, cors_ctx, lambda: policy.apply(app.response_class(b"{}"))),
+        "cors_preflight": _request_phase(app, cors_ctx, policy.preflight),
+        "spec_generation": _timed(lambda: app.build_spec(force_update=True)),
+        "spec_generation_cold": _spec_cold,
+    }
+
+
+def run_phases(
+    min_time: float = 0.5, min_iterations: int = 50, phases: Optional[List[str]] = None
+) -> Dict[str, float]:
+    """各阶段每次操作的微秒数"""
+    app = create_app()
+    results = dict()  # type: Dict[str, float]
+    for name, run in _phase_benchmarks(app).items():
+        if phases and name not in phases:
+            continue
+        run()  # 预热
+        total = 0.0
+        iterations = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_time or iterations < min_iterations:
+            total += run()
+            iterations += 1
+            if name == "spec_generation_cold" and iterations >= 5:
+                break
+        results[name] = round(total / iterations * 1e6, 2)
+    return results
+
+
+def run_all(
+    min_time: float = 0.5, min_iterations: int = 50, startup_handlers: int = 0
+) -> Dict[str, Any]:
+    results = {
+        "meta": {
+            "cibo": cibo.__version__,
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+        },
+        "pipeline": run_pipeline(min_time, min_iterations),
+        "phases": run_phases(min_time, min_iterations),
+    }  # type: Dict[str, Any]
+    if startup_handlers:
+        from .startup import run_startup
+
+        results["meta"]["startup_handlers"] = startup_handlers
+        results["startup"] = run_startup(startup_handlers)
+    return results
+
+
+class Regression(NamedTuple):
+    metric: str
+    baseline: float
+    current: float
+    change: float
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.15
+) -> List[Regression]:
+    """req/s 下降或阶段耗时增加超过 threshold 的项"""
+    regressions = []
+    for harness, cases in baseline.get("pipeline", {}).items():
+        for case, rps in cases.items():
+            now = current.get("pipeline", {}).get(harness, {}).get(case)
+            if now is None or not rps:
+                continue
+            change = now / rps - 1
+            if change < -threshold:
+                regressions.append(
+                    Regression(f"pipeline.{harness}.{case} (req/s)", rps, now, change)
+                )
+    # 耗时越小越好
+    for section, unit in (("phases", "us"), ("startup", "ms")):
+        for name, value in baseline.get(section, {}).items():
+            now = current.get(section, {}).get(name)
+            if now is None or not value:
+                continue
+            change = now / value - 1
+            if change > threshold:
+                regressions.append(Regression(f"{section}.{name} ({unit})", value, now, change))
+    return regressions
+
+
+def format_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = []
+
+    def _row(metric: str, value: float, base: Optional[float]) -> str:
+        if base:
+            return f"  {metric:<40} {value:>12.2f} {base:>12.2f} {value / base - 1:>+8.1%}"
+        return f"  {metric:<40} {value:>12.2f}"
+
+    for harness, cases in results.get("pipeline", {}).items():
+        lines.append(f"pipeline [{harness}] req/s")
+        for case, rps in cases.items():
+            base = (baseline or {}).get("pipeline", {}).get(harness, {}).get(case)
+            lines.append(_row(case, rps, base))
+    lines.append("phases us/op")
+    for phase, us in results.get("phases", {}).items():
+        base = (baseline or {}).get("phases", {}).get(phase)
+        lines.append(_row(phase, us, base))
+    if "startup" in results:
+        lines.append(f"startup ms ({results['meta'].get('startup_handlers')} handlers)")
+        for stage, ms in results["startup"].items():
+            base = (baseline or {}).get("startup", {}).get(stage)
+            lines.append(_row(stage, ms, base))
+    return "\n".join(lines)
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(results: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -4,9 +4,10 @@ from setuptools import setup
 setup(
     name="cibo",
     install_requires=[
-        "flask >= 1.1.2",
+        # cibo.utils.JSONEncoder subclasses flask.json.JSONEncoder, removed in Flask 2.3
+        "flask >= 1.1.2, < 2.3",
         "pydantic >= 1.6.2",
-        "apispec >= 4.2.0'",
+        "apispec >= 4.2.0",
         "typing-extensions; python_version < '3.8'",
     ],
     tests_require=[
@@ -17,4 +18,7 @@ setup(
         "yaml": ["pyyaml"],
         "async": ["asgiref >= 3.2"],
     },
+    entry_points={
+        "console_scripts": ["cibo = cibo.cli:main"],
+    },
 )
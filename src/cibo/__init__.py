@@ -7,6 +7,7 @@ from .args import *
 from .blueprint import *
 from .context import *
 from .handler import *
+from .multipart import *
 
 __all__ = [
     "Flask",
@@ -21,4 +22,5 @@ __all__ = [
     "SimpleContext",
     "Blueprint",
     "Handler",
+    "UploadFile",
 ]
@@ -1,12 +1,35 @@
-from typing import Any, Dict, List, Optional, Type, Union, cast
+import json
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
-from apispec.core import APISpec
 from flask import Flask as _Flask
-from flask import render_template_string
+from flask import render_template_string, request
 
 from .blueprint import Blueprint
 from .handler import Handler
-from .ui_templates import DOCS_TEMPLATE, OAUTH2_REDIRECT_TEMPLATE, REDOC_TEMPLATE
+from .metrics import Metrics
+from .prebuilt import PrebuiltResponse
+from .schema import SchemaRegistry, dedupe_schemas
+from .utils import JSONTypeRegistry, jsonify_with_encoder
+
+if TYPE_CHECKING:
+    # 只在开启对应功能或生成文档时导入，减少 `import cibo` 和 worker 启动的耗时
+    from apispec.core import APISpec
+
+    from .capture import CaptureMiddleware
+    from .compress import Compressor
+    from .profiler import Profiler
 
 __all__ = ["Flask"]
 
@@ -15,6 +38,12 @@ class Flask(_Flask):
     openapi_version: str
     tags: List
     _spec: Union[str, dict] = ""
+    _spec_responses: Dict[str, PrebuiltResponse]
+    # 只在开启时导入对应的模块
+    compressor: Optional["Compressor"]
+    capture: Optional["CaptureMiddleware"]
+    # 内部蓝图在 __init__ 设置 profiler 之前注册
+    profiler: Optional["Profiler"] = None
 
     def __init__(
         self,
@@ -53,6 +82,31 @@ class Flask(_Flask):
         docs_oauth2_redirect_path: str = "/docs/oauth2-redirect",
         redoc_path: str = "/redoc",
         spec_path: str = "/openapi.json",
+        spec_yaml_path: str = None,
+        spec_max_age: int = 86400,
+        prebuilt_spec: str = None,
+        docs_max_age: int = 0,
+        compress_docs: bool = True,
+        dedupe_schemas: bool = False,
+        big_int_policy: str = "native",
+        etag: bool = False,
+        compress: bool = False,
+        compress_min_size: int = 500,
+        compress_level: int = 6,
+        metrics_path: str = None,
+        profile_path: str = None,
+        profile_secret: str = None,
+        profile_ring_size: int = 20,
+        batch_path: str = None,
+        batch_max_size: int = 20,
+        batch_max_workers: int = 8,
+        batch_auth: Callable[[], Any] = None,
+        capture_log: str = None,
+        capture_sample_rate: float = 1.0,
+        capture_max_body_size: int = None,
+        capture_redact_headers: Iterable[str] = None,
+        warmup_on_startup: bool = False,
+        max_body_bytes: int = None,
     ) -> None:
         super().__init__(
             import_name,
@@ -84,8 +138,145 @@ class Flask(_Flask):
         self.docs_oauth2_redirect_path = docs_oauth2_redirect_path
         self.redoc_path = redoc_path
         self.spec_path = spec_path
+        self.spec_yaml_path = spec_yaml_path
+        self.spec_max_age = spec_max_age
+        self._spec_responses = dict()
+        self.docs_max_age = docs_max_age
+        self.compress_docs = compress_docs
+        self._docs_pages: Dict[Tuple[str, str], PrebuiltResponse] = dict()
+        self.schema_registry = SchemaRegistry()
+        self.dedupe_schemas = dedupe_schemas
+        self.spec_dedupe_stats = dict()  # type: Dict[str, int]
+        if prebuilt_spec:
+            # 由 `cibo spec export` 生成的 spec，生产环境不再运行 apispec
+            self.load_spec(prebuilt_spec)
+
+        # 自定义类型的 JSON 序列化: app.json_types.register(MyType, fn)
+        self.json_types = JSONTypeRegistry(big_int_policy=big_int_policy)
+        # context.success 为 GET 响应设置弱 ETag，Handler.etag 可单独开关
+        self.etag = etag
+        self.compressor = None
+        if compress:
+            from .compress import Compressor
+
+            # 最先注册的 after_request 最后执行，压缩其它钩子处理后的响应
+            self.compressor = Compressor(min_size=compress_min_size, level=compress_level)
+            self.after_request(self.compressor)
         self._register_openapi_blueprint()
 
+        # 各 Handler 分阶段的耗时、状态码统计，Prometheus 格式
+        self.metrics = None  # type: Optional[Metrics]
+        self.metrics_path = metrics_path
+        if metrics_path:
+            self.metrics = Metrics()
+            self._register_metrics_blueprint()
+
+        # 按签名请求头或 Handler.profile_sample_rate 用 cProfile 分析请求
+        self.profile_path = profile_path
+        if profile_path and not profile_secret:
+            # 分析结果中包含源码路径和调用细节，不允许匿名访问
+            raise ValueError("`profile_path` requires `profile_secret`")
+        self.profile_ring_size = profile_ring_size
+        if profile_secret:
+            self._enable_profiler(profile_secret)
+            if profile_path:
+                self._register_profiler_blueprint()
+
+        # 批量接口: 一个请求中并发调用多个 Handler
+        self.batch_max_size = batch_max_size
+        self.batch_auth = batch_auth
+        if batch_path:
+            from .batch import make_batch_blueprint
+
+            self.register_blueprint(make_batch_blueprint(self, batch_path, batch_max_workers))
+
+        # 采样记录请求，用 `cibo replay` 在本地回放
+        self.capture = None
+        if capture_log:
+            from .capture import CaptureMiddleware
+
+            limits = dict()  # type: Dict[str, Any]
+            if capture_max_body_size is not None:
+                limits["max_body_size"] = capture_max_body_size
+            if capture_redact_headers is not None:
+                limits["redact_headers"] = capture_redact_headers
+            self.capture = CaptureMiddleware(
+                self.wsgi_app,
+                capture_log,
+                url_map=self.url_map,
+                sample_rate=capture_sample_rate,
+                **limits,
+            )
+            self.wsgi_app = self.capture  # type: ignore
+
+        # 在 ASGI lifespan startup 和 `app.run()` 时调用 `warmup()`，fork 之前预热需要显式调用
+        self.warmup_on_startup = warmup_on_startup
+        # 请求体的默认上限，Handler 和蓝图都没有设置 max_body_bytes 时使用，ASGI 下在接收时检查
+        self.max_body_bytes = max_body_bytes
+
+    def _register_metrics_blueprint(self):
+        """注册metrics蓝图"""
+        bp = Blueprint("_metrics", __name__, url_prefix=self.openapi_url_prefix)
+
+        @bp.route(self.metrics_path)
+        def metrics():  # type: ignore
+            return self.response_class(
+                self.metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+
+        self.register_blueprint(bp)
+
+    def _enable_profiler(self, secret: Optional[str]) -> None:
+        from .profiler import Profiler
+
+        self.profiler = Profiler(secret=secret, ring_size=self.profile_ring_size)
+        # 只在开启时替换，未开启时 dispatch_request 没有额外开销
+        self.dispatch_request = self._profiled_dispatch_request  # type: ignore
+
+    def _profiled_dispatch_request(self):
+        profiler = cast("Profiler", self.profiler)
+        if not profiler.should_profile():
+            return super().dispatch_request()
+        return profiler.run(super().dispatch_request)
+
+    def _register_profiler_blueprint(self):
+        """注册profiler蓝图，访问需要用 profile_secret 签名"""
+        from .profiler import SORT_KEYS
+
+        bp = Blueprint("_profiler", __name__, url_prefix=self.openapi_url_prefix)
+        profiler = cast("Profiler", self.profiler)
+
+        @bp.before_request
+        def verify():  # type: ignore
+            if not profiler.verify():
+                return self.response_class("forbidden", status=403)
+
+        @bp.route(self.profile_path)
+        def profiles():  # type: ignore
+            return jsonify_with_encoder(profiler.records())
+
+        @bp.route(f"{self.profile_path}/<endpoint>/<int(signed=True):index>")
+        def profile(endpoint: str, index: int):  # type: ignore
+            record = profiler.get(endpoint, index)
+            if record is None:
+                return self.response_class("not found", status=404)
+            if request.args.get("format") == "prof":
+                return self.response_class(record.stats, mimetype="application/octet-stream")
+            sort = request.args.get("sort", "cumulative")
+            if sort not in SORT_KEYS:
+                return self.response_class(
+                    f"sort should be one of {', '.join(sorted(SORT_KEYS))}", status=400
+                )
+            text = profiler.render(
+                record,
+                phase=request.args.get("phase"),
+                sort=sort,
+                limit=request.args.get("limit", 50, type=int),
+            )
+            return self.response_class(text, mimetype="text/plain")
+
+        self.register_blueprint(bp)
+
     def _register_openapi_blueprint(self):
         """注册openapi蓝图"""
         bp = Blueprint("_openapi", __name__, url_prefix=self.openapi_url_prefix)
@@ -94,52 +285,170 @@ class Flask(_Flask):
 
             @bp.route(self.spec_path)
             def spec():  # type: ignore
-                return self._get_spec(force_update=False)
+                return self.get_spec_response("json")
+
+        if self.spec_yaml_path:
+            """openapi.yaml"""
+
+            @bp.route(self.spec_yaml_path)
+            def spec_yaml():  # type: ignore
+                return self.get_spec_response("yaml")
 
         if self.docs_path:
             """Swagger"""
 
             @bp.route(self.docs_path)
-            def docs() -> str:  # type: ignore
-                return render_template_string(
-                    DOCS_TEMPLATE, oauth2_redirect_path=self.docs_oauth2_redirect_path
-                )
+            def docs():  # type: ignore
+                return self.get_docs_response("docs")
 
         if self.docs_oauth2_redirect_path:
 
             @bp.route(self.docs_oauth2_redirect_path)
-            def oauth_redirect() -> str:  # type: ignore
-                return render_template_string(OAUTH2_REDIRECT_TEMPLATE)
+            def oauth_redirect():  # type: ignore
+                return self.get_docs_response("oauth_redirect")
 
         if self.redoc_path:
             """Redoc"""
 
             @bp.route(self.redoc_path)
-            def redoc() -> str:  # type: ignore
-                return render_template_string(REDOC_TEMPLATE)
+            def redoc():  # type: ignore
+                return self.get_docs_response("redoc")
 
         if self.enable_doc and (self.docs_path or self.redoc_path):
             self.register_blueprint(bp)
 
+    def _render_docs_page(self, page: str) -> str:
+        from .ui_templates import DOCS_TEMPLATE, OAUTH2_REDIRECT_TEMPLATE, REDOC_TEMPLATE
+
+        if page == "docs":
+            return render_template_string(
+                DOCS_TEMPLATE, oauth2_redirect_path=self.docs_oauth2_redirect_path
+            )
+        elif page == "oauth_redirect":
+            return render_template_string(OAUTH2_REDIRECT_TEMPLATE)
+        elif page == "redoc":
+            return render_template_string(REDOC_TEMPLATE)
+        raise ValueError(f"unknown docs page `{page}`")
+
+    def get_docs_response(self, page: str):
+        """文档页面每个 app 只渲染一次，之后直接返回字节"""
+        # 页面中 spec 的 url 依赖部署时的 script_root
+        key = (page, request.script_root)
+        prebuilt = self._docs_pages.get(key)
+        if prebuilt is None:
+            prebuilt = PrebuiltResponse(
+                self._render_docs_page(page).encode(),
+                "text/html",
+                max_age=self.docs_max_age,
+                compress=self.compress_docs,
+            )
+            self._docs_pages[key] = prebuilt
+        return prebuilt.make_response()
+
+    def warmup(
+        self,
+        *,
+        self_requests: bool = False,
+        methods: Iterable[str] = ("GET",),
+        headers: Optional[Dict[str, str]] = None,
+        seed: int = 0,
+        gc_freeze: bool = False,
+    ) -> Dict[str, float]:
+        """在接收流量之前完成路由、Handler、spec 和文档页面的一次性计算，返回各阶段的毫秒数
+
+        注册完所有蓝图之后调用，可以在 fork worker 之前调用，见 `cibo.warmup.warmup`
+        """
+        from .warmup import warmup
+
+        return warmup(
+            self,
+            self_requests=self_requests,
+            methods=methods,
+            headers=headers,
+            seed=seed,
+            gc_freeze=gc_freeze,
+        )
+
+    def run(self, *args, **kwargs) -> None:
+        if self.warmup_on_startup:
+            self.warmup()
+        super().run(*args, **kwargs)
+
+    def as_asgi(self, max_workers: Optional[int] = None, max_body_bytes: Optional[int] = None):
+        """ASGI 入口，同步 Handler 在最多 max_workers 个线程中执行
+
+        max_body_bytes 为 Handler、`Flask(max_body_bytes=...)` 和 `MAX_CONTENT_LENGTH` 都没有设置时
+        请求体的上限
+        """
+        from .asgi import ASGIApp
+
+        limits = dict()  # type: Dict[str, Any]
+        if max_body_bytes is not None:
+            limits["max_body_bytes"] = max_body_bytes
+        return ASGIApp(self, max_workers=max_workers, **limits)
+
+    def register_blueprint(self, blueprint, **options) -> None:
+        super().register_blueprint(blueprint, **options)
+        if isinstance(blueprint, Blueprint):
+            self.schema_registry.add_blueprint(blueprint)
+            # 没有 profile_secret 时只为 profile_sample_rate 开启采样
+            if self.profiler is None and any(h.profile_sample_rate > 0 for h in blueprint.handlers):
+                self._enable_profiler(None)
+
     def _get_spec(self, spec_format: str = "json", force_update=False) -> Union[dict, str]:
 
         if not force_update and self._spec:
-            return self._spec
+            spec = self._spec
+        else:
+            spec = self._spec = self._generate_spec().to_dict()
+            self._spec_responses.clear()
 
         if spec_format == "json":
-            self._spec = self._generate_spec().to_dict()
-        else:
-            self._spec = self._generate_spec().to_yaml()
+            return spec
+        return _dump_yaml(cast(dict, spec))
+
+    def load_spec(self, path: str) -> None:
+        """加载预先生成的 openapi.json"""
+        with open(path, "rb") as f:
+            self._spec = json.loads(f.read())
+        self._spec_responses.clear()
+
+    def build_spec(self, force_update=False) -> Dict[str, PrebuiltResponse]:
+        """生成 spec 并序列化为 json/yaml 字节（含 gzip 版本）"""
+        if force_update or not self._spec_responses:
+            spec = cast(dict, self._get_spec(force_update=force_update))
+            responses = {
+                "json": PrebuiltResponse(
+                    self.dump_spec(spec, "json"), "application/json", max_age=self.spec_max_age
+                )
+            }
+            if self.spec_yaml_path:
+                responses["yaml"] = PrebuiltResponse(
+                    self.dump_spec(spec, "yaml"), "application/yaml", max_age=self.spec_max_age
+                )
+            self._spec_responses = responses
+        return self._spec_responses
+
+    @staticmethod
+    def dump_spec(spec: dict, spec_format: str = "json") -> bytes:
+        if spec_format == "json":
+            return json.dumps(spec, ensure_ascii=False, separators=(",", ":")).encode()
+        elif spec_format == "yaml":
+            return _dump_yaml(spec).encode()
+        raise ValueError("spec_format should be 'json' or 'yaml'")
 
-        return self._spec
+    def get_spec_response(self, spec_format: str = "json"):
+        return self.build_spec()[spec_format].make_response()
+
+    def _generate_spec(self) -> "APISpec":
+        from apispec.core import APISpec
 
-    def _generate_spec(self) -> APISpec:
         kwargs = {}
         if self.servers:
             kwargs["servers"] = self.servers
         if self.external_docs:
             kwargs["external_docs"] = self.external_docs
-        spec: APISpec = APISpec(
+        spec = APISpec(
             title=self.title,
             version=self.version,
             openapi_version=self.openapi,
@@ -149,9 +458,6 @@ class Flask(_Flask):
             paths=self._make_paths(),
             **kwargs,
         )
-        from .args import _destory
-
-        _destory()
 
         return spec
 
@@ -179,9 +485,10 @@ class Flask(_Flask):
         """Make OpenAPI tags object."""
         tags = list()
         for blueprint_name, blueprint in self.blueprints.items():
-            if blueprint_name == "_openapi":
-                continue
             _tag = getattr(blueprint, "openapi_tag", None)  # type: Optional[Union[dict, str]]
+            if blueprint_name.startswith("_") and _tag in (None, blueprint_name):
+                # 内部蓝图（文档、metrics、profiler），除非显式设置了 openapi_tag
+                continue
             if _tag:
                 if isinstance(_tag, dict):
                     tag = _tag
@@ -237,51 +544,20 @@ class Flask(_Flask):
         return paths
 
     def _make_components(self) -> dict:
-        components = {
-            "schemas": {},
-            "responses": {},
-            "parameters": {},
-            "examples": {},
-            "requestBodies": {},
-            "headers": {},
-            "securitySchemes": {},
-            "links": {},
-            "callback": {},
-        }
-        from .args import (
-            components_parameters,
-            components_request_bodies,
-            components_responses,
-            components_schemas,
-            translate_schema_to_openapi,
-        )
-
-        for k, v in components_parameters.items():
-            components["parameters"][k] = {
-                "name": k.split("$")[-1],
-                "in": "query",
-                "description": v.__doc__ or "",
-                "required": True,
-                "deprecated": False,
-                "allowEmptyValue": False,
-                "schema": translate_schema_to_openapi(v),
-            }
-
-        for k, v in components_request_bodies.items():
-            components["requestBodies"][k] = {
-                "description": v.__doc__ or "",
-                "content": {v._content_type: {"schema": translate_schema_to_openapi(v)}},
-                "required": True,
-            }
-
-        for k, v in components_responses.items():
-            components["responses"][k] = {
-                "description": v.__doc__ or "",
-                "content": {v._content_type: {"schema": translate_schema_to_openapi(v)}},
-            }
+        components = self.schema_registry.make_components()
+        if self.dedupe_schemas:
+            # 合并各 Handler 内重复声明的相同模型，缩小 spec
+            components, self.spec_dedupe_stats = dedupe_schemas(components)
+            self.logger.info(
+                "openapi schemas deduplicated: %(merged)d merged, %(bytes_saved)d bytes saved",
+                self.spec_dedupe_stats,
+            )
+        return components
 
-        while components_schemas:
-            k, v = components_schemas.popitem()
-            components["schemas"][k] = translate_schema_to_openapi(v)
 
-        return components
+def _dump_yaml(spec: dict) -> str:
+    try:
+        import yaml
+    except ImportError:  # pragma: no cover
+        raise RuntimeError("pyyaml is required to dump yaml spec, use `pip install cibo[yaml]`")
+    return yaml.dump(spec, allow_unicode=True, sort_keys=False)
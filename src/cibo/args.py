@@ -1,19 +1,71 @@
-import json
-import re
-from ast import literal_eval
-from typing import Any, Dict, List, Optional, Type, Union, cast
-
-from pydantic import BaseModel
-from werkzeug.datastructures import ImmutableMultiDict
-
+from copy import deepcopy
+from typing import IO, Any, Dict, List, Optional, Tuple, Type, Union, cast
+
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.main import ModelMetaclass
+from werkzeug.datastructures import FileStorage, ImmutableMultiDict, MultiDict
+
+from .decoder import (
+    _MISSING,
+    MAX_DEPTH,
+    MAX_ITEMS,
+    MAX_VALUE_LENGTH,
+    DecodeError,
+    FieldDecoder,
+    _container_kind,
+    decode_container_value,
+)
+from .multipart import MAX_FIELD_SIZE, MAX_FILE_SIZE, MAX_UPLOAD_SIZE, parse_multipart
 from .types import MediaType
 
 __all__ = ["BaseApiArgs", "BaseApiPath", "BaseApiSuccessResp", "BaseApiBody", "BaseApiQuery"]
 
 
-class BaseApiArgs(BaseModel):
+class _ArgsMeta(ModelMetaclass):
+    """BaseModel 是 ABC，`issubclass(X, BaseModel)` 为 False 时会递归检查所有子类，
+    pydantic 生成 schema 时对每个约束类型（新建的类，没有缓存）都会这样检查，
+    Handler 多时耗时与模型数的平方成正比
+
+    没有通过 `register` 注册虚拟子类时，按 MRO 直接给出结果，不再遍历子类
+    """
+
+    _has_virtual_subclasses = False
+
+    def register(cls, subclass):
+        _ArgsMeta._has_virtual_subclasses = True
+        return super().register(subclass)
+
+    def __subclasscheck__(cls, subclass):
+        if _ArgsMeta._has_virtual_subclasses:
+            return super().__subclasscheck__(subclass)
+        return type.__subclasscheck__(cls, subclass)
+
+
+class BaseApiArgs(BaseModel, metaclass=_ArgsMeta):
     _schema_alias: str
 
+    @classmethod
+    def __subclasshook__(cls, subclass):
+        return True if cls in getattr(subclass, "__mro__", ()) else NotImplemented
+
+    @classmethod
+    def _is_container_field(cls, field) -> bool:
+        return False
+
+    @classmethod
+    def _container_fields(cls) -> Tuple[str, ...]:
+        """需要容器解码的字段名（alias），每个类只计算一次"""
+        fields = cls.__dict__.get("_cibo_container_fields")
+        if fields is None:
+            fields = tuple(
+                field.alias or field_name
+                for field_name, field in cls.__fields__.items()
+                if cls._is_container_field(field)
+            )
+            setattr(cls, "_cibo_container_fields", fields)
+        return fields
+
 
 class BaseApiPath(BaseApiArgs):
     @classmethod
@@ -51,100 +103,177 @@ class BaseApiSuccessResp(BaseApiArgs):
 
     @classmethod
     def get_openapi_response(cls) -> Dict:
-        components_responses[cls._schema_alias] = cls
         return {"$ref": f"#/components/responses/{cls._schema_alias}"}
 
 
 class BaseApiBody(BaseApiArgs):
     _schema_alias: str
     _content_type: MediaType = "application/json"
+    # multipart/form-data 的默认字节上限，单个字段可以用 `Field(max_bytes=...)` 覆盖
+    _max_file_size: int = MAX_FILE_SIZE
+    _max_field_size: int = MAX_FIELD_SIZE
+    _max_upload_size: int = MAX_UPLOAD_SIZE
 
     @classmethod
-    def parse_form_args(cls, form: ImmutableMultiDict) -> "BaseApiBody":
+    def _is_container_field(cls, field) -> bool:
+        return field.outer_type_ not in (str, list, set, tuple, dict)
+
+    @classmethod
+    def _file_fields(cls) -> Dict[str, bool]:
+        """UploadFile 字段名（alias）-> 是否为多文件字段，每个类只计算一次"""
+        fields = cls.__dict__.get("_cibo_file_fields")
+        if fields is None:
+            fields = {
+                field.alias or field_name: _container_kind(field.outer_type_) == "array"
+                for field_name, field in cls.__fields__.items()
+                if isinstance(field.type_, type) and issubclass(field.type_, FileStorage)
+            }
+            setattr(cls, "_cibo_file_fields", fields)
+        return fields
+
+    @classmethod
+    def _multipart_limits(cls) -> Dict[str, int]:
+        """multipart 中接收的字段名（alias）-> 字节上限"""
+        limits = cls.__dict__.get("_cibo_multipart_limits")
+        if limits is None:
+            file_fields = cls._file_fields()
+            limits = dict()
+            for field_name, field in cls.__fields__.items():
+                name = field.alias or field_name
+                default = cls._max_file_size if name in file_fields else cls._max_field_size
+                limits[name] = field.field_info.extra.get("max_bytes", default)
+            setattr(cls, "_cibo_multipart_limits", limits)
+        return limits
+
+    @classmethod
+    def get_content_type(cls) -> str:
+        return "multipart/form-data" if cls._file_fields() else cls._content_type
+
+    @classmethod
+    def _form_to_dict(cls, form: MultiDict) -> Dict[str, Any]:
         obj_dict = dict(form)
-        for field_name, field in cls.__fields__.items():
-            if field.outer_type_ not in (str, list, set, tuple, dict):
-                _name = field.alias or field_name
-                _value: Optional[str] = form.get(_name, None)
-                if _value is not None:
-                    if re.match(r"\[.*\]", _value):
-                        obj_dict[_name] = literal_eval(_value)
-                    elif re.match(r"{.*}", _value):
-                        obj_dict[_name] = json.loads(_value)
+        errors = []
+        for _name in cls._container_fields():
+            _value: Optional[str] = form.get(_name, None)
+            if _value is not None:
+                try:
+                    obj_dict[_name] = decode_container_value(_value)
+                except DecodeError as e:
+                    errors.append(ErrorWrapper(e, loc=(_name,)))
+        if errors:
+            raise ValidationError(errors, cls)
+        return obj_dict
 
-        return cls.parse_obj(obj_dict)
+    @classmethod
+    def parse_form_args(cls, form: ImmutableMultiDict) -> "BaseApiBody":
+        return cls.parse_obj(cls._form_to_dict(form))
+
+    @classmethod
+    def parse_multipart_args(
+        cls, stream: IO[bytes], boundary: bytes, content_length: Optional[int] = None
+    ) -> Tuple["BaseApiBody", MultiDict, MultiDict]:
+        """流式解析 multipart/form-data，返回 (body, form, files)"""
+        form, files = parse_multipart(
+            stream,
+            boundary,
+            cls._multipart_limits(),
+            max_size=cls._max_upload_size,
+            content_length=content_length,
+        )
+        try:
+            obj_dict = cls._form_to_dict(form)
+            for name, is_list in cls._file_fields().items():
+                if name in files:
+                    obj_dict[name] = files.getlist(name) if is_list else files[name]
+            return cls.parse_obj(obj_dict), form, files
+        except Exception:
+            for _, f in files.items(multi=True):
+                f.close()
+            raise
 
     @classmethod
     def get_openapi_request_body(cls):
-        components_request_bodies[cls._schema_alias] = cls
         return {"$ref": f"#/components/requestBodies/{cls._schema_alias}"}
 
 
 class BaseApiQuery(BaseApiArgs):
     _schema_alias: str
+    # 单个参数值的最大长度、容器的最大嵌套深度和元素个数
+    _max_value_length: int = MAX_VALUE_LENGTH
+    _max_depth: int = MAX_DEPTH
+    _max_items: int = MAX_ITEMS
+
+    @classmethod
+    def _query_decoders(cls) -> Tuple[FieldDecoder, ...]:
+        """list/set/tuple/dict 字段的解码器，每个类只生成一次"""
+        decoders = cls.__dict__.get("_cibo_query_decoders")
+        if decoders is None:
+            decoders = tuple(
+                decoder
+                for decoder in (
+                    FieldDecoder.for_field(
+                        field.alias or field_name,
+                        field,
+                        max_length=cls._max_value_length,
+                        max_depth=cls._max_depth,
+                        max_items=cls._max_items,
+                    )
+                    for field_name, field in cls.__fields__.items()
+                )
+                if decoder is not None
+            )
+            setattr(cls, "_cibo_query_decoders", decoders)
+        return decoders
+
+    @classmethod
+    def _container_fields(cls) -> Tuple[str, ...]:
+        return tuple(decoder.name for decoder in cls._query_decoders())
 
     @classmethod
     def parse_request_args(cls, query: ImmutableMultiDict) -> "BaseApiQuery":
-        obj_dict = dict(query)
-        for field_name, field in cls.__fields__.items():
-            if hasattr(field.outer_type_, "__origin__") and field.outer_type_.__origin__ in (
-                list,
-                set,
-                tuple,
-                dict,
-            ):
-                _name = field.alias or field_name
-                _value: Optional[str] = query.get(_name, None)
-                if _value is not None:
-                    if re.match(r"\[.*\]", _value):
-                        obj_dict[_name] = literal_eval(_value)
-                    elif re.match(r"{.*}", _value):
-                        obj_dict[_name] = json.loads(_value)
+        obj_dict = query.to_dict()
+        errors = []
+        for decoder in cls._query_decoders():
+            try:
+                value = decoder.decode(query)
+            except DecodeError as e:
+                errors.append(ErrorWrapper(e, loc=(decoder.name,)))
+                continue
+            if value is not _MISSING:
+                obj_dict[decoder.name] = value
+        if errors:
+            raise ValidationError(errors, cls)
         return cls.parse_obj(obj_dict)
 
     @classmethod
     def get_openapi_parameters(cls):
-        components_parameters[cls._schema_alias] = cls
         return [
-            {"$ref": f"#/components/parameters/{cls._schema_alias}"},
+            {"$ref": f"#/components/parameters/{cls._schema_alias}${field.alias or field_name}"}
+            for field_name, field in cls.__fields__.items()
         ]
 
 
-components_parameters = dict()  # type: Dict[str, Type[BaseApiQuery]]
-components_request_bodies = dict()  # type: Dict[str, Type[BaseApiBody]]
-components_responses = dict()  # type: Dict[str, Type[BaseApiSuccessResp]]
-components_schemas = dict()  # type: Dict[str, Union[Type[BaseModel], dict]]
-_extra_definitions = dict()  # type: Dict[str, Dict]
-
+TSchemaRef = Tuple[Union[Type[BaseModel], dict], Dict[str, Dict]]
 
-def _destory():  # type:ignore
-    global components_parameters
-    global components_request_bodies
-    global components_responses
-    global components_schemas
-    global _extra_definitions
 
-    components_parameters.clear()
-    components_request_bodies.clear()
-    components_responses.clear()
-    components_schemas.clear()
-    _extra_definitions.clear()
+def _translate_schema(
+    args_class: Union[Type[BaseModel], dict], extra_definitions: Optional[Dict[str, Dict]] = None
+) -> Tuple[dict, Dict[str, TSchemaRef]]:
+    """转换为 openapi schema，返回 schema 和其引用的 components/schemas
 
-    del components_parameters
-    del components_request_bodies
-    del components_responses
-    del components_schemas
-    del _extra_definitions
-
-
-def translate_schema_to_openapi(args_class: Union[Type[BaseModel], dict]) -> dict:
+    引用的值为 (BaseModel 子类或 definition, 查找嵌套 definition 用的 definitions)
+    """
     if type(args_class) is dict:
-        schema: dict = cast(dict, args_class)
+        schema: dict = deepcopy(cast(dict, args_class))
     else:
         args_class = cast(Type[BaseApiArgs], args_class)
-        schema: dict = args_class.schema()
+        # pydantic 会缓存 schema()，下面会原地修改，需要复制
+        schema: dict = deepcopy(args_class.schema())
     properties = schema.get("properties", {})
-    definitions = schema.get("definitions", {})
+    definitions = schema.pop("definitions", {})
+    if extra_definitions:
+        definitions = {**extra_definitions, **definitions}
+    refs = dict()  # type: Dict[str, TSchemaRef]
 
     def _handle_array(v: Dict):
         items = v.get("items", None)  # type: Optional[Union[List, Dict]]
@@ -166,18 +295,15 @@ def translate_schema_to_openapi(args_class: Union[Type[BaseModel], dict]) -> dic
     def _handle_ref(value: Dict):
         _name: str = value["$ref"].split("/")[-1]
         innter_schema_class = getattr(args_class, _name, type)
-        if issubclass(innter_schema_class, BaseModel):
+        if isinstance(innter_schema_class, type) and issubclass(innter_schema_class, BaseModel):
             # 在Query、Body、Resp内部的BaseModel类，避免schema之间重名
             _name_alias = f"{args_class._schema_alias}${innter_schema_class.__name__}"  # type: ignore
             setattr(innter_schema_class, "_schema_alias", _name_alias)
-            components_schemas[_name_alias] = innter_schema_class
+            refs[_name_alias] = (innter_schema_class, {})
         else:
             _name_alias = _name
             if _name in definitions:
-                components_schemas[_name_alias] = definitions.pop(_name)
-            else:
-                if _name in _extra_definitions:
-                    components_schemas[_name_alias] = _extra_definitions.pop(_name)
+                refs[_name_alias] = (definitions[_name], definitions)
 
         value["$ref"] = f"#/components/schemas/{_name_alias}"
 
@@ -203,11 +329,11 @@ def translate_schema_to_openapi(args_class: Union[Type[BaseModel], dict]) -> dic
         elif v.get("anyOf"):
             _handle_any_of(v["anyOf"])
 
-    if "definitions" in schema:
-        _extra_definitions.update(schema["definitions"])
-        del schema["definitions"]
+    return schema, refs
 
-    return schema
+
+def translate_schema_to_openapi(args_class: Union[Type[BaseModel], dict]) -> dict:
+    return _translate_schema(args_class)[0]
 
 
 # def translate_schema_to_openapi(args_class) -> Dict[str, Union[str, bool, int, List, Dict]]:
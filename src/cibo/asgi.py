@@ -0,0 +1,279 @@
+import asyncio
+import inspect
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import request_started
+from flask.wrappers import Response
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+from .app import Flask
+from .handler import Handler
+from .multipart import MAX_UPLOAD_SIZE
+
+__all__ = ["ASGIApp"]
+
+TScope = Dict[str, Any]
+TReceive = Callable[[], Any]
+TSend = Callable[[Dict[str, Any]], Any]
+
+
+def build_environ(scope: TScope, body: bytes) -> Dict[str, Any]:
+    """把 ASGI http scope 转换为 WSGI environ"""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path.replace(root_path, "", 1)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf8").decode("latin1"),
+        "PATH_INFO": path.encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    server = scope.get("server") or ("localhost", 80)
+    environ["SERVER_NAME"] = server[0]
+    environ["SERVER_PORT"] = str(server[1] or 80)
+    client = scope.get("client")
+    if client:
+        environ["REMOTE_ADDR"] = client[0]
+        environ["REMOTE_PORT"] = str(client[1])
+
+    for raw_name, raw_value in scope.get("headers", ()):
+        name = raw_name.decode("latin1").lower()
+        value = raw_value.decode("latin1")
+        if name == "content-length":
+            key = "CONTENT_LENGTH"
+        elif name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        if key in environ:
+            # 多个 Cookie 头按 RFC 6265 用 "; " 合并，其它请求头用 ","
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            value = f"{environ[key]}{separator}{value}"
+        environ[key] = value
+    # 请求体已完整读取，chunked 请求也按实际长度提供
+    environ.setdefault("CONTENT_LENGTH", str(len(body)))
+    return environ
+
+
+class ASGIApp:
+    """以 ASGI 方式运行 cibo 应用
+
+    - `async def handle` 的 Handler 直接在事件循环中执行
+    - 同步 Handler 以及其它路由（openapi、文档等）在有界线程池中按 WSGI 执行
+    - 请求体在路由之后读取到内存，接收过程中超过上限时停止读取并返回 413，上限依次为
+      Handler/蓝图的 `max_body_bytes`、`Flask(max_body_bytes=...)`、`app.config["MAX_CONTENT_LENGTH"]`、
+      max_body_bytes
+    - 请求体接收完之前客户端断开时不调用应用
+    - 只支持 http 和 lifespan，websocket 连接会被拒绝
+
+    >>> asgi_app = ASGIApp(create_app(), max_workers=32)
+    $ uvicorn module:asgi_app
+    """
+
+    def __init__(
+        self, app: Flask, max_workers: Optional[int] = None, max_body_bytes: int = MAX_UPLOAD_SIZE
+    ) -> None:
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="cibo-asgi")
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: TScope, receive: TReceive, send: TSend) -> None:
+        if scope["type"] == "http":
+            await self._handle_http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._handle_lifespan(receive, send)
+        elif scope["type"] == "websocket":
+            # 在 accept 之前关闭，服务器以 403 拒绝握手
+            message = await receive()
+            if message["type"] == "websocket.connect":
+                await send({"type": "websocket.close", "code": 1003})
+        else:
+            raise ValueError(f"unsupported ASGI scope type `{scope['type']}`, only http/lifespan")
+
+    async def _handle_lifespan(self, receive: TReceive, send: TSend) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.app.warmup_on_startup:
+                    try:
+                        self.app.warmup()
+                    except Exception as e:
+                        await send({"type": "lifespan.startup.failed", "message": repr(e)})
+                        return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive: TReceive, limit: int) -> Optional[bytes]:
+        """读取请求体，超过 limit 时返回 None，客户端断开时抛出 ClientDisconnected"""
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                return None
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    def _match_view(self, environ: Dict[str, Any]) -> Optional[Callable]:
+        adapter = self.app.url_map.bind_to_environ(environ)
+        try:
+            endpoint, _ = adapter.match()
+        except Exception:
+            # 404/405/重定向等交给 flask 处理
+            return None
+        return self.app.view_functions.get(endpoint)
+
+    def _body_limit(self, view_func: Optional[Callable]) -> int:
+        binder = getattr(getattr(view_func, "view_class", None), "binder", None)
+        for limit in (
+            getattr(binder, "max_body_bytes", None),
+            getattr(self.app, "max_body_bytes", None),
+            self.app.config.get("MAX_CONTENT_LENGTH"),
+        ):
+            if limit is not None:
+                return limit
+        return self.max_body_bytes
+
+    async def _handle_http(self, scope: TScope, receive: TReceive, send: TSend) -> None:
+        environ = build_environ(scope, b"")
+        view_func = self._match_view(environ)
+        limit = self._body_limit(view_func)
+        declared = _content_length(scope)
+        body = None  # type: Optional[bytes]
+        if declared is None or declared <= limit:
+            try:
+                body = await self._read_body(receive, limit)
+            except ClientDisconnected:
+                # 不完整的请求体不交给应用处理，也没有可以发送响应的连接
+                return
+        if body is None:
+            await self._send_too_large(environ, view_func, limit, send)
+            return
+        environ["wsgi.input"] = BytesIO(body)
+        if declared is None:
+            environ["CONTENT_LENGTH"] = str(len(body))
+        if inspect.iscoroutinefunction(view_func):
+            await self._dispatch_async(environ, send)
+        else:
+            await self._dispatch_wsgi(environ, send)
+
+    async def _send_too_large(
+        self, environ: Dict[str, Any], view_func: Optional[Callable], limit: int, send: TSend
+    ) -> None:
+        app = self.app
+        description = f"request body exceeds {limit} bytes"
+        view_class = getattr(view_func, "view_class", None)
+        with app.request_context(environ):
+            if isinstance(view_class, type) and issubclass(view_class, Handler):
+                # 与 binder 中超限时一样返回 413 的错误信封
+                rv = view_class.context_cls.error(description, 413)
+            else:
+                rv = app.handle_user_exception(RequestEntityTooLarge(description))
+            await self._send_response(send, app.finalize_request(rv))
+
+    async def _dispatch_async(self, environ: Dict[str, Any], send: TSend) -> None:
+        """与 `Flask.full_dispatch_request` 相同，但视图函数在事件循环中 await"""
+        app = self.app
+        ctx = app.request_context(environ)
+        error = None  # type: Optional[BaseException]
+        try:
+            ctx.push()
+            try:
+                try:
+                    request_started.send(app)
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        req = ctx.request
+                        if req.routing_exception is not None:
+                            app.raise_routing_exception(req)
+                        rv = await app.view_functions[req.url_rule.endpoint](**req.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            await self._send_response(send, response)
+        finally:
+            ctx.pop(error)
+
+    async def _send_response(self, send: TSend, response: Response) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": _encode_headers(response.headers.to_wsgi_list()),
+            }
+        )
+        for chunk in response.iter_encoded():
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        response.close()
+
+    async def _dispatch_wsgi(self, environ: Dict[str, Any], send: TSend) -> None:
+        loop = asyncio.get_running_loop()
+        status_headers = []  # type: List[Tuple[str, List[Tuple[str, str]]]]
+
+        def start_response(status: str, headers, exc_info=None):
+            status_headers.append((status, headers))
+
+        def _call() -> Iterable[bytes]:
+            return self.app.wsgi_app(environ, start_response)
+
+        iterable = await loop.run_in_executor(self.executor, _call)
+        try:
+            iterator = iter(iterable)
+            # 流式响应需要先取到第一块，start_response 才一定被调用
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            status, headers = status_headers[-1]
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": _encode_headers(headers),
+                }
+            )
+            while chunk is not None:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+
+
+def _content_length(scope: TScope) -> Optional[int]:
+    for name, value in scope.get("headers", ()):
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def _encode_headers(headers: List[Tuple[str, str]]) -> List[Tuple[bytes, bytes]]:
+    return [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers]
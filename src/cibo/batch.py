@@ -0,0 +1,170 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, cast
+
+from flask import current_app, g, request
+from pydantic import BaseModel, Field
+from werkzeug.exceptions import MethodNotAllowed
+from werkzeug.test import EnvironBuilder
+
+from .args import BaseApiBody, BaseApiSuccessResp
+from .blueprint import Blueprint
+from .context import SimpleContext
+from .handler import Handler
+
+if TYPE_CHECKING:
+    from .app import Flask
+
+__all__ = ["BatchHandler", "batch_authorized", "make_batch_blueprint"]
+
+# 不转发给子请求的请求头，子响应以 json 嵌入批量响应中，不能被压缩或返回 304/206
+_SKIP_HEADERS = frozenset(
+    [
+        "content-type",
+        "content-length",
+        "host",
+        "accept-encoding",
+        "if-none-match",
+        "if-modified-since",
+        "if-match",
+        "if-unmodified-since",
+        "if-range",
+        "range",
+    ]
+)
+
+
+def batch_authorized() -> bool:
+    """当前请求是否为 `batch_auth` 已经通过的批量子请求
+
+    子请求仍然带有批量请求的请求头并执行 Handler 的装饰器，
+    鉴权装饰器可以据此跳过重复的鉴权:
+
+    >>> if not batch_authorized() and request.headers.get("token") != "123":
+    ...     raise AuthException()
+    """
+    return bool(g.get("_batch_authorized"))
+
+
+def _encode_query(query: Dict[str, Any]) -> List[Tuple[str, str]]:
+    args = []
+    for k, v in query.items():
+        if isinstance(v, str):
+            args.append((k, v))
+        else:
+            args.append((k, json.dumps(v)))
+    return args
+
+
+def _load_envelope(data: bytes) -> Any:
+    try:
+        return json.loads(data)
+    except ValueError:
+        return data.decode("utf-8", "replace")
+
+
+def _sub_error(status_code: int, status_message: str) -> Dict[str, Any]:
+    return {
+        "status": status_code,
+        "body": {"success": False, "status_code": status_code, "status_message": status_message},
+    }
+
+
+class BatchHandler(Handler):
+    """在一个 HTTP 请求中并发调用多个 Handler"""
+
+    class Body(BaseApiBody):
+        """批量请求"""
+
+        class SubRequest(BaseModel):
+            method: str = Field(default="GET", description="HTTP method")
+            path: str = Field(description="path of the handler, e.g. /api/ping")
+            query: Dict[str, Any] = Field(default_factory=dict)
+            body: Optional[Any] = Field(default=None, description="json body")
+
+        requests: List[SubRequest]
+
+    class Resp(BaseApiSuccessResp):
+        """按请求顺序返回各子请求的 HTTP 状态和响应"""
+
+        class SubResponse(BaseModel):
+            status: int
+            body: Any
+
+        responses: List[SubResponse]
+
+    def handle(self, context: SimpleContext, body: Body):
+        """batch handler calls"""
+        app = cast("Flask", current_app._get_current_object())  # type: ignore
+        if len(body.requests) > app.batch_max_size:
+            return context.error(f"batch size should be <= {app.batch_max_size}", 413)
+        authorized = False
+        if app.batch_auth is not None:
+            # 鉴权对整个批量请求只执行一次，子请求中 batch_authorized() 为 True
+            rv = app.batch_auth()
+            if rv is not None:
+                return rv
+            authorized = True
+
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS]
+        base_url = request.host_url.rstrip("/") + request.script_root
+        responses = list(
+            app.batch_executor.map(
+                lambda sub: _dispatch(app, sub, headers, base_url, authorized), body.requests
+            )
+        )
+        return context.success(responses=responses)
+
+
+def _dispatch(
+    app: "Flask",
+    sub: BatchHandler.Body.SubRequest,
+    headers: List[Tuple[str, str]],
+    base_url: str,
+    authorized: bool,
+) -> Dict[str, Any]:
+    builder = EnvironBuilder(
+        path=sub.path,
+        base_url=base_url,
+        method=sub.method.upper(),
+        query_string=_encode_query(sub.query),
+        headers=headers,
+        json=sub.body,
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ) as ctx:
+        if isinstance(ctx.request.routing_exception, MethodNotAllowed):
+            return _sub_error(405, f"method not allowed: {sub.method.upper()} {sub.path}")
+        g._batch_authorized = authorized
+        rule = ctx.request.url_rule
+        view_func = app.view_functions.get(rule.endpoint) if rule else None
+        view_class = getattr(view_func, "view_class", None)
+        if (
+            view_class is None
+            or not issubclass(view_class, Handler)
+            or issubclass(view_class, BatchHandler)
+        ):
+            return _sub_error(404, f"handler not found: {sub.method.upper()} {sub.path}")
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:  # 未被 errorhandler 处理的异常
+            app.log_exception((type(e), e, e.__traceback__))
+            return _sub_error(500, "internal server error")
+        return {"status": response.status_code, "body": _load_envelope(response.get_data())}
+
+
+def make_batch_blueprint(app: "Flask", batch_path: str, max_workers: int) -> Blueprint:
+    app.batch_executor = ThreadPoolExecutor(max_workers, thread_name_prefix="cibo-batch")
+    bp = Blueprint(
+        "_batch",
+        __name__,
+        url_prefix=app.openapi_url_prefix,
+        openapi_tag="batch",
+        tag_description="call many handlers in one request",
+    )
+    bp.post(batch_path)(type("BatchHandler", (BatchHandler,), {}))
+    return bp
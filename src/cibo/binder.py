@@ -0,0 +1,181 @@
+import inspect
+from typing import IO, Callable, Dict, Optional, Type
+
+from flask import current_app, request
+from pydantic import BaseModel
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+from .args import BaseApiBody, BaseApiPath, BaseApiQuery
+from .decoder import DecodeError, check_json_limits
+from .handler import Handler
+
+__all__ = ["RequestBinder"]
+
+
+class _CountingStream:
+    """读取请求体时计数，超过上限立即 413，不会把超限的请求体读入内存"""
+
+    def __init__(self, stream: IO[bytes], limit: int) -> None:
+        self._stream = stream
+        self._limit = limit
+        self._read = 0
+
+    def _count(self, data: bytes) -> bytes:
+        self._read += len(data)
+        if self._read > self._limit:
+            raise RequestEntityTooLarge(f"request body exceeds {self._limit} bytes")
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            # 最多多读 1 字节用于判断是否超限
+            size = self._limit - self._read + 1
+        return self._count(self._stream.read(size))
+
+    def readline(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._limit - self._read + 1
+        return self._count(self._stream.readline(size))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+def _parse_json_body(Body: Type[BaseApiBody]):
+    body = request.get_json()
+    return Body.parse_obj(body if body else {})
+
+
+def _parse_form_body(Body: Type[BaseApiBody]):
+    return Body.parse_form_args(request.form) if request.form else {}  # type:ignore
+
+
+def _parse_multipart_body(Body: Type[BaseApiBody]):
+    boundary = request.mimetype_params.get("boundary")
+    if not boundary:
+        raise BadRequest("missing multipart boundary")
+    body, form, files = Body.parse_multipart_args(
+        request.stream, boundary.encode("latin1"), request.content_length
+    )
+    # 请求体已被读取，request.form/files 使用解析结果，文件在请求结束时关闭
+    request.form = form  # type: ignore
+    request.files = files  # type: ignore
+    return body
+
+
+class RequestBinder:
+    """请求参数绑定计划
+
+    在 `Blueprint.register_view` 时为每个 Handler 编译一次，
+    请求时只做字典查找和直接调用。
+    """
+
+    body_parsers: Dict[str, Callable[[Type[BaseApiBody]], object]] = {
+        "application/json": _parse_json_body,
+        "application/x-www-form-urlencoded": _parse_form_body,
+        "multipart/form-data": _parse_multipart_body,
+    }
+
+    def __init__(
+        self,
+        cls: Type[Handler],
+        max_body_bytes: Optional[int] = None,
+        max_body_depth: Optional[int] = None,
+        max_body_items: Optional[int] = None,
+    ) -> None:
+        view_func = getattr(cls, cls.handle_func_name)
+        func_sig = inspect.signature(view_func, follow_wrapped=True)
+        if "context" not in func_sig.parameters:
+            raise Exception(f"param `context` does't found in `{view_func}`")
+        context = func_sig.parameters.get("context")
+        if not context:
+            raise Exception("Not Found context")
+        if not issubclass(context.annotation, cls.context_cls):
+            raise Exception(f"`{context.name}` must specify annotation `{cls.context_cls}`")
+
+        parameter_map = {}  # type: Dict[str, Type[BaseModel]]
+
+        def _validate_query_and_body_parameters(type_: str, class_):
+            if type_ in func_sig.parameters:
+                api_args = func_sig.parameters.get(type_)
+                if not api_args:
+                    raise Exception()
+                if not class_:
+                    raise Exception(
+                        f"`{type_}` exists in {cls.handle_func_name}'s params but `{type_.capitalize()}` not found in `class {cls.__name__}`"
+                    )
+                elif not issubclass(class_, BaseModel):
+                    raise Exception(f"{class_.__name__} object is not subclass of BaseModel")
+                elif api_args.annotation is not class_:
+                    raise Exception(f"parameter {type_} type not match cls.{class_.__name__}")
+                else:
+                    parameter_map[type_] = class_
+            else:
+                if class_:
+                    raise Exception(f"handle method not have {type_} parameter")
+
+        _validate_query_and_body_parameters("query", getattr(cls, "Query", None))
+        _validate_query_and_body_parameters("body", getattr(cls, "Body", None))
+        _validate_query_and_body_parameters("path", getattr(cls, "Path", None))
+
+        self.query: Optional[Type[BaseApiQuery]] = parameter_map.get("query")
+        self.body: Optional[Type[BaseApiBody]] = parameter_map.get("body")
+        self.path: Optional[Type[BaseApiPath]] = parameter_map.get("path")
+
+        # Handler 未设置时使用蓝图的设置
+        self.max_body_bytes = _first(cls.max_body_bytes, max_body_bytes)
+        self.max_body_depth = _first(cls.max_body_depth, max_body_depth)
+        self.max_body_items = _first(cls.max_body_items, max_body_items)
+
+        if self.query:
+            # 提前生成需要容器解码的字段的解码器
+            self.query._query_decoders()
+        if self.body:
+            self.body._container_fields()
+            self.body._multipart_limits()
+
+    def bind(self, kwargs: Dict) -> Dict:
+        """解析 query/body/path，返回注入到 handle 的参数"""
+        parameters = {}
+        if self.query:
+            parameters["query"] = self.query.parse_request_args(request.args)
+        limit = self.max_body_bytes
+        if limit is None:
+            limit = getattr(current_app, "max_body_bytes", None)
+        if limit is not None:
+            self._limit_body_bytes(limit)
+        if self.body:
+            if request.is_json and (self.max_body_depth or self.max_body_items):
+                self._check_json_body()
+            parser = self.body_parsers.get(request.mimetype)
+            parameters["body"] = parser(self.body) if parser else {}
+        if self.path:
+            view_args = request.view_args
+            parameters["path"] = self.path.parse_path_args(view_args)
+            for k in view_args:
+                kwargs.pop(k, None)
+            view_args.clear()
+        return parameters
+
+    def _limit_body_bytes(self, limit: int) -> None:
+        content_length = request.content_length
+        if content_length is not None and content_length > limit:
+            raise RequestEntityTooLarge(f"request body exceeds {limit} bytes")
+        # 没有 Content-Length（如 chunked）时在读取过程中计数
+        request.stream = _CountingStream(request.stream, limit)  # type: ignore
+
+    def _check_json_body(self) -> None:
+        try:
+            # 缓存的原始数据随后由 request.get_json 直接使用
+            check_json_limits(
+                request.get_data(cache=True), self.max_body_depth, self.max_body_items
+            )
+        except DecodeError as e:
+            raise RequestEntityTooLarge(f"request body {e}")
+
+
+def _first(*values):
+    for value in values:
+        if value is not None:
+            return value
+    return None
@@ -1,10 +1,13 @@
-from typing import Optional, Type, Union
+from typing import List, Optional, Type, Union
 
 from flask.blueprints import Blueprint as _Blueprint
 
-from .args import BaseApiBody, BaseApiPath, BaseApiQuery, BaseApiSuccessResp
+from .args import BaseApiArgs, BaseApiSuccessResp
+from .binder import RequestBinder
 from .decorators import inject_args_decorator, inject_context_decorator
 from .handler import Handler
+from .metrics import handle_timer_decorator, metrics_decorator
+from .serializer import RespPlan
 
 __all__ = ["Blueprint"]
 
@@ -25,6 +28,9 @@ class Blueprint(_Blueprint):
         openapi_tag: Union[dict, str] = None,
         enable_openapi: bool = True,
         tag_description: str = None,
+        max_body_bytes: Optional[int] = None,
+        max_body_depth: Optional[int] = None,
+        max_body_items: Optional[int] = None,
     ):
         super().__init__(
             name,
@@ -42,29 +48,18 @@ class Blueprint(_Blueprint):
         self.openapi_tag = openapi_tag or name
         self.enable_openapi = enable_openapi
         self.tag_description = tag_description
+        self.max_body_bytes = max_body_bytes
+        self.max_body_depth = max_body_depth
+        self.max_body_items = max_body_items
+        self.handlers: List[Type[Handler]] = list()
 
     @staticmethod
     def _parse_parameters_and_responses(_cls: Type[Handler]):
-        Path = getattr(_cls, "Path", None)  # type: Optional[Type[BaseApiPath]]
-        Query = getattr(_cls, "Query", None)  # type: Optional[Type[BaseApiQuery]]
-        Body = getattr(_cls, "Body", None)  # type: Optional[Type[BaseApiBody]]
-        Resp = getattr(_cls, "Resp", None)  # type: Optional[Type[BaseApiSuccessResp]]
-
-        setattr(_cls, "path", list())
-        setattr(_cls, "responses", dict())
-        setattr(_cls, "parameters", list())
-        setattr(_cls, "request_body", dict())
-        if Path:
-            _cls.path = Path.get_openapi_path()
-        if Query:
-            setattr(Query, "_schema_alias", f"{_cls.__name__}${Query.__name__}")
-            _cls.parameters.extend(Query.get_openapi_parameters())
-        if Body:
-            setattr(Body, "_schema_alias", f"{_cls.__name__}${Body.__name__}")
-            _cls.request_body = Body.get_openapi_request_body()
-        if Resp:
-            setattr(Resp, "_schema_alias", f"{_cls.__name__}${Resp.__name__}")
-            _cls.responses["200"] = Resp.get_openapi_response()
+        """设置模型在 components 中的名称，path/parameters 等 openapi 片段在第一次生成 spec 时才生成"""
+        for name in ("Query", "Body", "Resp"):
+            model: Optional[Type[BaseApiArgs]] = getattr(_cls, name, None)
+            if model:
+                setattr(model, "_schema_alias", f"{_cls.__name__}${model.__name__}")
 
     def register_view(self, rule: str, method: str, endpoint: str = None):
         def decorator(cls: Type[Handler]):
@@ -80,6 +75,7 @@ class Blueprint(_Blueprint):
             self._handle_view_cls_handle_func(cls)
             setattr(cls, method, getattr(cls, cls.handle_func_name))
             self.add_url_rule(rule, endpoint, cls.as_view())
+            self.handlers.append(cls)
             return cls
 
         return decorator
@@ -87,6 +83,16 @@ class Blueprint(_Blueprint):
     def _handle_view_cls_handle_func(self, cls: Type[Handler]):
         """注册装饰器"""
         self._parse_parameters_and_responses(cls)
+        binder = RequestBinder(
+            cls,
+            max_body_bytes=self.max_body_bytes,
+            max_body_depth=self.max_body_depth,
+            max_body_items=self.max_body_items,
+        )
+        setattr(cls, "binder", binder)
+        Resp: Optional[Type[BaseApiSuccessResp]] = getattr(cls, "Resp", None)
+        if cls.fast_resp and Resp:
+            setattr(cls, "resp_plan", RespPlan(Resp, validate=cls.validate_resp))
         decorators = []
 
         decorators.extend(
@@ -100,11 +106,23 @@ class Blueprint(_Blueprint):
         else:
             cls.decorators += decorators
 
+        if cls.cache_config is not None:
+            from .cache import HandlerCache, cache_decorator
+
+            setattr(cls, "cache", HandlerCache(cls, cls.cache_config))
+            # 放在最内层，用户装饰器（鉴权等）在命中缓存时仍然执行
+            cls.decorators.insert(0, cache_decorator(cls))
+
+        # 开启 `Flask(metrics_path=...)` 时统计各阶段耗时，最内层为 handle，最外层为整个请求
+        cls.decorators.insert(0, handle_timer_decorator(cls))
+
         if cls.cors_config is not None:
             from .cors import enable_cors_decorator
 
             cls.decorators.append(enable_cors_decorator(cls))
 
+        cls.decorators.append(metrics_decorator(cls))
+
         return cls
 
     def get(self, rule: str, endpoint: str = None):
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from flask import Response, current_app, g, request
+from pydantic import BaseModel
+
+from .decorators import is_async_view, resolve_awaitable
+from .handler import Handler
+from .types import TCacheConfig
+
+__all__ = ["CacheBackend", "LRUCache", "CachedResponse", "HandlerCache"]
+
+DEFAULT_CACHE_CONFIG = {
+    # 缓存有效期（秒）
+    "ttl": 60,
+    # 默认 LRUCache 的最大条目数
+    "max_entries": 1024,
+    # 参与缓存 key 的请求头
+    "vary_headers": [],
+    # 自定义缓存后端，默认每个 Handler 一个 LRUCache
+    "backend": None,
+    # Cache-Control 响应头，None 时为 `max-age={ttl}`，False 时不设置
+    "cache_control": None,
+}
+
+# 不随缓存保存的响应头
+_SKIP_HEADERS = frozenset(["content-length", "date"])
+
+
+class CachedResponse:
+    """缓存的已序列化响应，`encoded` 保存压缩后的字节，命中时不再重复压缩"""
+
+    __slots__ = ("body", "status", "headers", "encoded")
+
+    def __init__(self, body: bytes, status: int, headers: List[Tuple[str, str]]) -> None:
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.encoded = dict()  # type: Dict[str, bytes]
+
+    @classmethod
+    def from_response(cls, resp: Response) -> "CachedResponse":
+        headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in _SKIP_HEADERS]
+        return cls(resp.get_data(), resp.status_code, headers)
+
+    def make_response(self) -> Response:
+        resp = current_app.response_class(self.body, status=self.status, headers=self.headers)
+        resp.cached_response = self  # type: ignore
+        return resp
+
+
+class CacheBackend(ABC):
+    """缓存后端接口，key 为 str，value 为 CachedResponse"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """删除以 prefix 开头的 key，返回删除的个数"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class LRUCache(CacheBackend):
+    """进程内有界 LRU 缓存，条目过期后在访问时淘汰"""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # type: OrderedDict[str, Tuple[float, CachedResponse]]
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=_normalize)
+
+
+def _normalize(value: Any) -> Any:
+    # set 的迭代顺序与插入顺序和 hash 随机化有关，排序后相同的值得到相同的 key
+    if isinstance(value, (set, frozenset)):
+        return {"$set": sorted(_dumps(v) for v in value)}
+    return str(value)
+
+
+def _digest(model: Optional[BaseModel]) -> str:
+    if model is None:
+        return "-"
+    return hashlib.blake2b(_dumps(model.dict()).encode(), digest_size=12).hexdigest()
+
+
+class HandlerCache:
+    """Handler 的响应缓存
+
+    key 由 Handler、校验后的 Path/Query 以及 `vary_headers` 组成，
+    只缓存 GET/HEAD 请求中 HTTP 200 且非 `context.error` 的非流式响应。
+    """
+
+    def __init__(self, cls: Type[Handler], cache_config: TCacheConfig) -> None:
+        unknown = set(cache_config) - set(DEFAULT_CACHE_CONFIG)
+        if unknown:
+            raise ValueError(f"unknown cache_config keys {sorted(unknown)} in `{cls.__name__}`")
+        config = {**DEFAULT_CACHE_CONFIG, **cache_config}  # type: Dict[str, Any]
+
+        self.handler = cls
+        self.ttl = config["ttl"]  # type: float
+        self.vary_headers = tuple(config["vary_headers"])  # type: Tuple[str, ...]
+        self.backend = config["backend"] or LRUCache(config["max_entries"])  # type: CacheBackend
+        cache_control = config["cache_control"]
+        if cache_control is None:
+            cache_control = f"max-age={int(self.ttl)}"
+        self.cache_control = cache_control or None  # type: Optional[str]
+        self._prefix = f"{cls.__module__}.{cls.__qualname__}:"
+        # 命中统计不加锁，并发时可能少计，每个请求不必竞争同一把锁
+        self.hits = 0
+        self.misses = 0
+
+    def _coerce(self, name: str, value: Any) -> Optional[BaseModel]:
+        model_cls = getattr(self.handler, name, None)  # type: Optional[Type[BaseModel]]
+        if model_cls is None or value is None or isinstance(value, model_cls):
+            return value
+        return model_cls.parse_obj(value)
+
+    def key(
+        self, query: Any = None, path: Any = None, headers: Optional[Dict[str, str]] = None
+    ) -> str:
+        query = self._coerce("Query", query)
+        path = self._coerce("Path", path)
+        key = f"{self._prefix}{_digest(path)}:{_digest(query)}"
+        if self.vary_headers:
+            headers = headers or {}
+            values = "\n".join(headers.get(name, "") for name in self.vary_headers)
+            key += ":" + hashlib.blake2b(values.encode(), digest_size=8).hexdigest()
+        return key
+
+    def invalidate(self, query: Any = None, path: Any = None) -> int:
+        """删除缓存，返回删除的条目数
+
+        - 都不传时删除该 Handler 的所有缓存
+        - 声明了 Path 时 query 必须和 path 一起传入
+        - 忽略 `vary_headers`，删除所有请求头的变体
+        """
+        if query is None and path is None:
+            return self.backend.delete_prefix(self._prefix)
+        if query is not None and path is None and getattr(self.handler, "Path", None):
+            raise ValueError("`path` is required to invalidate by query")
+        prefix = f"{self._prefix}{_digest(self._coerce('Path', path))}:"
+        if query is not None or not getattr(self.handler, "Query", None):
+            prefix += f"{_digest(self._coerce('Query', query))}"
+        return self.backend.delete_prefix(prefix)
+
+    def clear(self) -> None:
+        """删除该 Handler 的所有缓存并清零命中统计"""
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.backend)}
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _request_key(self, kwargs: Dict[str, Any]) -> Optional[str]:
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return self.key(kwargs.get("query"), kwargs.get("path"), request.headers)  # type: ignore
+
+    def lookup(self, key: str) -> Optional[Response]:
+        cached = self.backend.get(key)
+        self._count(cached is not None)
+        if cached is None:
+            return None
+        resp = cached.make_response()
+        if "ETag" in resp.headers:
+            resp.make_conditional(request)
+        return self._set_cache_control(resp)
+
+    def store(self, key: str, rv: Any) -> Response:
+        resp = current_app.make_response(rv)
+        if (
+            resp.status_code == 200
+            and not resp.is_streamed
+            and not g.get("_envelope_error")
+            and "Set-Cookie" not in resp.headers
+        ):
+            self.backend.set(key, CachedResponse.from_response(resp), self.ttl)
+        return self._set_cache_control(resp)
+
+    def _set_cache_control(self, resp: Response) -> Response:
+        if self.cache_control and "Cache-Control" not in resp.headers:
+            resp.headers["Cache-Control"] = self.cache_control
+        if self.vary_headers:
+            # 下游的共享缓存也需要按这些请求头区分响应
+            resp.vary.update(self.vary_headers)
+        return resp
+
+
+def cache_decorator(cls: Type[Handler]) -> Callable:
+    """缓存 handle 的响应，命中时跳过 handle 和序列化
+
+    位于用户装饰器之内，鉴权等装饰器在命中缓存时仍会执行
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        cache = cls.cache
+
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = cache._request_key(kwargs)
+                if key is None:
+                    return await resolve_awaitable(fn(*args, **kwargs))
+                resp = cache.lookup(key)
+                if resp is not None:
+                    return resp
+                return cache.store(key, await resolve_awaitable(fn(*args, **kwargs)))
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = cache._request_key(kwargs)
+            if key is None:
+                return fn(*args, **kwargs)
+            resp = cache.lookup(key)
+            if resp is not None:
+                return resp
+            return cache.store(key, fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,204 @@
+import atexit
+import base64
+import glob
+import gzip
+import json
+import os
+import random
+import time
+from io import BytesIO
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map
+
+__all__ = ["CaptureMiddleware", "read_capture_log", "capture_log_paths"]
+
+# 默认脱敏的请求头和 query 参数，值替换为 REDACTED，比较时不区分大小写，`-` 和 `_` 视为相同
+DEFAULT_REDACT_HEADERS = (
+    "Authorization",
+    "Proxy-Authorization",
+    "Cookie",
+    "X-Api-Key",
+    "X-Cibo-Profile",
+    "Token",
+    "Access-Token",
+    "Api-Key",
+)
+REDACTED = "[redacted]"
+
+MAX_BODY_SIZE = 64 * 1024
+MAX_LOG_SIZE = 256 * 1024 * 1024
+
+
+class CaptureMiddleware:
+    """采样记录请求，写入 gzip 压缩的 NDJSON 日志，用 `cibo replay` 回放
+
+    每行一个请求: endpoint, method, path, query, headers, body
+    - 每个进程写入 `{path}.{pid}`，pre-fork 的各个 worker 不会交错写入同一个 gzip 文件
+    - body 超过 max_body_size 时不读取也不记录，只标记 `body_omitted`
+    - redact_headers 中的请求头和同名的 query 参数替换为 REDACTED
+    - 每个进程的日志未压缩的大小超过 max_log_size 后停止记录
+    """
+
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        path: str,
+        *,
+        url_map: Optional[Map] = None,
+        sample_rate: float = 1.0,
+        max_body_size: int = MAX_BODY_SIZE,
+        max_log_size: int = MAX_LOG_SIZE,
+        redact_headers: Iterable[str] = DEFAULT_REDACT_HEADERS,
+    ) -> None:
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self.url_map = url_map
+        self.sample_rate = sample_rate
+        self.max_body_size = max_body_size
+        self.max_log_size = max_log_size
+        self.redact_headers = frozenset(_redact_key(h) for h in redact_headers)
+        self.size = 0
+        self._file = None  # type: Optional[Any]
+        self._flushed_at = 0.0
+        self._lock = Lock()
+        atexit.register(self.close)
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        if self.size < self.max_log_size and (
+            self.sample_rate >= 1 or random.random() < self.sample_rate
+        ):
+            self.write(self.capture(environ))
+        return self.wsgi_app(environ, start_response)
+
+    def capture(self, environ: Dict[str, Any]) -> Dict[str, Any]:
+        """生成记录，读取过的请求体放回 `wsgi.input`"""
+        record = {
+            "ts": round(time.time(), 3),
+            "method": environ.get("REQUEST_METHOD", "GET"),
+            "path": environ.get("PATH_INFO", "/"),
+        }  # type: Dict[str, Any]
+        endpoint = self._endpoint(environ)
+        if endpoint:
+            record["endpoint"] = endpoint
+        query = environ.get("QUERY_STRING")
+        if query:
+            record["query"] = self._query(query)
+        record["headers"] = self._headers(environ)
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > self.max_body_size:
+            record["body_omitted"] = length
+        elif length > 0:
+            body = environ["wsgi.input"].read(length)
+            environ["wsgi.input"] = BytesIO(body)
+            try:
+                record["body"] = body.decode()
+            except UnicodeDecodeError:
+                record["body_b64"] = base64.b64encode(body).decode()
+        return record
+
+    def _endpoint(self, environ: Dict[str, Any]) -> Optional[str]:
+        if self.url_map is None:
+            return None
+        try:
+            rule, _ = self.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None
+        return rule.endpoint
+
+    def _headers(self, environ: Dict[str, Any]) -> Dict[str, str]:
+        headers = dict()
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                name = key[5:].replace("_", "-").title()
+            elif key == "CONTENT_TYPE" and value:
+                name = "Content-Type"
+            else:
+                continue
+            headers[name] = REDACTED if _redact_key(name) in self.redact_headers else value
+        return headers
+
+    def _query(self, query: str) -> str:
+        params = parse_qsl(query, keep_blank_values=True)
+        if not any(_redact_key(k) in self.redact_headers for k, _ in params):
+            # 没有需要脱敏的参数时保留原始的 query string
+            return query
+        return urlencode(
+            [(k, REDACTED if _redact_key(k) in self.redact_headers else v) for k, v in params]
+        )
+
+    @property
+    def log_path(self) -> str:
+        """当前进程的日志文件，在 fork 之后的 worker 中才确定"""
+        return f"{self.path}.{os.getpid()}"
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            if self.size >= self.max_log_size:
+                return
+            if self._file is None:
+                # 追加为新的 gzip member，pid 重复时写同一个文件也能连续读取
+                self._file = gzip.open(self.log_path, "ab")
+            self._file.write(line)
+            self.size += len(line)
+            # 每秒最多 flush 一次，进程被终止时日志仍可读到最近的记录
+            now = time.monotonic()
+            if now - self._flushed_at > 1.0:
+                self._file.flush()
+                self._flushed_at = now
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _redact_key(name: str) -> str:
+    return name.lower().replace("_", "-")
+
+
+def capture_log_paths(path: str) -> List[str]:
+    """path 可以是单个文件、glob，或 `capture_log` 本身（匹配各进程的 `{path}.{pid}`）"""
+    if os.path.isfile(path):
+        return [path]
+    paths = glob.glob(path) if any(c in path for c in "*?[") else []
+    if not paths:
+        paths = glob.glob(f"{glob.escape(path)}.[0-9]*")
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def read_capture_log(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 CaptureMiddleware 的日志，path 的含义同 `capture_log_paths`
+
+    末尾不完整的行（进程被终止）会被忽略
+    """
+    for file_path in capture_log_paths(path):
+        with gzip.open(file_path, "rb") as f:
+            try:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            except EOFError:
+                continue
+
+
+def record_body(record: Dict[str, Any]) -> bytes:
+    if "body_b64" in record:
+        return base64.b64decode(record["body_b64"])
+    return record.get("body", "").encode()
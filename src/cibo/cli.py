@@ -0,0 +1,112 @@
+import json
+import sys
+from importlib import import_module
+from typing import Optional, Tuple
+
+import click
+
+from .app import Flask
+
+__all__ = ["main"]
+
+
+def locate_app(target: str) -> Flask:
+    """`module:attr`，attr 为 cibo.Flask 实例或返回实例的工厂函数，默认 `create_app`"""
+    sys.path.insert(0, ".")
+    module_name, _, attr = target.partition(":")
+    module = import_module(module_name)
+    obj = getattr(module, attr or "create_app")
+    app = obj if isinstance(obj, Flask) else obj()
+    if not isinstance(app, Flask):
+        raise click.BadParameter(f"`{target}` is not a cibo.Flask app", param_hint="TARGET")
+    return app
+
+
+@click.group()
+def main():
+    """cibo command line tools"""
+
+
+@main.group()
+def spec():
+    """OpenAPI spec"""
+
+
+@spec.command("export")
+@click.argument("target")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="defaults to stdout")
+@click.option("-f", "--format", "spec_format", type=click.Choice(["json", "yaml"]), default="json")
+def export_spec(target: str, output: str, spec_format: str):
+    """Build the spec of TARGET (`module:create_app`) at build time.
+
+    Load the json file with `Flask(prebuilt_spec=...)` so workers never run apispec.
+    """
+    app = locate_app(target)
+    with app.app_context():
+        data = app.dump_spec(app._get_spec(), spec_format)
+    if output:
+        with open(output, "wb") as f:
+            f.write(data)
+    else:
+        click.echo(data.decode())
+
+
+@main.command("replay")
+@click.argument("log")
+@click.argument("target", required=False)
+@click.option(
+    "--url", help="replay over a socket, `http://127.0.0.1:5000` or `unix:///path/app.sock`"
+)
+@click.option("-c", "--concurrency", type=int, default=1, show_default=True)
+@click.option("-r", "--rate", type=float, help="requests per second in total, unlimited by default")
+@click.option("-n", "--limit", type=int, help="replay the first N requests")
+@click.option(
+    "-H", "--header", "headers", multiple=True, help="`Name: value`, e.g. for redacted auth headers"
+)
+@click.option("--json", "as_json", is_flag=True, help="print the report as json")
+def replay_log(
+    log: str,
+    target: Optional[str],
+    url: Optional[str],
+    concurrency: int,
+    rate: Optional[float],
+    limit: Optional[int],
+    headers: Tuple[str, ...],
+    as_json: bool,
+):
+    """Replay LOG recorded by `Flask(capture_log=...)`.
+
+    LOG is the `capture_log` path (reads the `{path}.{pid}` file of every process),
+    a single file, or a quoted glob.
+
+    Runs TARGET (`module:create_app`) in-process, or sends the requests to --url.
+    Reports p50/p95/p99 latency and error envelopes per endpoint.
+    """
+    from .capture import capture_log_paths, read_capture_log
+    from .replay import HttpTarget, InProcessTarget, format_report, replay
+
+    if bool(target) == bool(url):
+        raise click.UsageError("pass either TARGET or --url")
+    if not capture_log_paths(log):
+        raise click.BadParameter(f"no capture log matches `{log}`", param_hint="LOG")
+    extra_headers = dict()
+    for header in headers:
+        name, sep, value = header.partition(":")
+        if not sep:
+            raise click.BadParameter(f"`{header}` is not `Name: value`", param_hint="--header")
+        extra_headers[name.strip()] = value.strip()
+
+    replay_target = HttpTarget(url) if url else InProcessTarget(locate_app(target))  # type: ignore
+    report = replay(
+        read_capture_log(log),
+        replay_target,
+        concurrency=concurrency,
+        rate=rate,
+        headers=extra_headers,
+        limit=limit,
+    )
+    click.echo(json.dumps(report, indent=2) if as_json else format_report(report))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
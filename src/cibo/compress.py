@@ -0,0 +1,125 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple
+
+from flask import Response, request
+
+__all__ = ["Compressor"]
+
+# 已经压缩过的类型，再压缩只会浪费 CPU
+SKIP_MIMETYPE_PREFIXES = ("image/", "video/", "audio/")
+SKIP_MIMETYPES = frozenset(
+    [
+        "application/zip",
+        "application/gzip",
+        "application/x-gzip",
+        "application/x-bzip2",
+        "application/x-xz",
+        "application/x-7z-compressed",
+        "application/x-rar-compressed",
+        "application/octet-stream",
+        "font/woff",
+        "font/woff2",
+    ]
+)
+# 可压缩的图片
+COMPRESSIBLE_MIMETYPES = frozenset(["image/svg+xml", "image/bmp"])
+
+
+class Compressor:
+    """按 Accept-Encoding 压缩响应（gzip/deflate），注册为 after_request
+
+    - 小于 `min_size` 的响应不压缩，流式响应逐块压缩
+    - 已有 Content-Encoding、已压缩的类型、`direct_passthrough`（send_file）不处理
+    - 来自响应缓存的响应复用缓存中已压缩的字节
+    """
+
+    def __init__(
+        self,
+        min_size: int = 500,
+        level: int = 6,
+        encodings: Tuple[str, ...] = ("gzip", "deflate"),
+    ) -> None:
+        self.min_size = min_size
+        self.level = level
+        self.encodings = encodings
+
+    def negotiate(self) -> Optional[str]:
+        """返回客户端接受且 q 值最高的编码，相同时按 `encodings` 的顺序"""
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = request.accept_encodings[encoding]
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    @staticmethod
+    def is_compressible(resp: Response) -> bool:
+        mimetype = resp.mimetype or ""
+        if mimetype in COMPRESSIBLE_MIMETYPES:
+            return True
+        return mimetype not in SKIP_MIMETYPES and not mimetype.startswith(SKIP_MIMETYPE_PREFIXES)
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == "gzip":
+            return gzip.compress(data, self.level, mtime=0)
+        return zlib.compress(data, self.level)
+
+    def compress_stream(self, chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+        wbits = 31 if encoding == "gzip" else 15
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            # 每块都 flush，客户端可以立即解压已收到的数据
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def __call__(self, resp: Response) -> Response:
+        if (
+            resp.status_code < 200
+            or resp.status_code in (204, 304)
+            or resp.direct_passthrough
+            or "Content-Encoding" in resp.headers
+            or not self.is_compressible(resp)
+        ):
+            return resp
+        if not resp.is_streamed and (resp.calculate_content_length() or 0) < self.min_size:
+            return resp
+
+        resp.vary.add("Accept-Encoding")
+        encoding = self.negotiate()
+        if encoding is None:
+            return resp
+
+        if resp.is_streamed:
+            resp.response = self._wrap_stream(resp.response, resp.iter_encoded(), encoding)
+            resp.headers.pop("Content-Length", None)
+        else:
+            resp.set_data(self._compress_body(resp, encoding))
+        resp.headers["Content-Encoding"] = encoding
+        # 压缩后内容与原始字节不同，强 ETag 改为弱 ETag
+        etag, weak = resp.get_etag()
+        if etag and not weak:
+            resp.set_etag(etag, weak=True)
+        return resp
+
+    def _compress_body(self, resp: Response, encoding: str) -> bytes:
+        cached = getattr(resp, "cached_response", None)
+        if cached is None or cached.status != resp.status_code:
+            return self.compress(resp.get_data(), encoding)
+        data = cached.encoded.get(encoding)
+        if data is None:
+            data = cached.encoded[encoding] = self.compress(cached.body, encoding)
+        return data
+
+    def _wrap_stream(
+        self, iterable: Iterable, chunks: Iterable[bytes], encoding: str
+    ) -> Iterator[bytes]:
+        try:
+            yield from self.compress_stream(chunks, encoding)
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
@@ -1,14 +1,35 @@
-from typing import Tuple
+import hashlib
+from time import perf_counter
+from typing import Any, Iterable, Optional, Tuple
 
-from flask import Response
+from flask import Response, current_app, g, has_app_context, has_request_context, request
 
 from .utils import error as _error
-from .utils import jsonify_with_encoder
+from .utils import jsonify_with_encoder, stream_ndjson_success, stream_success
 from .utils import success as _success
 
 __all__ = ["Context", "ErrorContext", "SimpleContext"]
 
 
+def _etag_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _make_conditional(rv: Tuple[Response, int]) -> Tuple[Response, int]:
+    """设置弱 ETag，If-None-Match 匹配时改为 304"""
+    if not has_request_context() or request.method not in ("GET", "HEAD"):
+        return rv
+    etag = g.get("_etag_version")
+    if etag is None:
+        if not g.get("_etag"):
+            return rv
+        etag = _etag_digest(rv[0].get_data())
+    resp = rv[0]
+    resp.set_etag(etag, weak=True)
+    resp.make_conditional(request)
+    return resp, resp.status_code
+
+
 class Context:
     @staticmethod
     def success(
@@ -17,10 +38,67 @@ class Context:
         jsonify_func=jsonify_with_encoder,
         **data,
     ) -> Tuple[Response, int]:
-        return _success(
+        times = g.get("_phase_times") if has_app_context() else None
+        start = perf_counter() if times is not None else 0.0
+        resp_plan = g.get("_resp_plan") if has_app_context() else None
+        if resp_plan is not None and jsonify_func is jsonify_with_encoder:
+            rv = resp_plan.success(status_message=status_message, status_code=status_code, **data)
+        else:
+            rv = _success(
+                status_message=status_message,
+                status_code=status_code,
+                jsonify_func=jsonify_func,
+                **data,
+            )
+        rv = _make_conditional(rv)
+        if times is not None:
+            times["serialize"] = times.get("serialize", 0.0) + perf_counter() - start
+        return rv
+
+    @staticmethod
+    def if_none_match(version: Any) -> Optional[Tuple[Response, int]]:
+        """用 handler 提供的版本号作为 ETag，与 If-None-Match 相同时返回 304，否则返回 None
+
+        版本号需要能唯一标识响应内容（包括 query 等参数的影响），匹配时不会查询和序列化数据
+
+        >>> return context.if_none_match(article.updated_at) or context.success(...)
+        """
+        etag = g._etag_version = _etag_digest(str(version).encode())
+        if request.if_none_match.contains_weak(etag):
+            resp = current_app.response_class(status=304)
+            resp.set_etag(etag, weak=True)
+            return resp, 304
+        return None
+
+    @staticmethod
+    def stream_success(
+        items: Iterable,
+        status_message: str = "ok",
+        status_code: int = 200,
+        items_key: str = "items",
+        **data,
+    ) -> Tuple[Response, int]:
+        """流式返回 {"status_code", "status_message", "success", **data, "items": [...]}"""
+        return stream_success(
+            items,
+            status_message=status_message,
+            status_code=status_code,
+            items_key=items_key,
+            **data,
+        )
+
+    @staticmethod
+    def stream_ndjson(
+        items: Iterable,
+        status_message: str = "ok",
+        status_code: int = 200,
+        **data,
+    ) -> Tuple[Response, int]:
+        """流式返回 NDJSON，首行为响应信封"""
+        return stream_ndjson_success(
+            items,
             status_message=status_message,
             status_code=status_code,
-            jsonify_func=jsonify_func,
             **data,
         )
 
@@ -31,12 +109,21 @@ class Context:
         jsonify_func=jsonify_with_encoder,
         **data,
     ) -> Tuple[Response, int]:
-        return _error(
+        times = None
+        if has_app_context():
+            # 响应缓存不保存错误信封
+            g._envelope_error = True
+            times = g.get("_phase_times")
+        start = perf_counter() if times is not None else 0.0
+        rv = _error(
             status_message=status_message,
             status_code=status_code,
             jsonify_func=jsonify_func,
             **data,
         )
+        if times is not None:
+            times["serialize"] = times.get("serialize", 0.0) + perf_counter() - start
+        return rv
 
 
 class ErrorContext(Context):
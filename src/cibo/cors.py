@@ -1,8 +1,11 @@
+import re
 from functools import wraps
-from typing import Callable, Type, TypeVar
+from time import perf_counter
+from typing import Any, Callable, Optional, Pattern, Tuple, Type, TypeVar
 
-from flask import g
+from flask import current_app, g, request
 
+from .decorators import is_async_view, resolve_awaitable
 from .handler import Handler
 from .types import TCorsConfig, TFlaskResponse
 
@@ -17,37 +20,146 @@ DEFAULT_CORS_CONFIG = {
         "Content-Type",
     ],
     "Access-Control-Allow-Methods": ["GET", "POST", "OPTIONS"],
+    "Access-Control-Max-Age": 600,
 }
 
+# 只在预检响应中返回的响应头
+_PREFLIGHT_ONLY = frozenset(["Access-Control-Max-Age"])
+
 _R = TypeVar("_R", bound=TFlaskResponse)
 
 
-def _set_cors_headers(resp: _R, cors_config: TCorsConfig) -> _R:
-    if cors_config is not None:
-        if isinstance(resp, tuple):
-            r = resp[0]
-        else:
-            r = resp
-        if not r.headers.get("Access-Control-Allow-Origin"):
-            for k, v in DEFAULT_CORS_CONFIG.items():
-                if k in cors_config:
-                    r.headers.add(k, ",".join(cors_config[k]))
-                else:
-                    r.headers.add(k, ",".join(v))
-    return resp
+def _join(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ",".join(str(v) for v in value)
+    return str(value)
+
+
+class CorsPolicy:
+    """由 cors_config 在注册 Handler 时生成，请求时只做集合/正则匹配和添加响应头
+
+    `Access-Control-Allow-Origin` 支持 `*`、来源列表和 `https://*.example.com` 形式的通配
+    """
+
+    __slots__ = ("allow_any_origin", "origins", "origin_pattern", "headers", "preflight_headers")
+
+    def __init__(self, cors_config: TCorsConfig) -> None:
+        config = {**DEFAULT_CORS_CONFIG, **cors_config}
+        origins = config.pop("Access-Control-Allow-Origin")
+        if isinstance(origins, str):
+            origins = [origin.strip() for origin in origins.split(",")]
+        credentials = _join(config.get("Access-Control-Allow-Credentials", False)) == "true"
+
+        # 允许携带凭证时浏览器不接受 `*`，需要返回请求的 Origin
+        self.allow_any_origin = "*" in origins and not credentials
+        self.origins = frozenset(origin for origin in origins if "*" not in origin)
+        patterns = [
+            ".+" if origin == "*" else re.escape(origin).replace(r"\*", "[^./]+")
+            for origin in origins
+            if "*" in origin
+        ]
+        self.origin_pattern: Optional[Pattern[str]] = (
+            re.compile("|".join(patterns)) if patterns and not self.allow_any_origin else None
+        )
+
+        headers = tuple((k, _join(v)) for k, v in config.items())
+        self.headers = tuple(
+            (k, v) for k, v in headers if k not in _PREFLIGHT_ONLY
+        )  # type: Tuple[Tuple[str, str], ...]
+        self.preflight_headers = headers
+
+    def allow_origin(self, origin: Optional[str]) -> Optional[str]:
+        """返回 Access-Control-Allow-Origin 的值，不允许时返回 None"""
+        if self.allow_any_origin:
+            return "*"
+        if not origin:
+            return None
+        if origin in self.origins:
+            return origin
+        if self.origin_pattern is not None and self.origin_pattern.fullmatch(origin):
+            return origin
+        return None
+
+    def _add_headers(self, r, headers: Tuple[Tuple[str, str], ...]) -> None:
+        if r.headers.get("Access-Control-Allow-Origin"):
+            return
+        allow_origin = self.allow_origin(request.headers.get("Origin"))
+        if allow_origin is None:
+            return
+        r.headers.add("Access-Control-Allow-Origin", allow_origin)
+        if allow_origin != "*":
+            r.vary.add("Origin")
+        for k, v in headers:
+            r.headers.add(k, v)
+
+    def apply(self, resp: _R) -> _R:
+        times = g.get("_phase_times")
+        start = perf_counter() if times is not None else 0.0
+        self._add_headers(resp[0] if isinstance(resp, tuple) else resp, self.headers)
+        if times is not None:
+            times["cors"] = times.get("cors", 0.0) + perf_counter() - start
+        return resp
+
+    def preflight(self):
+        times = g.get("_phase_times")
+        start = perf_counter() if times is not None else 0.0
+        resp = current_app.response_class(status=204)
+        self._add_headers(resp, self.preflight_headers)
+        if times is not None:
+            times["cors"] = times.get("cors", 0.0) + perf_counter() - start
+        return resp
 
 
 def enable_cors_decorator(cls: Type[Handler]) -> Callable:
-    """允许跨域"""
+    """允许跨域，OPTIONS 预检请求在最外层直接返回，不创建 context、不绑定参数
+
+    `cors_config = {}` 时与之前一样只允许 OPTIONS 方法，不添加跨域响应头
+    """
+    if not cls.cors_config:
+        return _without_cors_headers(cls)
+    policy = CorsPolicy(cls.cors_config)
 
     def decorator(fn: Callable) -> Callable:
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if request.method == "OPTIONS":
+                    return policy.preflight()
+                g.cors_config = cls.cors_config
+                return policy.apply(await resolve_awaitable(fn(*args, **kwargs)))
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return policy.preflight()
+            g.cors_config = cls.cors_config
+            return policy.apply(fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def _without_cors_headers(cls: Type[Handler]) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                g.cors_config = cls.cors_config
+                return await resolve_awaitable(fn(*args, **kwargs))
+
+            return async_wrapper
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
             g.cors_config = cls.cors_config
-            resp = fn(*args, **kwargs)
-            if cls.cors_config:
-                _set_cors_headers(resp, cls.cors_config)
-            return resp
+            return fn(*args, **kwargs)
 
         return wrapper
 
@@ -0,0 +1,171 @@
+import json
+import re
+import sys
+from typing import Any, List, Optional, Tuple, Union
+
+from typing_extensions import get_args, get_origin
+from werkzeug.datastructures import MultiDict
+
+__all__ = ["DecodeError", "FieldDecoder", "check_json_limits", "decode_container_value"]
+
+# 单个参数值的最大长度、嵌套深度、元素个数，防止恶意参数消耗 CPU
+MAX_VALUE_LENGTH = 4096
+MAX_DEPTH = 8
+MAX_ITEMS = 1000
+
+_MISSING = object()
+# 只匹配单个字节，不会回溯，字符串和转义由 check_json_limits 中的状态跟踪
+_JSON_SPECIAL_PATTERN = re.compile(rb'[\[\]{},"\\]')
+_QUOTE, _BACKSLASH, _COMMA = b'"\\,'
+_OPENINGS, _CLOSINGS = frozenset(b"[{"), frozenset(b"]}")
+
+
+class DecodeError(ValueError):
+    ...
+
+
+def check_json_limits(data: bytes, max_depth: Optional[int], max_items: Optional[int]) -> None:
+    """不解析 json，线性扫描一遍括号、逗号、引号和转义，检查嵌套深度和单个容器的元素个数"""
+    depth_limit = max_depth or sys.maxsize
+    items_limit = max_items or sys.maxsize
+    commas = []  # type: List[int]
+    in_string = False
+    # 被转义的字符的位置，该字符不参与判断
+    escaped = -1
+    for m in _JSON_SPECIAL_PATTERN.finditer(data):
+        pos = m.start()
+        if pos == escaped:
+            continue
+        char = data[pos]
+        if in_string:
+            if char == _BACKSLASH:
+                escaped = pos + 1
+            elif char == _QUOTE:
+                in_string = False
+        elif char == _QUOTE:
+            in_string = True
+        elif char in _OPENINGS:
+            commas.append(0)
+            if len(commas) > depth_limit:
+                raise DecodeError(f"nesting depth exceeds {max_depth}")
+        elif char in _CLOSINGS:
+            if commas:
+                commas.pop()
+        elif char == _COMMA and commas:
+            commas[-1] += 1
+            # n 个逗号分隔 n+1 个元素
+            if commas[-1] >= items_limit:
+                raise DecodeError(f"number of items exceeds {max_items}")
+
+
+def _split(value: str) -> List[str]:
+    """`a,b` 或 `[a, 'b']`"""
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    if not value.strip():
+        return []
+    return [v.strip().strip("'\"") for v in value.split(",")]
+
+
+def decode_container_value(
+    value: str, max_length: int = MAX_VALUE_LENGTH, max_depth: int = MAX_DEPTH
+) -> Any:
+    """解码 `[...]` 和 `{...}` 形式的参数值，其它值原样返回"""
+    if len(value) > max_length:
+        raise DecodeError(f"value length exceeds {max_length}")
+    if value[:1] in ("[", "{"):
+        # 解析前检查嵌套深度，深度超限的值不会进入 json.loads
+        check_json_limits(value.encode(), max_depth, None)
+    if value[:1] == "[":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return _split(value)
+    elif value[:1] == "{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise DecodeError("value is not a valid json object")
+    return value
+
+
+def _container_kind(tp: Any) -> Optional[str]:
+    origin = get_origin(tp)
+    if origin is Union:
+        kinds = {_container_kind(arg) for arg in get_args(tp) if arg is not type(None)}
+        return kinds.pop() if len(kinds) == 1 else None
+    if origin in (list, set, frozenset, tuple):
+        return "array"
+    elif origin is dict:
+        return "object"
+    return None
+
+
+class FieldDecoder:
+    """按字段声明的类型解码 query 参数
+
+    - array: `?b=1&b=2`（style=form, explode=true）、`?b=1,2`、`?b=[1,2]`
+    - object: `?c[k]=1`（style=deepObject）、`?c={"k":1}`
+    """
+
+    __slots__ = ("name", "kind", "style", "max_length", "max_depth", "max_items", "_prefix")
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        max_length: int = MAX_VALUE_LENGTH,
+        max_depth: int = MAX_DEPTH,
+        max_items: int = MAX_ITEMS,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.style = "deepObject" if kind == "object" else "form"
+        self.max_length = max_length
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self._prefix = f"{name}["
+
+    @classmethod
+    def for_field(cls, name: str, field, **limits) -> Optional["FieldDecoder"]:
+        kind = _container_kind(field.outer_type_)
+        if kind is None and field.allow_none:
+            kind = _container_kind(Optional[field.outer_type_])
+        return cls(name, kind, **limits) if kind else None
+
+    def _check_items(self, value: Any) -> Any:
+        if isinstance(value, (list, dict)) and len(value) > self.max_items:
+            raise DecodeError(f"number of items exceeds {self.max_items}")
+        return value
+
+    def decode(self, query: MultiDict) -> Any:
+        if self.kind == "array":
+            return self._decode_array(query)
+        return self._decode_object(query)
+
+    def _decode_array(self, query: MultiDict) -> Any:
+        values = query.getlist(self.name)
+        if not values:
+            return _MISSING
+        if len(values) > 1:
+            return self._check_items(values)
+        value = values[0]
+        if len(value) > self.max_length:
+            raise DecodeError(f"value length exceeds {self.max_length}")
+        if value[:1] == "[":
+            return self._check_items(decode_container_value(value, self.max_length, self.max_depth))
+        return self._check_items(_split(value))
+
+    def _decode_object(self, query: MultiDict) -> Any:
+        items: List[Tuple[str, str]] = []
+        prefix = self._prefix
+        start = len(prefix)
+        for k, v in query.items(multi=True):
+            if k.startswith(prefix) and k.endswith("]"):
+                items.append((k[start:-1], v))
+        if items:
+            return self._check_items(dict(items))
+        value = query.get(self.name)
+        if value is None:
+            return _MISSING
+        return self._check_items(decode_container_value(value, self.max_length, self.max_depth))
@@ -1,79 +1,60 @@
 import inspect
 from functools import wraps
-from typing import Callable, Dict, Optional, Type
+from time import perf_counter
+from typing import Any, Callable, Type
 
-from flask import g, request
-from pydantic import BaseModel
+from flask import current_app, g
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from .args import BaseApiBody, BaseApiPath, BaseApiQuery
 from .handler import Handler
 
 
+def is_async_view(cls: Type[Handler], fn: Callable) -> bool:
+    """handle 为协程，或用户装饰器返回协程时，外层装饰器也需要是协程"""
+    return cls.is_async() or inspect.iscoroutinefunction(fn)
+
+
+async def resolve_awaitable(rv: Any) -> Any:
+    """同步装饰器包装协程时会原样返回协程对象"""
+    while inspect.isawaitable(rv):
+        rv = await rv
+    return rv
+
+
 def inject_args_decorator(cls: Type[Handler]) -> Callable:
     """inject body & query"""
 
     def decorator(fn):
-        view_func = getattr(cls, cls.handle_func_name)
-        func_sig = inspect.signature(view_func, follow_wrapped=True)
-        if "context" not in func_sig.parameters:
-            raise Exception(f"param `context` does't found in `{view_func}`")
-        context = func_sig.parameters.get("context")
-        if not context:
-            raise Exception("Not Found context")
-        if not issubclass(context.annotation, cls.context_cls):
-            # if _context is not sig.parameters.get("context").annotation:
-            raise Exception(f"`{context.name}` must specify annotation `{cls.context_cls}`")
-
-        parameter_map = {}  # type: Dict[str, Type[BaseModel]]
-        Query = getattr(cls, "Query", None)  # type: Optional[Type[BaseApiQuery]]
-        Body = getattr(cls, "Body", None)  # type: Optional[Type[BaseApiBody]]
-        Path = getattr(cls, "Path", None)  # type: Optional[Type[BaseApiPath]]
-
-        def _validate_query_and_body_parameters(type_: str, class_, parameter_map: Dict):
-            if type_ in func_sig.parameters:
-                api_args = func_sig.parameters.get(type_)
-                if not api_args:
-                    raise Exception()
-                if not class_:
-                    raise Exception(
-                        f"`query` exists in {cls.handle_func_name}'s params but `{class_.__name__}` not found in `class {cls.__name__}`"
-                    )
-                elif not issubclass(class_, BaseModel):
-                    raise Exception(f"{class_.__name__} object is not subclass of BaseModel")
-                elif api_args.annotation is not class_:
-                    raise Exception(f"parameter query type not match cls.{class_.__name__}")
-                else:
-                    parameter_map[type_] = class_
-            else:
-                if class_:
-                    raise Exception(f"handle method not have query parameter")
-
-        _validate_query_and_body_parameters("query", Query, parameter_map)
-        _validate_query_and_body_parameters("body", Body, parameter_map)
-        _validate_query_and_body_parameters("path", Path, parameter_map)
+        binder = cls.binder
+
+        def _bind(kwargs):
+            times = g.get("_phase_times")
+            if times is None:
+                return binder.bind(kwargs)
+            start = perf_counter()
+            try:
+                return binder.bind(kwargs)
+            finally:
+                times["bind"] = times.get("bind", 0.0) + perf_counter() - start
+
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    parameters = _bind(kwargs)
+                except RequestEntityTooLarge as e:
+                    return cls.context_cls.error(e.description, 413)
+                return await resolve_awaitable(fn(*args, **kwargs, **parameters))
+
+            return async_wrapper
 
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            parameters = {}
-            if "query" in parameter_map:
-                query = request.args
-                parameters["query"] = Query.parse_request_args(query)  # type:ignore
-            if "body" in parameter_map and Body:
-                if request.content_type == "application/json":
-                    body = dict(request.json) if request.json else {}
-                    parameters["body"] = Body.parse_obj(body)
-                elif request.content_type == "application/x-www-form-urlencoded":
-                    body = Body.parse_form_args(request.form) if request.form else {}  # type:ignore
-                    parameters["body"] = body
-                else:
-                    parameters["body"] = {}
-            if "path" in parameter_map and Path:
-                parameters["path"] = Path.parse_path_args(request.view_args)
-                for k, _ in request.view_args.items():
-                    if k in kwargs:
-                        del kwargs[k]
-                request.view_args.clear()
-
+            try:
+                parameters = _bind(kwargs)
+            except RequestEntityTooLarge as e:
+                return cls.context_cls.error(e.description, 413)
             return fn(*args, **kwargs, **parameters)
 
         return wrapper
@@ -82,11 +63,26 @@ def inject_args_decorator(cls: Type[Handler]) -> Callable:
 
 
 def inject_context_decorator(cls: Type[Handler]) -> Callable:
+    def _make_context():
+        context = cls.context_cls()
+        g._context = context
+        g._resp_plan = cls.resp_plan
+        g._etag = cls.etag if cls.etag is not None else getattr(current_app, "etag", False)
+        return context
+
     def decorator(fn):
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                context = _make_context()
+                return await resolve_awaitable(fn(*args, context=context, **kwargs))
+
+            return async_wrapper
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            context = cls.context_cls()
-            g._context = context
+            context = _make_context()
             return fn(*args, context=context, **kwargs)
 
         return wrapper
@@ -1,31 +1,100 @@
-from typing import Callable, Dict, List, Optional, Set, Type
+import inspect
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Type
 
+from flask import Flask, request
 from flask.views import MethodView
 from pydantic import BaseModel
 from typing_extensions import Literal
 
 from .context import Context
-from .types import TCorsConfig
+from .types import TCacheConfig, TCorsConfig
+
+if TYPE_CHECKING:
+    from .binder import RequestBinder
+    from .cache import HandlerCache
+    from .serializer import RespPlan
 
 __all__ = ["Handler"]
 
 
+class _OpenAPIFragment:
+    """Handler 在 spec 中的 path/parameters/request_body/responses，第一次读取时才生成"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj: Any, owner: Type["Handler"]) -> Any:
+        return owner._openapi_fragments()[self.name]
+
+
 class Handler(MethodView):
 
     methods: Set[Literal["GET", "POST", "PUT", "DELETE"]]
     handle_func_name = "handle"
     decorators: List[Callable] = list()
     cors_config: Optional[TCorsConfig] = None
+    # 缓存 GET 响应，见 `cibo.cache.DEFAULT_CACHE_CONFIG`
+    cache_config: Optional[TCacheConfig] = None
+    cache: Optional["HandlerCache"] = None
 
     context_cls: Type[Context] = Context
 
+    # 按 Resp 字段预编译序列化计划，context.success 不再走通用的类型探测
+    fast_resp: bool = False
+    # fast_resp 时是否用 Resp 校验 handler 的输出，与通用的序列化一样默认不校验
+    validate_resp: bool = False
+    resp_plan: Optional["RespPlan"] = None
+
+    # GET 响应是否设置弱 ETag 并处理 If-None-Match，None 时使用 `Flask(etag=...)`
+    etag: Optional[bool] = None
+
+    # 随机采样用 cProfile 分析请求的比例，结果通过 `app.profiler` 或签名访问的 `profile_path` 读取
+    profile_sample_rate: float = 0.0
+
+    # 请求体的字节数、json 嵌套深度和单个容器元素个数上限，None 时使用蓝图的设置
+    max_body_bytes: Optional[int] = None
+    max_body_depth: Optional[int] = None
+    max_body_items: Optional[int] = None
+
     Query: Optional[BaseModel] = None
     Body: Optional[BaseModel] = None
 
-    path: List
-    parameters: List[Dict]
-    request_body: Dict
-    responses: Dict
+    path: List[Dict] = _OpenAPIFragment()  # type: ignore
+    parameters: List[Dict] = _OpenAPIFragment()  # type: ignore
+    request_body: Dict = _OpenAPIFragment()  # type: ignore
+    responses: Dict = _OpenAPIFragment()  # type: ignore
+
+    binder: "RequestBinder"
+
+    @classmethod
+    def is_async(cls) -> bool:
+        """handle 是否为 `async def`"""
+        return inspect.iscoroutinefunction(getattr(cls, cls.handle_func_name, None))
+
+    @classmethod
+    def _openapi_fragments(cls) -> Dict[str, Any]:
+        """只在生成 spec 时调用，每个类只生成一次"""
+        fragments = cls.__dict__.get("_cibo_openapi_fragments")
+        if fragments is None:
+            Path = getattr(cls, "Path", None)
+            Query = getattr(cls, "Query", None)
+            Body = getattr(cls, "Body", None)
+            Resp = getattr(cls, "Resp", None)
+            fragments = {
+                "path": Path.get_openapi_path() if Path else list(),
+                "parameters": list(Query.get_openapi_parameters()) if Query else list(),
+                "request_body": Body.get_openapi_request_body() if Body else dict(),
+                "responses": {"200": Resp.get_openapi_response()} if Resp else dict(),
+            }
+            setattr(cls, "_cibo_openapi_fragments", fragments)
+        return fragments
+
+    @classmethod
+    def invalidate(cls, query: Any = None, path: Any = None) -> int:
+        """删除缓存的响应，query/path 可以是模型实例或 dict，都不传时清空该 Handler 的缓存"""
+        if cls.cache is None:
+            raise RuntimeError(f"`{cls.__name__}` does not enable cache_config")
+        return cls.cache.invalidate(query=query, path=path)
 
     @classmethod
     def as_view(cls, name: str = None, *args, **kwargs):
@@ -33,4 +102,43 @@ class Handler(MethodView):
             raise ValueError(f"class `{cls}` does not have {cls.handle_func_name} method")
 
         name = name or cls.__name__
+        if cls.is_async():
+            return cls._as_async_view(name, *args, **kwargs)
         return super().as_view(name, *args, **kwargs)
+
+    @classmethod
+    def _as_async_view(cls, name: str, *class_args, **class_kwargs):
+        """与 `View.as_view` 相同，但生成的视图函数为协程函数，由 flask 的 ensure_sync 执行"""
+        if not hasattr(Flask, "ensure_sync"):
+            raise RuntimeError(
+                f"async handler `{cls.__name__}` requires flask>=2.0 and cibo[async]"
+            )
+
+        async def view(**kwargs):
+            self = view.view_class(*class_args, **class_kwargs)  # type: ignore
+            return await self.dispatch_request_async(**kwargs)
+
+        if cls.decorators:
+            view.__name__ = name
+            view.__module__ = cls.__module__
+            for decorator in cls.decorators:
+                view = decorator(view)
+
+        view.view_class = cls  # type: ignore
+        view.__name__ = name
+        view.__doc__ = cls.__doc__
+        view.__module__ = cls.__module__
+        view.methods = cls.methods  # type: ignore
+        view.provide_automatic_options = getattr(cls, "provide_automatic_options", None)  # type: ignore
+        return view
+
+    async def dispatch_request_async(self, **kwargs) -> Any:
+        meth = getattr(self, request.method.lower(), None)
+        if meth is None and request.method == "HEAD":
+            meth = getattr(self, "get", None)
+
+        assert meth is not None, f"Unimplemented method {request.method!r}"
+        rv = meth(**kwargs)
+        if inspect.isawaitable(rv):
+            rv = await rv
+        return rv
@@ -0,0 +1,333 @@
+import threading
+import weakref
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from flask import current_app, g, has_app_context, request
+
+from .decorators import is_async_view, resolve_awaitable
+from .handler import Handler
+
+__all__ = ["Metrics"]
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+PHASES = ("bind", "handle", "serialize", "cors", "decorators", "total")
+
+
+class _Shard:
+    """单个线程的计数，只有所属线程写入，读取时合并所有线程的分片"""
+
+    __slots__ = ("histograms", "in_flight", "statuses", "errors", "exceptions")
+
+    def __init__(self) -> None:
+        # (endpoint, phase) -> [各 bucket 计数..., +Inf 计数, 总耗时]
+        self.histograms: Dict[Tuple[str, str], List[float]] = dict()
+        self.in_flight: Dict[str, int] = dict()
+        self.statuses: Dict[Tuple[str, int], int] = dict()
+        self.errors: Dict[str, int] = dict()
+        self.exceptions: Dict[str, int] = dict()
+
+    def merge(self, other: "_Shard") -> None:
+        for key, values in other.histograms.copy().items():
+            total = self.histograms.setdefault(key, [0] * len(values))
+            for i, v in enumerate(list(values)):
+                total[i] += v
+        for name in ("in_flight", "statuses", "errors", "exceptions"):
+            counts = getattr(self, name)
+            for key, v in getattr(other, name).copy().items():
+                counts[key] = counts.get(key, 0) + v
+
+
+class _Owner:
+    """保存在 threading.local 中，线程结束时被回收，触发分片的合并"""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: _Shard) -> None:
+        self.shard = shard
+
+
+class Metrics:
+    """按 endpoint 统计各阶段耗时直方图、处理中的请求数和状态码
+
+    - bind: 解析和校验 query/body/path
+    - handle: handle 方法（不含 serialize）
+    - serialize: context.success/error 的 JSON 编码
+    - cors: 跨域响应头
+    - decorators: 其余部分，包括用户装饰器、context 创建、响应缓存
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: Set[_Shard] = set()
+        # 已结束的线程的分片合并到这里，线程池扩缩容时分片数不会一直增长
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            shard = _Shard()
+            owner = self._local.owner = _Owner(shard)
+            weakref.finalize(owner, self._retire, shard)
+            # 每个线程只在第一次记录时加锁
+            with self._lock:
+                self._shards.add(shard)
+        return owner.shard
+
+    def _retire(self, shard: _Shard) -> None:
+        """线程结束后不会再写入它的分片"""
+        with self._lock:
+            if shard in self._shards:
+                self._shards.discard(shard)
+                self._retired.merge(shard)
+
+    def observe(self, endpoint: str, phase: str, seconds: float) -> None:
+        histograms = self._shard().histograms
+        key = (endpoint, phase)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, seconds)] += 1
+        values[-1] += seconds
+
+    def add_in_flight(self, endpoint: str, n: int) -> None:
+        in_flight = self._shard().in_flight
+        in_flight[endpoint] = in_flight.get(endpoint, 0) + n
+
+    def count_status(self, endpoint: str, status: int, envelope_error: bool) -> None:
+        shard = self._shard()
+        key = (endpoint, status)
+        shard.statuses[key] = shard.statuses.get(key, 0) + 1
+        if envelope_error:
+            shard.errors[endpoint] = shard.errors.get(endpoint, 0) + 1
+
+    def count_exception(self, endpoint: str) -> None:
+        exceptions = self._shard().exceptions
+        exceptions[endpoint] = exceptions.get(endpoint, 0) + 1
+
+    def reset(self) -> None:
+        """清空所有线程的数据"""
+        old_local = self._local
+        with self._lock:
+            self._shards = set()
+            self._retired = _Shard()
+            self._local = threading.local()
+        # 旧的 threading.local 在锁外释放，其中的 _Owner 被回收时 _retire 还需要加锁
+        del old_local
+
+    def collect(self) -> _Shard:
+        """合并所有线程的分片"""
+        merged = _Shard()
+        with self._lock:
+            shards = list(self._shards)
+            merged.merge(self._retired)
+        for shard in shards:
+            merged.merge(shard)
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text format 0.0.4"""
+        merged = self.collect()
+        lines = [
+            "# HELP cibo_phase_duration_seconds Handler latency by phase.",
+            "# TYPE cibo_phase_duration_seconds histogram",
+        ]
+        for (endpoint, phase), values in sorted(merged.histograms.items()):
+            labels = f'endpoint="{_escape(endpoint)}",phase="{phase}"'
+            cumulative = 0
+            for le, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le_value = "+Inf" if le == float("inf") else repr(le)
+                lines.append(
+                    f'cibo_phase_duration_seconds_bucket{{{labels},le="{le_value}"}} {cumulative}'
+                )
+            lines.append(f"cibo_phase_duration_seconds_sum{{{labels}}} {values[-1]}")
+            lines.append(f"cibo_phase_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += [
+            "# HELP cibo_requests_in_flight Requests being handled.",
+            "# TYPE cibo_requests_in_flight gauge",
+        ]
+        for endpoint, n in sorted(merged.in_flight.items()):
+            lines.append(f'cibo_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {n}')
+
+        lines += [
+            "# HELP cibo_responses_total Responses by HTTP status.",
+            "# TYPE cibo_responses_total counter",
+        ]
+        for (endpoint, status), n in sorted(merged.statuses.items()):
+            lines.append(
+                f'cibo_responses_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {n}'
+            )
+
+        lines += [
+            "# HELP cibo_envelope_errors_total Responses returned by context.error.",
+            "# TYPE cibo_envelope_errors_total counter",
+        ]
+        for endpoint, n in sorted(merged.errors.items()):
+            lines.append(f'cibo_envelope_errors_total{{endpoint="{_escape(endpoint)}"}} {n}')
+
+        lines += [
+            "# HELP cibo_exceptions_total Unhandled exceptions raised by handlers.",
+            "# TYPE cibo_exceptions_total counter",
+        ]
+        for endpoint, n in sorted(merged.exceptions.items()):
+            lines.append(f'cibo_exceptions_total{{endpoint="{_escape(endpoint)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def phase_times() -> Optional[Dict[str, float]]:
+    """开启 metrics 时当前请求各阶段的耗时，未开启时为 None"""
+    return g.get("_phase_times") if has_app_context() else None
+
+
+def add_phase_time(times: Dict[str, float], phase: str, seconds: float) -> None:
+    times[phase] = times.get(phase, 0.0) + seconds
+
+
+def _add_handle_time(times: Dict[str, float], start: float, serialize: float) -> None:
+    """handle 的耗时，不含 handle 中 context.success/error 的 serialize"""
+    elapsed = perf_counter() - start - (times.get("serialize", 0.0) - serialize)
+    add_phase_time(times, "handle", max(elapsed, 0.0))
+
+
+def _status_code(rv: Any) -> int:
+    if isinstance(rv, tuple):
+        if len(rv) > 1 and isinstance(rv[1], int):
+            return rv[1]
+        rv = rv[0]
+    return getattr(rv, "status_code", 200)
+
+
+class _Request:
+    """一次请求的统计，在最外层装饰器中创建"""
+
+    __slots__ = ("metrics", "endpoint", "times", "start")
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+        self.endpoint = request.endpoint or ""
+        self.times = g._phase_times = dict()  # type: Dict[str, float]
+        metrics.add_in_flight(self.endpoint, 1)
+        self.start = perf_counter()
+
+    def finish(self, rv: Any) -> Any:
+        self._observe()
+        self.metrics.count_status(self.endpoint, _status_code(rv), bool(g.get("_envelope_error")))
+        return rv
+
+    def fail(self) -> None:
+        self._observe()
+        self.metrics.count_exception(self.endpoint)
+
+    def _observe(self) -> None:
+        total = perf_counter() - self.start
+        times = self.times
+        metrics = self.metrics
+        metrics.add_in_flight(self.endpoint, -1)
+        # handle 已不含其中的 serialize，handle 之外（如装饰器中的 context.error）的 serialize 也要扣除
+        measured = sum(times.get(phase, 0.0) for phase in ("bind", "handle", "serialize", "cors"))
+        times["decorators"] = max(total - measured, 0.0)
+        times["total"] = total
+        for phase, seconds in times.items():
+            metrics.observe(self.endpoint, phase, seconds)
+
+
+def metrics_decorator(cls: Type[Handler]) -> Callable:
+    """最外层：总耗时、处理中的请求数、状态码；未开启 metrics 时直接调用"""
+
+    def decorator(fn: Callable) -> Callable:
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                metrics = getattr(current_app, "metrics", None)
+                if metrics is None:
+                    return await resolve_awaitable(fn(*args, **kwargs))
+                req = _Request(metrics)
+                try:
+                    rv = await resolve_awaitable(fn(*args, **kwargs))
+                except BaseException:
+                    req.fail()
+                    raise
+                return req.finish(rv)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = getattr(current_app, "metrics", None)
+            if metrics is None:
+                return fn(*args, **kwargs)
+            req = _Request(metrics)
+            try:
+                rv = fn(*args, **kwargs)
+            except BaseException:
+                req.fail()
+                raise
+            return req.finish(rv)
+
+        return wrapper
+
+    return decorator
+
+
+def handle_timer_decorator(cls: Type[Handler]) -> Callable:
+    """最内层：handle 方法的耗时"""
+
+    def decorator(fn: Callable) -> Callable:
+        if is_async_view(cls, fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                times = g.get("_phase_times")
+                if times is None:
+                    return await resolve_awaitable(fn(*args, **kwargs))
+                serialize = times.get("serialize", 0.0)
+                start = perf_counter()
+                try:
+                    return await resolve_awaitable(fn(*args, **kwargs))
+                finally:
+                    _add_handle_time(times, start, serialize)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            times = g.get("_phase_times")
+            if times is None:
+                return fn(*args, **kwargs)
+            serialize = times.get("serialize", 0.0)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _add_handle_time(times, start, serialize)
+
+        return wrapper
+
+    return decorator
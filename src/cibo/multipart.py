@@ -0,0 +1,186 @@
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Dict, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage, Headers, MultiDict
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+
+__all__ = ["UploadFile", "parse_multipart"]
+
+# 默认的上传限制：单个文件、单个普通字段、整个请求体
+MAX_FILE_SIZE = 16 * 1024 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+MAX_UPLOAD_SIZE = 64 * 1024 * 1024
+# 文件超过该大小后从内存转存到临时文件
+SPOOL_MAX_SIZE = 1024 * 1024
+MAX_PARTS = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadFile(FileStorage):
+    """Body 中的上传文件字段，值为 `werkzeug.datastructures.FileStorage`
+
+    >>> class Body(BaseApiBody):
+    ...     avatar: UploadFile = Field(max_bytes=1024 * 1024)
+    ...     attachments: List[UploadFile] = []
+    """
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value) -> FileStorage:
+        if not isinstance(value, FileStorage):
+            raise TypeError("value is not a file")
+        return value
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: dict) -> None:
+        field_schema.update(type="string", format="binary")
+
+
+class _Part:
+    __slots__ = ("name", "filename", "headers", "limit", "size", "sink")
+
+    def __init__(
+        self,
+        name: str,
+        filename: Optional[str],
+        headers: Headers,
+        limit: int,
+        sink: Any,
+    ) -> None:
+        self.name = name
+        self.filename = filename
+        self.headers = headers
+        self.limit = limit
+        self.size = 0
+        # 普通字段为 bytearray，文件为 SpooledTemporaryFile，不接收的字段为 None
+        self.sink = sink
+
+
+def parse_multipart(
+    stream: IO[bytes],
+    boundary: bytes,
+    fields: Dict[str, int],
+    *,
+    max_size: int = MAX_UPLOAD_SIZE,
+    content_length: Optional[int] = None,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+    max_parts: int = MAX_PARTS,
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[MultiDict, MultiDict]:
+    """流式解析 multipart/form-data，返回 (form, files)
+
+    - `fields` 为需要接收的字段名和各自的字节上限，其它字段读取后直接丢弃
+    - 文件写入 SpooledTemporaryFile，超过 `spool_max_size` 后转存到磁盘
+    - Content-Length 超过 `max_size` 时不读取请求体，直接 413；
+      单个字段或累计读取的字节超限时立即 413，不再继续读取
+    """
+    if content_length is not None and content_length > max_size:
+        raise RequestEntityTooLarge(f"request body exceeds {max_size} bytes")
+
+    try:
+        # 只在解析 multipart 时导入，`import cibo` 不要求 werkzeug>=2.0
+        from werkzeug.sansio.multipart import (
+            Data,
+            Epilogue,
+            Field,
+            File,
+            MultipartDecoder,
+            NeedData,
+        )
+    except ImportError:
+        raise RuntimeError("multipart/form-data bodies require werkzeug>=2.0") from None
+
+    # werkzeug 2.2.3 之前的 MultipartDecoder 没有 max_parts，字段数在这里限制
+    decoder = MultipartDecoder(boundary)
+    parts = 0
+    form = []  # type: list
+    files = []  # type: list
+    part = None  # type: Optional[_Part]
+    received = 0
+    complete = False
+    try:
+        while not complete:
+            chunk = stream.read(chunk_size)
+            received += len(chunk)
+            if received > max_size:
+                raise RequestEntityTooLarge(f"request body exceeds {max_size} bytes")
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, NeedData):
+                if isinstance(event, (Field, File)):
+                    parts += 1
+                    if parts > max_parts:
+                        raise RequestEntityTooLarge(
+                            f"multipart body has more than {max_parts} parts"
+                        )
+                    limit = fields.get(event.name)
+                    if limit is None:
+                        sink = None
+                    elif isinstance(event, File):
+                        sink = SpooledTemporaryFile(spool_max_size)
+                    else:
+                        sink = bytearray()
+                    filename = event.filename if isinstance(event, File) else None
+                    part = _Part(event.name, filename, event.headers, limit or 0, sink)
+                elif isinstance(event, Data) and part is not None:
+                    if part.sink is not None:
+                        part.size += len(event.data)
+                        if part.size > part.limit:
+                            raise RequestEntityTooLarge(
+                                f"field `{part.name}` exceeds {part.limit} bytes"
+                            )
+                        if part.filename is None:
+                            part.sink += event.data
+                        else:
+                            part.sink.write(event.data)
+                    if not event.more_data:
+                        if part.sink is not None:
+                            if part.filename is None:
+                                form.append((part.name, _decode_field(part)))
+                            else:
+                                part.sink.seek(0)
+                                files.append((part.name, _make_file(part)))
+                        part = None
+                elif isinstance(event, Epilogue):
+                    complete = True
+                    break
+                event = decoder.next_event()
+            if not chunk and not complete:
+                raise BadRequest("multipart body is incomplete")
+    except ValueError as e:
+        _close_files(files, part)
+        raise BadRequest(f"invalid multipart body: {e}")
+    except Exception:
+        _close_files(files, part)
+        raise
+    return MultiDict(form), MultiDict(files)
+
+
+def _decode_field(part: _Part) -> str:
+    charset = "utf-8"
+    content_type = part.headers.get("content-type")
+    if content_type:
+        charset = parse_options_header(content_type)[1].get("charset", charset)
+    return bytes(part.sink).decode(charset, "replace")
+
+
+def _make_file(part: _Part) -> FileStorage:
+    return FileStorage(
+        stream=part.sink,
+        filename=part.filename,
+        name=part.name,
+        content_type=part.headers.get("content-type"),
+        content_length=part.size,
+        headers=part.headers,
+    )
+
+
+def _close_files(files: list, part: Optional[_Part]) -> None:
+    for _, f in files:
+        f.close()
+    if part is not None and part.filename is not None and part.sink is not None:
+        part.sink.close()
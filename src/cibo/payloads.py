@@ -0,0 +1,496 @@
+import copy
+import datetime
+import decimal
+import enum
+import json
+import random
+import string
+import uuid
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import (
+    SHAPE_COUNTER,
+    SHAPE_DEFAULTDICT,
+    SHAPE_DICT,
+    SHAPE_FROZENSET,
+    SHAPE_MAPPING,
+    SHAPE_SET,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE,
+    ModelField,
+)
+from typing_extensions import Literal, get_args, get_origin
+from werkzeug.datastructures import FileStorage, MultiDict
+
+from .args import BaseApiBody, BaseApiPath, BaseApiQuery
+from .handler import Handler
+
+__all__ = ["PayloadGenerator", "EdgeCase"]
+
+_MAPPING_SHAPES = (SHAPE_MAPPING, SHAPE_DICT, SHAPE_DEFAULTDICT, SHAPE_COUNTER)
+_SET_SHAPES = (SHAPE_SET, SHAPE_FROZENSET)
+_ALPHABET = string.ascii_letters + string.digits
+_UNICODE = "üñ漢字テスト🙂"
+_DELETE = object()
+
+# 没有约束时数值的取值范围
+INT_RANGE = (0, 10000)
+FLOAT_RANGE = (0.0, 1000.0)
+STR_LENGTH = (1, 12)
+
+
+class EdgeCase(NamedTuple):
+    """loc 为字段路径，valid 为该 payload 实际能否通过模型校验"""
+
+    loc: Tuple[Any, ...]
+    kind: str
+    payload: Dict[str, Any]
+    valid: bool
+
+
+class PayloadGenerator:
+    """按 Query/Body/Path 模型生成请求数据，同一个 seed 生成的序列相同
+
+    - 嵌套模型、List/Set/Tuple/Dict、Union、Literal、Enum
+    - `max_length`/`min_length`、`gt`/`ge`/`lt`/`le`、`min_items`/`max_items` 等约束
+    - 除文件字段外生成的值可以直接 JSON 序列化，文件字段为 bytes（`List[UploadFile]` 为 bytes 的列表），
+      由 `encode_body` 作为 multipart 的文件上传；Query 用 `encode_query` 编码为查询参数
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        *,
+        min_items: int = 1,
+        max_items: int = 5,
+        max_depth: int = 6,
+        optional_rate: float = 0.8,
+    ) -> None:
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.min_items = min_items
+        self.max_items = max_items
+        self.max_depth = max_depth
+        # 可选字段出现在 payload 中的概率
+        self.optional_rate = optional_rate
+
+    def generate(self, model: Type[BaseModel]) -> Dict[str, Any]:
+        """一个能通过校验的 payload"""
+        return self._model(model, 0, path=issubclass(model, BaseApiPath))
+
+    def iter_payloads(self, model: Type[BaseModel], n: int) -> Iterator[Dict[str, Any]]:
+        for _ in range(n):
+            yield self.generate(model)
+
+    # 生成值
+
+    def _model(self, model: Type[BaseModel], depth: int, path: bool = False) -> Dict[str, Any]:
+        data = dict()
+        for field in model.__fields__.values():
+            if not field.required and (
+                depth >= self.max_depth or self.random.random() >= self.optional_rate
+            ):
+                continue
+            data[field.alias] = self._field(field, depth, path)
+        return data
+
+    def _count(self, field: ModelField, depth: int) -> int:
+        low = getattr(field.outer_type_, "min_items", None) or 0
+        high = getattr(field.outer_type_, "max_items", None)
+        if depth >= self.max_depth:
+            return low
+        low = max(low, self.min_items)
+        high = self.max_items if high is None else min(high, self.max_items)
+        return self.random.randint(min(low, high), high)
+
+    def _field(
+        self, field: ModelField, depth: int, path: bool = False, count: Optional[int] = None
+    ) -> Any:
+        """count 为容器的元素个数，默认按约束和 min_items/max_items 随机"""
+        shape = field.shape
+        if shape == SHAPE_SINGLETON:
+            if field.sub_fields:
+                # Union
+                return self._field(self.random.choice(field.sub_fields), depth, path)
+            return self._value(field.type_, field, depth, path)
+        if shape == SHAPE_TUPLE:
+            return [self._field(f, depth + 1) for f in field.sub_fields or ()]
+        n = self._count(field, depth) if count is None else count
+        if shape in _MAPPING_SHAPES:
+            value_field = field.sub_fields[0] if field.sub_fields else None
+            result = dict()
+            for _ in range(n * 3):
+                if len(result) >= n:
+                    break
+                if field.key_field:
+                    key = self._field(field.key_field, depth + 1)
+                else:
+                    key = self._str(None, "")
+                value = self._field(value_field, depth + 1) if value_field else self._any()
+                result[str(key)] = value
+            return result
+        item_field = field.sub_fields[0] if field.sub_fields else None
+        items = []  # type: List[Any]
+        seen = set()
+        for _ in range(n * 3 if shape in _SET_SHAPES else n):
+            if len(items) >= n:
+                break
+            item = self._field(item_field, depth + 1) if item_field else self._any()
+            if shape in _SET_SHAPES:
+                key = json.dumps(item, sort_keys=True)
+                if key in seen:
+                    continue
+                seen.add(key)
+            items.append(item)
+        return items
+
+    def _value(self, tp: Any, field: Optional[ModelField], depth: int, path: bool = False) -> Any:
+        if get_origin(tp) is Literal:
+            return _jsonable(self.random.choice(get_args(tp)))
+        if tp is Any or tp is object or not isinstance(tp, type):
+            return self._any()
+        if issubclass(tp, BaseModel):
+            return self._model(tp, depth + 1)
+        if issubclass(tp, enum.Enum):
+            return _jsonable(self.random.choice(list(tp)).value)
+        if issubclass(tp, FileStorage):
+            return self._str(None, "").encode() * 16
+        if issubclass(tp, bool):
+            return self.random.random() < 0.5
+        if issubclass(tp, int):
+            return self._int(tp, path)
+        if issubclass(tp, (float, decimal.Decimal)):
+            return self._float(tp)
+        if issubclass(tp, str):
+            return self._str(tp, field.name if field is not None else "")
+        if issubclass(tp, bytes):
+            return self._str(tp, "")
+        if issubclass(tp, datetime.datetime):
+            return self._datetime().isoformat()
+        if issubclass(tp, datetime.date):
+            return self._datetime().date().isoformat()
+        if issubclass(tp, datetime.time):
+            return self._datetime().time().isoformat()
+        if issubclass(tp, datetime.timedelta):
+            return self.random.randint(0, 86400)
+        if issubclass(tp, uuid.UUID):
+            return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+        if issubclass(tp, (list, set, frozenset, tuple)):
+            return [self._any() for _ in range(self.random.randint(0, self.max_items))]
+        if issubclass(tp, dict):
+            n = self.random.randint(0, self.max_items)
+            return {self._str(None, ""): self._any() for _ in range(n)}
+        return self._any()
+
+    def _any(self) -> Any:
+        return self.random.choice((self.random.randint(*INT_RANGE), self._str(None, "")))
+
+    def _int(self, tp: Type, path: bool = False) -> int:
+        low, high = _bounds(tp, *INT_RANGE)
+        if path:
+            # 路径中的 int 转换器不接受负数
+            low = max(low, 0)
+        low, high = int(low), int(high)
+        multiple_of = getattr(tp, "multiple_of", None)
+        value = self.random.randint(low, max(low, high))
+        if multiple_of:
+            value = -(-value // multiple_of) * multiple_of
+        return value
+
+    def _float(self, tp: Type) -> float:
+        low, high = _bounds(tp, *FLOAT_RANGE, step=1e-6)
+        return round(self.random.uniform(low, max(low, high)), 6)
+
+    def _str(self, tp: Optional[Type], name: str) -> str:
+        min_length = getattr(tp, "min_length", None) or STR_LENGTH[0]
+        max_length = getattr(tp, "max_length", None) or max(STR_LENGTH[1], min_length)
+        length = self.random.randint(min(min_length, max_length), max_length)
+        word = "".join(self.random.choice(_ALPHABET) for _ in range(length))
+        name = name.lower()
+        if "email" in name:
+            # 常见的邮箱校验要求域名和后缀
+            suffix = "@example.com"
+            return word[: max(max_length - len(suffix), 1)] + suffix
+        if "url" in name:
+            return f"https://example.com/{word}"
+        return word
+
+    def _datetime(self) -> datetime.datetime:
+        return datetime.datetime(2020, 1, 1) + datetime.timedelta(
+            seconds=self.random.randint(0, 5 * 365 * 86400)
+        )
+
+    # 边界值
+
+    def edge_cases(self, model: Type[BaseModel]) -> List[EdgeCase]:
+        """在一个合法 payload 的基础上逐个字段替换为边界值、错误类型、缺失等，并标记能否通过校验"""
+        base = self._complete(model)
+        cases = []  # type: List[EdgeCase]
+        self._collect_edge_cases(model, model, base, (), cases, 0)
+        return cases
+
+    def _complete(self, model: Type[BaseModel]) -> Dict[str, Any]:
+        """所有可选字段都出现的 payload，便于替换嵌套字段"""
+        rate, self.optional_rate = self.optional_rate, 1.0
+        try:
+            return self.generate(model)
+        finally:
+            self.optional_rate = rate
+
+    def _collect_edge_cases(
+        self,
+        root: Type[BaseModel],
+        model: Type[BaseModel],
+        base: Dict[str, Any],
+        prefix: Tuple[Any, ...],
+        cases: List[EdgeCase],
+        depth: int,
+    ) -> None:
+        data = _get(base, prefix)
+        for field in model.__fields__.values():
+            loc = prefix + (field.alias,)
+            for kind, value in self._field_edge_values(field, depth):
+                payload = _replace(base, loc, value)
+                cases.append(EdgeCase(loc, kind, payload, self.is_valid(root, payload)))
+
+            if depth >= self.max_depth or not isinstance(data, dict) or field.alias not in data:
+                continue
+            if field.shape == SHAPE_SINGLETON and _is_model(field.type_):
+                self._collect_edge_cases(root, field.type_, base, loc, cases, depth + 1)
+            elif field.shape != SHAPE_SINGLETON and _is_model(field.type_) and data[field.alias]:
+                if isinstance(data[field.alias], list):
+                    self._collect_edge_cases(root, field.type_, base, loc + (0,), cases, depth + 1)
+
+    def _field_edge_values(self, field: ModelField, depth: int) -> Iterator[Tuple[str, Any]]:
+        if field.required:
+            yield "missing", _DELETE
+        else:
+            yield "omitted", _DELETE
+        if field.allow_none:
+            yield "null", None
+
+        shape = field.shape
+        tp = field.type_
+        if shape == SHAPE_SINGLETON and field.sub_fields:
+            for sub_field in field.sub_fields:
+                yield f"union:{_display(sub_field.type_)}", self._field(sub_field, depth)
+            yield "wrong_type", [[]]
+            return
+        if shape != SHAPE_SINGLETON:
+            outer = field.outer_type_
+            min_items = getattr(outer, "min_items", None)
+            max_items = getattr(outer, "max_items", None)
+            empty = {} if shape in _MAPPING_SHAPES else []
+            if shape != SHAPE_TUPLE:
+                yield "empty", empty
+            if min_items:
+                yield "min_items-1", self._items(field, min_items - 1, depth)
+            if max_items is not None:
+                yield "max_items", self._items(field, max_items, depth)
+                yield "max_items+1", self._items(field, max_items + 1, depth)
+            yield "wrong_type", 12345
+            return
+
+        if get_origin(tp) is Literal:
+            for value in get_args(tp):
+                yield f"literal:{value}", _jsonable(value)
+            yield "not_allowed", "__not_allowed__"
+            return
+        if not isinstance(tp, type):
+            return
+        if issubclass(tp, enum.Enum):
+            yield "not_allowed", "__not_allowed__"
+        elif issubclass(tp, BaseModel):
+            yield "wrong_type", "not an object"
+        elif issubclass(tp, bool):
+            yield "wrong_type", "not a bool"
+        elif issubclass(tp, (int, float, decimal.Decimal)):
+            step = 1 if issubclass(tp, int) else 1e-6
+            for name in ("gt", "ge", "lt", "le"):
+                limit = getattr(tp, name, None)
+                if limit is None:
+                    continue
+                yield name, limit
+                yield f"{name}{'+' if name[0] == 'g' else '-'}step", (
+                    limit + step if name[0] == "g" else limit - step
+                )
+                if name in ("ge", "le"):
+                    yield f"{name}{'-' if name[0] == 'g' else '+'}step", (
+                        limit - step if name[0] == "g" else limit + step
+                    )
+            yield "wrong_type", "not a number"
+        elif issubclass(tp, str):
+            min_length = getattr(tp, "min_length", None)
+            max_length = getattr(tp, "max_length", None)
+            yield "empty", ""
+            if min_length:
+                yield "min_length", "x" * min_length
+                yield "min_length-1", "x" * (min_length - 1)
+            if max_length is not None:
+                yield "max_length", "x" * max_length
+                yield "max_length+1", "x" * (max_length + 1)
+                yield "unicode", (_UNICODE * max_length)[:max_length]
+            else:
+                yield "unicode", _UNICODE
+                yield "long", "x" * 4096
+            yield "wrong_type", {"x": 1}
+
+    def _items(self, field: ModelField, n: int, depth: int) -> Any:
+        """n 个元素的容器，不受字段约束限制"""
+        value = self._field(field, max(depth, self.max_depth - 1), count=n)
+        if field.shape in _SET_SHAPES and len(value) < n:
+            # 元素取值范围太小时无法生成足够多的不同元素
+            value += value[:1] * (n - len(value))
+        return value
+
+    # 校验和编码
+
+    @staticmethod
+    def is_valid(model: Type[BaseModel], payload: Dict[str, Any]) -> bool:
+        try:
+            if issubclass(model, BaseApiQuery):
+                model.parse_request_args(MultiDict(encode_query(payload)))
+            elif issubclass(model, BaseApiBody) and model._file_fields():
+                model.parse_obj(_with_files(model, payload))
+            else:
+                model.parse_obj(payload)
+        except (ValidationError, TypeError, ValueError):
+            return False
+        return True
+
+    def request(
+        self, app: Any, handler: Type[Handler], method: Optional[str] = None, rule: Any = None
+    ) -> Dict[str, Any]:
+        """`app.test_client().open(**request)` 的参数，handler 需要已注册到 app，未传 rule 时查找其路由"""
+        rule = rule or _find_rule(app, handler)
+        method = (method or next(iter(sorted(handler.methods or ("GET",))))).upper()
+        binder = handler.binder
+        values = self.generate(binder.path) if binder.path is not None else dict()
+        _, url = rule.build(values, append_unknown=False)
+        kwargs = {"path": url, "method": method}  # type: Dict[str, Any]
+        if binder.query is not None:
+            kwargs["query_string"] = encode_query(self.generate(binder.query))
+        if binder.body is not None:
+            kwargs.update(encode_body(binder.body, self.generate(binder.body)))
+        return kwargs
+
+
+def encode_query(payload: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """按 BaseApiQuery 的解析规则编码: 数组为重复参数，对象为 `c[k]=v`，嵌套的容器为 JSON"""
+    items = []  # type: List[Tuple[str, str]]
+    for key, value in payload.items():
+        if value is None:
+            continue
+        if isinstance(value, list):
+            if all(_is_scalar(v) for v in value) and len(value) > 1:
+                items.extend((key, _query_scalar(v)) for v in value)
+            else:
+                items.append((key, json.dumps(value)))
+        elif isinstance(value, dict):
+            if value and all(_is_scalar(v) for v in value.values()):
+                items.extend((f"{key}[{k}]", _query_scalar(v)) for k, v in value.items())
+            else:
+                items.append((key, json.dumps(value)))
+        else:
+            items.append((key, _query_scalar(value)))
+    return items
+
+
+def encode_body(model: Type[BaseApiBody], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """`client.open` 的 json 或 data 参数"""
+    content_type = model.get_content_type()
+    if content_type == "application/json":
+        return {"json": payload}
+    data = dict()
+    files = model._file_fields()
+    for key, value in payload.items():
+        if key in files:
+            contents = value if files[key] else [value]
+            data[key] = [(BytesIO(c), f"{key}-{i}.bin") for i, c in enumerate(contents)]
+        elif _is_scalar(value):
+            data[key] = _query_scalar(value)
+        else:
+            data[key] = json.dumps(value)
+    return {"data": data, "content_type": content_type}
+
+
+def _with_files(model: Type[BaseApiBody], payload: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(payload)
+    for key, is_list in model._file_fields().items():
+        value = data.get(key)
+        if isinstance(value, bytes):
+            data[key] = FileStorage(BytesIO(value), filename=f"{key}.bin")
+        elif is_list and isinstance(value, list):
+            data[key] = [
+                FileStorage(BytesIO(v), filename=f"{key}.bin") if isinstance(v, bytes) else v
+                for v in value
+            ]
+    return data
+
+
+def _find_rule(app: Any, handler: Type[Handler]) -> Any:
+    for rule in app.url_map.iter_rules():
+        view_func = app.view_functions.get(rule.endpoint)
+        if getattr(view_func, "view_class", None) is handler:
+            return rule
+    raise ValueError(f"{handler.__qualname__} is not registered")
+
+
+def _bounds(
+    tp: Type, default_low: float, default_high: float, step: float = 1
+) -> Tuple[float, float]:
+    gt, ge = getattr(tp, "gt", None), getattr(tp, "ge", None)
+    lt, le = getattr(tp, "lt", None), getattr(tp, "le", None)
+    low = gt + step if gt is not None else ge
+    high = lt - step if lt is not None else le
+    if low is None and high is None:
+        return default_low, default_high
+    if low is None:
+        low = min(default_low, high)  # type: ignore
+    if high is None:
+        high = max(default_high, low)
+    return low, high
+
+
+def _is_model(tp: Any) -> bool:
+    return isinstance(tp, type) and issubclass(tp, BaseModel)
+
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (list, dict))
+
+
+def _query_scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, bytes):
+        return value.decode()
+    return str(value)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _display(tp: Any) -> str:
+    return getattr(tp, "__name__", None) or str(tp)
+
+
+def _get(data: Any, loc: Tuple[Any, ...]) -> Any:
+    for key in loc:
+        data = data[key]
+    return data
+
+
+def _replace(base: Dict[str, Any], loc: Tuple[Any, ...], value: Any) -> Dict[str, Any]:
+    payload = copy.deepcopy(base)
+    parent = _get(payload, loc[:-1])
+    if value is _DELETE:
+        parent.pop(loc[-1], None)
+    else:
+        parent[loc[-1]] = value
+    return payload
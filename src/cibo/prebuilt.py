@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Response, current_app, request
+
+__all__ = ["PrebuiltResponse"]
+
+
+class PrebuiltResponse:
+    """预先序列化、压缩好的不可变响应体
+
+    启动后不会变化的内容（openapi spec、文档页面）只构建一次，
+    请求时直接返回字节，支持 ETag/Last-Modified 条件请求和 gzip。
+    """
+
+    __slots__ = ("body", "gzip_body", "mimetype", "etag", "gzip_etag", "last_modified", "max_age")
+
+    def __init__(
+        self,
+        body: bytes,
+        mimetype: str,
+        *,
+        max_age: int = 0,
+        compress: bool = True,
+        compress_level: int = 6,
+        last_modified: Optional[datetime] = None,
+    ) -> None:
+        self.body = body
+        self.mimetype = mimetype
+        self.max_age = max_age
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = digest
+        # 同一内容的不同编码需要不同的强 ETag
+        self.gzip_etag = f"{digest}-gzip"
+        self.gzip_body = gzip.compress(body, compress_level, mtime=0) if compress else None
+        self.last_modified = (last_modified or datetime.now(timezone.utc)).replace(microsecond=0)
+
+    def _accept_gzip(self) -> bool:
+        return self.gzip_body is not None and request.accept_encodings["gzip"] > 0
+
+    def _not_modified(self) -> bool:
+        if request.if_none_match:
+            return request.if_none_match.contains(self.etag) or request.if_none_match.contains(
+                self.gzip_etag
+            )
+        if request.if_modified_since:
+            return self.last_modified <= request.if_modified_since
+        return False
+
+    def make_response(self) -> Response:
+        use_gzip = self._accept_gzip()
+        if self._not_modified():
+            resp = current_app.response_class(status=304)
+        elif use_gzip:
+            resp = current_app.response_class(self.gzip_body, mimetype=self.mimetype)
+            resp.headers["Content-Encoding"] = "gzip"
+        else:
+            resp = current_app.response_class(self.body, mimetype=self.mimetype)
+        resp.set_etag(self.gzip_etag if use_gzip else self.etag)
+        resp.last_modified = self.last_modified
+        resp.headers["Vary"] = "Accept-Encoding"
+        if self.max_age:
+            resp.cache_control.public = True
+            resp.cache_control.max_age = self.max_age
+        else:
+            resp.cache_control.no_cache = True
+        return resp
@@ -0,0 +1,192 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import marshal
+import pstats
+import random
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from flask import current_app, g, request
+
+__all__ = ["Profiler"]
+
+PROFILE_HEADER = "X-Cibo-Profile"
+
+# pstats 接受的排序字段，其它值会在 sort_stats 中抛出 KeyError
+SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)  # type: ignore
+
+# 查看某个阶段时，只输出这些模块中的函数
+PHASE_FILTERS = {
+    "bind": r"cibo/(binder|args|decoder|multipart)\.py|pydantic",
+    "serialize": r"cibo/(serializer|utils|context)\.py|json",
+    "cors": r"cibo/cors\.py",
+    "cache": r"cibo/cache\.py",
+}
+
+
+class ProfileRecord:
+    __slots__ = ("endpoint", "method", "path", "timestamp", "duration", "phases", "stats")
+
+    def __init__(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        duration: float,
+        phases: Dict[str, float],
+        stats: bytes,
+    ) -> None:
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.timestamp = time.time()
+        self.duration = duration
+        self.phases = phases
+        # marshal 后的 pstats 数据，与 `cProfile -o` 的文件格式相同
+        self.stats = stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "method": self.method,
+            "path": self.path,
+            "timestamp": self.timestamp,
+            "duration": self.duration,
+            "phases": self.phases,
+        }
+
+
+class Profiler:
+    """按需用 cProfile 分析单个请求
+
+    - 请求头 `X-Cibo-Profile: {timestamp}.{hmac}` 签名正确且未过期时分析该请求
+    - 或按 `Handler.profile_sample_rate` 随机采样，没有 secret 时只采样，结果通过 `records`/`get` 读取
+    - 每个 endpoint 只保留最近 `ring_size` 份结果
+
+    cProfile 只记录调用 `dispatch_request` 的线程: WSGI 下 async handler 由 asgiref 在另一个线程的
+    事件循环中执行，结果中只有等待的耗时；`as_asgi()` 不经过 `dispatch_request`，不会分析任何请求
+    """
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        ring_size: int = 20,
+        max_age: int = 300,
+        header: str = PROFILE_HEADER,
+    ) -> None:
+        self.secret = secret.encode() if secret else None
+        self.ring_size = ring_size
+        self.max_age = max_age
+        self.header = header
+        self._records: Dict[str, Deque[ProfileRecord]] = dict()
+        self._lock = Lock()
+
+    def sign(self, method: str, path: str, timestamp: Optional[int] = None) -> str:
+        """生成请求头的值，例如 `profiler.sign("GET", "/api/users")`"""
+        if self.secret is None:
+            raise RuntimeError("profile secret is not configured")
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        message = f"{timestamp}\n{method.upper()}\n{path}".encode()
+        digest = hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+        return f"{timestamp}.{digest}"
+
+    def verify(self) -> bool:
+        value = request.headers.get(self.header)
+        if not value or self.secret is None:
+            return False
+        timestamp, _, _ = value.partition(".")
+        try:
+            if abs(time.time() - int(timestamp)) > self.max_age:
+                return False
+        except ValueError:
+            return False
+        expected = self.sign(request.method, request.path, int(timestamp))
+        return hmac.compare_digest(value, expected)
+
+    def should_profile(self) -> bool:
+        if request.url_rule is None:
+            return False
+        if self.secret is not None and self.header in request.headers:
+            return self.verify()
+        view_func = current_app.view_functions.get(request.url_rule.endpoint)
+        rate = getattr(getattr(view_func, "view_class", None), "profile_sample_rate", 0.0)
+        return rate > 0 and random.random() < rate
+
+    def run(self, fn: Callable[[], Any]) -> Any:
+        # 没有开启 metrics 时也记录各阶段耗时
+        if g.get("_phase_times") is None:
+            g._phase_times = dict()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return fn()
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+            profile.create_stats()
+            self._store(
+                ProfileRecord(
+                    request.endpoint or "",
+                    request.method,
+                    request.path,
+                    duration,
+                    dict(g.get("_phase_times") or {}),
+                    marshal.dumps(profile.stats),  # type: ignore
+                )
+            )
+
+    def _store(self, record: ProfileRecord) -> None:
+        with self._lock:
+            ring = self._records.get(record.endpoint)
+            if ring is None:
+                ring = self._records[record.endpoint] = deque(maxlen=self.ring_size)
+            ring.append(record)
+
+    def records(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                endpoint: [record.to_dict() for record in ring]
+                for endpoint, ring in self._records.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def get(self, endpoint: str, index: int) -> Optional[ProfileRecord]:
+        with self._lock:
+            ring = self._records.get(endpoint)
+            if ring is None or not -len(ring) <= index < len(ring):
+                return None
+            return ring[index]
+
+    @staticmethod
+    def render(
+        record: ProfileRecord,
+        phase: Optional[str] = None,
+        sort: str = "cumulative",
+        limit: int = 50,
+    ) -> str:
+        """pstats 文本，phase 为 bind/serialize/cors/cache 时只输出相关模块的函数"""
+        stats = pstats.Stats(_MarshaledStats(record.stats), stream=io.StringIO())
+        stats.sort_stats(sort)
+        restrictions = [limit]  # type: List[Any]
+        if phase in PHASE_FILTERS:
+            restrictions.insert(0, PHASE_FILTERS[phase])
+        stats.print_stats(*restrictions)
+        return stats.stream.getvalue()  # type: ignore
+
+
+class _MarshaledStats:
+    """pstats.Stats 可以从带有 `stats` 属性的对象加载"""
+
+    def __init__(self, data: bytes) -> None:
+        self.stats = marshal.loads(data)
+
+    def create_stats(self) -> None:
+        ...
@@ -0,0 +1,249 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .app import Flask
+from .capture import REDACTED, record_body
+
+__all__ = ["replay", "InProcessTarget", "HttpTarget"]
+
+# 回放时不转发的请求头，由客户端重新生成
+SKIP_HEADERS = frozenset(("host", "content-length", "connection", "transfer-encoding"))
+
+
+class InProcessTarget:
+    """在当前进程中通过 test client 调用 app，每个线程一个 client"""
+
+    def __init__(self, app: Flask) -> None:
+        self.app = app
+        self._local = threading.local()
+
+    def send(
+        self, method: str, url: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, bytes]:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(url, method=method, headers=headers, data=body)
+        try:
+            return resp.status_code, resp.get_data()
+        finally:
+            resp.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.unix_path)
+        self.sock = sock
+
+
+class HttpTarget:
+    """通过本地 socket 请求运行中的服务: `http://127.0.0.1:5000` 或 `unix:///tmp/app.sock`
+
+    每个线程保持一个 keep-alive 连接
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "unix"):
+            raise ValueError(f"unsupported url: {url}")
+        self.url = url
+        self.parts = parts
+        self.prefix = "" if parts.scheme == "unix" else parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.parts.scheme == "unix":
+            return _UnixHTTPConnection(self.parts.path, self.timeout)
+        return http.client.HTTPConnection(
+            self.parts.hostname or "127.0.0.1", self.parts.port or 80, timeout=self.timeout
+        )
+
+    def send(
+        self, method: str, url: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, bytes]:
+        for retry in (False, True):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                conn.request(method, self.prefix + url, body=body or None, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                # 服务端关闭了 keep-alive 连接，重连一次
+                conn.close()
+                self._local.conn = None
+                if retry:
+                    raise
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+def is_envelope_error(status: int, body: bytes) -> bool:
+    """HTTP 状态码为 200，但响应是 context.error 生成的错误"""
+    if not body.startswith(b"{"):
+        return False
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    if not isinstance(data, dict):
+        return False
+    code = data.get("status_code")
+    return data.get("success") is False or (isinstance(code, int) and code >= 400)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """nearest-rank，values 已排序"""
+    if not values:
+        return 0.0
+    rank = max(int(-(-len(values) * p // 100)), 1)
+    return values[rank - 1]
+
+
+class _Stats:
+    __slots__ = ("latencies", "http_errors", "envelope_errors", "exceptions", "statuses")
+
+    def __init__(self) -> None:
+        self.latencies = list()  # type: List[float]
+        self.http_errors = 0
+        self.envelope_errors = 0
+        self.exceptions = 0
+        self.statuses = dict()  # type: Dict[int, int]
+
+
+def _request_args(
+    record: Dict[str, Any], headers: Dict[str, str]
+) -> Tuple[str, str, Dict[str, str], bytes]:
+    url = record["path"]
+    query = record.get("query")
+    if query:
+        params = parse_qsl(query, keep_blank_values=True)
+        if any(v == REDACTED for _, v in params):
+            query = urlencode([(k, v) for k, v in params if v != REDACTED])
+    if query:
+        url = f"{url}?{query}"
+    request_headers = {
+        k: v
+        for k, v in record.get("headers", {}).items()
+        if v != REDACTED and k.lower() not in SKIP_HEADERS
+    }
+    request_headers.update(headers)
+    return record["method"], url, request_headers, record_body(record)
+
+
+def replay(
+    records: Iterable[Dict[str, Any]],
+    target: Any,
+    *,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    headers: Optional[Dict[str, str]] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """按 concurrency 个线程回放记录，rate 为每秒总请求数（None 为不限速）
+
+    脱敏的请求头和 query 参数不会发送，请求头需要时用 headers 覆盖（例如认证头）；
+    未记录请求体（body_omitted）的请求会被跳过
+    """
+    headers = headers or dict()
+    requests = list()  # type: List[Tuple[str, Tuple[str, str, Dict[str, str], bytes]]]
+    skipped = 0
+    for record in records:
+        if limit is not None and len(requests) >= limit:
+            break
+        if "body_omitted" in record:
+            skipped += 1
+            continue
+        endpoint = record.get("endpoint") or f"{record['method']} {record['path']}"
+        requests.append((endpoint, _request_args(record, headers)))
+
+    stats = dict()  # type: Dict[str, _Stats]
+    lock = threading.Lock()
+    cursor = iter(range(len(requests)))
+    start = time.perf_counter()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(cursor, None)
+            if i is None:
+                return
+            if rate:
+                # 第 i 个请求在 start + i / rate 时发出
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            endpoint, args = requests[i]
+            t0 = time.perf_counter()
+            try:
+                status, body = target.send(*args)
+            except Exception:
+                status, body = None, b""
+            latency = time.perf_counter() - t0
+            with lock:
+                s = stats.get(endpoint)
+                if s is None:
+                    s = stats[endpoint] = _Stats()
+                if status is None:
+                    s.exceptions += 1
+                    continue
+                s.latencies.append(latency)
+                s.statuses[status] = s.statuses.get(status, 0) + 1
+                if status >= 400:
+                    s.http_errors += 1
+                elif is_envelope_error(status, body):
+                    s.envelope_errors += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(concurrency, 1))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - start
+
+    endpoints = dict()
+    for endpoint, s in sorted(stats.items()):
+        latencies = sorted(s.latencies)
+        endpoints[endpoint] = {
+            "count": len(latencies) + s.exceptions,
+            "statuses": {str(k): v for k, v in sorted(s.statuses.items())},
+            "http_errors": s.http_errors,
+            "envelope_errors": s.envelope_errors,
+            "exceptions": s.exceptions,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    return {
+        "requests": len(requests),
+        "skipped": skipped,
+        "duration": round(duration, 3),
+        "rps": round(len(requests) / duration, 1) if duration else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    summary = f"{report['requests']} requests in {report['duration']}s ({report['rps']} req/s)"
+    header = f"{'endpoint':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [
+        summary + f", {report['skipped']} skipped",
+        header + f" {'http err':>9} {'env err':>8} {'exc':>5}",
+    ]
+    for endpoint, e in report["endpoints"].items():
+        latencies = f"{e['p50_ms']:>9.2f} {e['p95_ms']:>9.2f} {e['p99_ms']:>9.2f}"
+        errors = f"{e['http_errors']:>9} {e['envelope_errors']:>8} {e['exceptions']:>5}"
+        lines.append(f"{endpoint:<40} {e['count']:>7} {latencies} {errors}")
+    return "\n".join(lines)
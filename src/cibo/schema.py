@@ -0,0 +1,185 @@
+import json
+from collections import deque
+from copy import deepcopy
+from threading import RLock
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Set, Tuple, Type, Union
+
+from pydantic import BaseModel
+
+from .args import BaseApiBody, BaseApiQuery, BaseApiSuccessResp, _translate_schema
+from .handler import Handler
+
+if TYPE_CHECKING:
+    from flask.blueprints import Blueprint
+
+__all__ = ["SchemaRegistry", "dedupe_schemas"]
+
+COMPONENT_TYPES = (
+    "schemas",
+    "responses",
+    "parameters",
+    "examples",
+    "requestBodies",
+    "headers",
+    "securitySchemes",
+    "links",
+    "callback",
+)
+
+
+class SchemaRegistry:
+    """每个 cibo.Flask 持有的 openapi components 注册表
+
+    - 注册蓝图时增量登记 Handler 的 Query/Body/Resp
+    - 每个模型类只转换一次 schema
+    - 生成 components 时只处理新登记的模型，线程安全
+    """
+
+    def __init__(self) -> None:
+        self._lock = RLock()
+        self._handlers: Set[Type[Handler]] = set()
+        self._pending: Deque[Tuple[str, str, Union[Type[BaseModel], dict], Dict]] = deque()
+        self._translated = dict()  # type: Dict[type, Tuple[dict, Dict]]
+        self._components = {k: {} for k in COMPONENT_TYPES}  # type: Dict[str, Dict[str, Dict]]
+
+    def add_blueprint(self, blueprint: "Blueprint") -> None:
+        for cls in getattr(blueprint, "handlers", ()):
+            self.add_handler(cls)
+        # flask>=2.0 支持嵌套蓝图
+        for child, _ in getattr(blueprint, "_blueprints", ()):
+            self.add_blueprint(child)
+
+    def add_handler(self, cls: Type[Handler]) -> None:
+        with self._lock:
+            if cls in self._handlers:
+                return
+            self._handlers.add(cls)
+            Query: Optional[Type[BaseApiQuery]] = getattr(cls, "Query", None)
+            Body: Optional[Type[BaseApiBody]] = getattr(cls, "Body", None)
+            Resp: Optional[Type[BaseApiSuccessResp]] = getattr(cls, "Resp", None)
+            if Query:
+                self._pending.append(("parameters", Query._schema_alias, Query, {}))
+            if Body:
+                self._pending.append(("requestBodies", Body._schema_alias, Body, {}))
+            if Resp:
+                self._pending.append(("responses", Resp._schema_alias, Resp, {}))
+
+    def translate(self, model: Type[BaseModel]) -> dict:
+        """转换模型的 schema，同一个类只转换一次"""
+        with self._lock:
+            return self._translate(model, {})
+
+    def _translate(self, target: Union[Type[BaseModel], dict], definitions: Dict) -> dict:
+        if isinstance(target, dict):
+            schema, refs = _translate_schema(target, definitions)
+        else:
+            translated = self._translated.get(target)
+            if translated is None:
+                translated = self._translated[target] = _translate_schema(target)
+            schema, refs = translated
+        for name, (ref_target, ref_definitions) in refs.items():
+            if name not in self._components["schemas"]:
+                self._pending.append(("schemas", name, ref_target, ref_definitions))
+        return schema
+
+    def make_components(self) -> Dict[str, Dict[str, Dict]]:
+        with self._lock:
+            while self._pending:
+                kind, name, target, definitions = self._pending.popleft()
+                if kind == "schemas" and name in self._components["schemas"]:
+                    continue
+                schema = self._translate(target, definitions)
+                if kind == "parameters":
+                    self._components[kind].update(self._make_parameters(name, target, schema))
+                else:
+                    self._components[kind][name] = self._make_component(kind, target, schema)
+            return {k: dict(v) for k, v in self._components.items()}
+
+    @staticmethod
+    def _make_parameters(name: str, target: Type[BaseApiQuery], schema: dict) -> Dict[str, Dict]:
+        """Query 的每个字段生成一个 query parameter，并注明解码器支持的 style"""
+        styles = {decoder.name: decoder.style for decoder in target._query_decoders()}
+        required = schema.get("required", [])
+        parameters = dict()
+        for field_name, field_schema in schema.get("properties", {}).items():
+            parameters[f"{name}${field_name}"] = {
+                "name": field_name,
+                "in": "query",
+                "description": field_schema.get("description", ""),
+                "required": field_name in required,
+                "deprecated": False,
+                "allowEmptyValue": False,
+                "schema": field_schema,
+                "style": styles.get(field_name, "form"),
+                "explode": True,
+            }
+        return parameters
+
+    @staticmethod
+    def _make_component(kind: str, target, schema: dict) -> dict:
+        if kind == "requestBodies":
+            return {
+                "description": target.__doc__ or "",
+                "content": {target.get_content_type(): {"schema": schema}},
+                "required": True,
+            }
+        elif kind == "responses":
+            return {
+                "description": target.__doc__ or "",
+                "content": {target._content_type: {"schema": schema}},
+            }
+        return schema
+
+
+_REF_PREFIX = "#/components/schemas/"
+
+
+def _schema_key(schema: dict) -> str:
+    # title 由 pydantic 按类名生成，不参与结构比较
+    return json.dumps({k: v for k, v in schema.items() if k != "title"}, sort_keys=True)
+
+
+def _rewrite_refs(obj: Any, renames: Dict[str, str]) -> None:
+    if isinstance(obj, dict):
+        ref = obj.get("$ref")
+        if isinstance(ref, str) and ref.startswith(_REF_PREFIX):
+            name = ref.replace(_REF_PREFIX, "", 1)
+            if name in renames:
+                obj["$ref"] = _REF_PREFIX + renames[name]
+        for v in obj.values():
+            _rewrite_refs(v, renames)
+    elif isinstance(obj, list):
+        for v in obj:
+            _rewrite_refs(v, renames)
+
+
+def _size(obj: Any) -> int:
+    return len(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def dedupe_schemas(components: Dict[str, Dict]) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """合并结构相同的 components/schemas 并改写所有 $ref
+
+    返回新的 components 和统计 {"merged": 合并掉的 schema 数, "bytes_saved": 节省的字节数}
+    """
+    components = deepcopy(components)
+    schemas = components["schemas"]
+    size_before = _size(components)
+    merged = 0
+    while True:
+        groups: Dict[str, List[str]] = dict()
+        for name, schema in schemas.items():
+            groups.setdefault(_schema_key(schema), []).append(name)
+        renames = dict()  # type: Dict[str, str]
+        for names in groups.values():
+            if len(names) > 1:
+                canonical = min(names, key=lambda name: (len(name), name))
+                renames.update({name: canonical for name in names if name != canonical})
+        if not renames:
+            break
+        # 合并后引用它们的 schema 可能也变得相同，循环直到稳定
+        for name in renames:
+            del schemas[name]
+        merged += len(renames)
+        _rewrite_refs(components, renames)
+    return components, {"merged": merged, "bytes_saved": size_before - _size(components)}
@@ -0,0 +1,195 @@
+import json
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+from flask import Response, current_app
+from pydantic import BaseModel, validate_model
+from typing_extensions import Literal, get_args, get_origin
+
+from .args import BaseApiSuccessResp
+from .utils import JSONEncoder, _current_json_types, _success_head
+
+__all__ = ["ModelPlan", "RespPlan"]
+
+TFieldEncoder = Optional[Callable[[Any], Any]]
+
+_NATIVE_TYPES = (str, int, float, bool, type(None))
+# BaseApiSuccessResp 自带的字段，由响应信封输出
+_ENVELOPE_FIELDS = frozenset(BaseApiSuccessResp.__fields__)
+
+
+def _nullable(encoder: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def _encode(v):
+        return None if v is None else encoder(v)
+
+    return _encode
+
+
+def _compile_type(tp: Any, plans: Dict[type, "ModelPlan"]) -> TFieldEncoder:
+    """根据类型注解生成编码函数，返回 None 表示值可以直接交给 json 输出"""
+    if tp is Any or (isinstance(tp, type) and issubclass(tp, _NATIVE_TYPES)):
+        return None
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        return ModelPlan.get(tp, plans).encode
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return None if issubclass(tp, _NATIVE_TYPES) else _encode_enum
+
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if origin is Literal:
+        return None
+    elif origin is Union:
+        encoders = [_compile_type(arg, plans) for arg in args if arg is not type(None)]
+        if all(encoder is None for encoder in encoders):
+            return None
+        elif len(encoders) == 1:
+            return _nullable(encoders[0])  # type: ignore
+        return _encode_generic
+    elif origin in (list, set, frozenset) or (
+        origin is tuple and len(args) == 2 and args[1] is ...
+    ):
+        item_encoder = _compile_type(args[0], plans) if args else None
+        if item_encoder is None:
+            return list
+        return lambda v: [item_encoder(i) for i in v]
+    elif origin is tuple:
+        encoders = tuple(_compile_type(arg, plans) for arg in args)
+        if all(encoder is None for encoder in encoders):
+            return list
+        return lambda v: [e(i) if e else i for e, i in zip(encoders, v)]
+    elif origin is dict:
+        value_encoder = _compile_type(args[1], plans) if args else None
+        if value_encoder is None:
+            return None
+        return lambda v: {k: value_encoder(i) for k, i in v.items()}
+    # 其余类型 (datetime/UUID/Decimal/自定义类型) 交给 app.json_types 处理
+    return None
+
+
+def _encode_enum(v: Enum) -> Any:
+    return v.value
+
+
+def _encode_generic(v: Any) -> Any:
+    if isinstance(v, BaseModel):
+        return ModelPlan.get(type(v)).encode(v)
+    return v
+
+
+class ModelPlan:
+    """BaseModel 的序列化计划：字段顺序、字段编码函数、嵌套模型的计划
+
+    与 `model.dict(by_alias=True)` 一样输出字段的 alias
+    """
+
+    _plans: Dict[type, "ModelPlan"] = {}
+
+    def __init__(self, model: Type[BaseModel], exclude=frozenset()) -> None:
+        self.model = model
+        self.fields = tuple()  # type: Tuple[Tuple[str, str, TFieldEncoder], ...]
+        self.exclude = exclude
+
+    def _compile(self, plans: Dict[type, "ModelPlan"]) -> None:
+        fields = []
+        for field_name, field in self.model.__fields__.items():
+            if field_name in self.exclude:
+                continue
+            encoder = _compile_type(field.outer_type_, plans)
+            if encoder is not None and field.allow_none:
+                encoder = _nullable(encoder)
+            fields.append((field_name, field.alias or field_name, encoder))
+        self.fields = tuple(fields)
+
+    @classmethod
+    def get(cls, model: Type[BaseModel], plans: Dict[type, "ModelPlan"] = None) -> "ModelPlan":
+        plans = cls._plans if plans is None else plans
+        plan = plans.get(model)
+        if plan is None:
+            plan = cls(model)
+            # 先登记再编译，支持自引用的模型
+            plans[model] = plan
+            plan._compile(plans)
+        return plan
+
+    def encode(self, obj: Union[BaseModel, Dict]) -> Dict[str, Any]:
+        if isinstance(obj, dict):
+            return self.encode_dict(obj)
+        res = {}
+        for field_name, alias, encoder in self.fields:
+            value = getattr(obj, field_name)
+            res[alias] = encoder(value) if encoder else value
+        return res
+
+    def encode_values(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """编码 `validate_model` 返回的以字段名为 key 的值"""
+        res = {}
+        for field_name, alias, encoder in self.fields:
+            if field_name in values:
+                value = values[field_name]
+                res[alias] = encoder(value) if encoder else value
+        return res
+
+    def encode_dict(self, data: Dict) -> Dict[str, Any]:
+        """未校验的数据，key 可以是字段名或 alias"""
+        res = {}
+        for field_name, alias, encoder in self.fields:
+            if field_name in data:
+                value = data[field_name]
+            elif alias in data:
+                value = data[alias]
+            else:
+                continue
+            res[alias] = encoder(value) if encoder else value
+        return res
+
+
+class RespPlan(ModelPlan):
+    """Handler.Resp 的序列化计划，在 register_view 时编译
+
+    validate 为 False 时跳过 Resp 的校验，直接按字段计划序列化 handler 的输出，
+    为 True 时用 `validate_model` 校验，不创建 Resp 实例，直接编码校验后的值
+    """
+
+    def __init__(self, model: Type[BaseApiSuccessResp], validate: bool = False) -> None:
+        super().__init__(model, exclude=_ENVELOPE_FIELDS)
+        self.validate = validate
+        self._compile(ModelPlan._plans)
+        # 字段名和 alias，未校验时其余的 key 原样输出
+        self._keys = frozenset(
+            key for field_name, alias, _ in self.fields for key in (field_name, alias)
+        )
+
+    def success(
+        self, status_message: str = "ok", status_code: int = 200, **data
+    ) -> Tuple[Response, int]:
+        res_data = _success_head(status_message, status_code, {})
+        if self.validate:
+            values, _, error = validate_model(self.model, data)
+            if error:
+                raise error
+            res_data.update(self.encode_values(values))
+        else:
+            res_data.update(self.encode_dict(data))
+            for k, v in data.items():
+                if k not in self._keys and k not in res_data:
+                    res_data[k] = v
+
+        registry = _current_json_types()
+        res_data = registry.stringify_big_ints(res_data)
+        if current_app.config.get("JSONIFY_PRETTYPRINT_REGULAR") or current_app.debug:
+            indent, separators = 2, (", ", ": ")  # type: Tuple[Optional[int], Tuple[str, str]]
+        else:
+            indent, separators = None, (",", ":")
+        body = json.dumps(
+            res_data,
+            indent=indent,
+            separators=separators,
+            default=JSONEncoder(json_types=registry).default,
+        )
+        return (
+            current_app.response_class(
+                body + "\n",
+                mimetype=current_app.config.get("JSONIFY_MIMETYPE") or "application/json",
+            ),
+            200,
+        )
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
 
 from typing_extensions import Literal
 
@@ -8,12 +8,16 @@ if TYPE_CHECKING:
 
 TCorsConfig = Dict[str, Union[str, List[str]]]
 
+TCacheConfig = Dict[str, Any]
+
 TFlaskResponse = Union[Tuple["Response", int], "Response"]
 
 
 MediaType = Literal[
     "text/plain; charset=utf-8",
     "application/json",
+    "application/x-www-form-urlencoded",
+    "multipart/form-data",
     "application/vnd.github+json",
     "application/vnd.github.v3+json",
     "application/vnd.github.v3.raw+json",
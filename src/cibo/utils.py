@@ -1,7 +1,7 @@
 from random import randint
 from typing import Tuple
 
-from flask import Response, current_app, jsonify
+from flask import Response, current_app, has_request_context, jsonify, stream_with_context
 from typing_extensions import Literal, TypedDict
 
 
@@ -73,35 +73,123 @@ def error(
 from dataclasses import asdict, is_dataclass
 from datetime import datetime
 from decimal import Decimal
-from math import log10
-from typing import Any, Iterable, Union
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Type, Union
 from uuid import UUID
 
 from flask.json import JSONEncoder, dumps
 from pydantic import BaseModel
 
+TEncoder = Callable[[Any], Any]
+
+# JavaScript Number.MAX_SAFE_INTEGER
+MAX_SAFE_INTEGER = 2**53 - 1
+
+
+def _encode_datetime(o: datetime) -> str:
+    return o.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _encode_model(o: BaseModel) -> dict:
+    return o.dict()
+
+
+class JSONTypeRegistry:
+    """按具体类型分派的 JSON 序列化器注册表
+
+    每个类型只解析一次编码函数并缓存，大量同类对象的序列化不再重复走 isinstance 链。
+
+    `big_int_policy`:
+        - "native": int 原样输出（默认）
+        - "string": 绝对值超过 `max_safe_int` 的 int 输出为字符串，避免 JavaScript 精度丢失
+    """
+
+    def __init__(
+        self, big_int_policy: str = "native", max_safe_int: int = MAX_SAFE_INTEGER
+    ) -> None:
+        if big_int_policy not in ("native", "string"):
+            raise ValueError("big_int_policy should be 'native' or 'string'")
+        self.big_int_policy = big_int_policy
+        self.max_safe_int = max_safe_int
+        self._encoders: Dict[type, TEncoder] = {
+            UUID: str,
+            datetime: _encode_datetime,
+            Decimal: float,
+        }
+        self._cache: Dict[type, Optional[TEncoder]] = dict()
+        self._lock = Lock()
+
+    def register(self, type_: Type, fn: Optional[TEncoder] = None):
+        """注册类型的编码函数，也可作为装饰器使用"""
+
+        def _register(fn: TEncoder) -> TEncoder:
+            with self._lock:
+                self._encoders[type_] = fn
+                self._cache.clear()
+            return fn
+
+        if fn is None:
+            return _register
+        return _register(fn)
+
+    def resolve(self, type_: Type) -> Optional[TEncoder]:
+        """返回类型对应的编码函数，没有则返回 None"""
+        try:
+            return self._cache[type_]
+        except KeyError:
+            encoder = self._lookup(type_)
+            self._cache[type_] = encoder
+            return encoder
+
+    def _lookup(self, type_: Type) -> Optional[TEncoder]:
+        for base in type_.__mro__:
+            if base in self._encoders:
+                return self._encoders[base]
+        if is_dataclass(type_):
+            return asdict
+        elif hasattr(type_, "to_dict_v2"):
+            return type_.to_dict_v2
+        elif hasattr(type_, "to_dict"):
+            return type_.to_dict
+        elif issubclass(type_, BaseModel):
+            return _encode_model
+        elif issubclass(type_, Iterable):  # Document是Iterable对象
+            return list
+        return None
+
+    def stringify_big_ints(self, o: Any) -> Any:
+        """按 big_int_policy 处理超出安全范围的 int"""
+        if self.big_int_policy == "native":
+            return o
+        type_ = type(o)
+        if type_ is int:
+            return str(o) if abs(o) > self.max_safe_int else o
+        elif type_ is dict:
+            return {k: self.stringify_big_ints(v) for k, v in o.items()}
+        elif type_ is list or type_ is tuple:
+            return [self.stringify_big_ints(v) for v in o]
+        return o
+
+
+json_types = JSONTypeRegistry()
+
+
+def _current_json_types() -> JSONTypeRegistry:
+    return getattr(current_app, "json_types", json_types) if current_app else json_types
+
 
 class JSONEncoder(JSONEncoder):
+    def __init__(self, *args, json_types: JSONTypeRegistry = None, **kwargs) -> None:
+        # flask>=2.2 会传入 default 参数覆盖 default 方法
+        kwargs.pop("default", None)
+        super().__init__(*args, **kwargs)
+        self.json_types = json_types or _current_json_types()
+
     def default(self, o: Any) -> Union[str, list, dict, Any]:
-        if isinstance(o, UUID):
-            return str(o)
-        elif isinstance(o, datetime):
-            return o.strftime("%Y-%m-%d %H:%M:%S")
-        elif isinstance(o, int) and log10(o) > 11:
-            return str(o)
-        elif isinstance(o, Decimal):
-            return float(o)
-        elif is_dataclass(o):
-            return asdict(o)
-        elif hasattr(o, "to_dict_v2"):
-            return o.to_dict_v2()  # type: ignore
-        elif hasattr(o, "to_dict"):
-            return o.to_dict()  # type: ignore
-        elif isinstance(o, BaseModel):
-            return o.dict()
-        elif isinstance(o, Iterable):  # Document是Iterable对象
-            return list(o)
-        return super().default(o)
+        encoder = self.json_types.resolve(type(o))
+        if encoder is None:
+            return super().default(o)
+        return self.json_types.stringify_big_ints(encoder(o))
 
 
 def jsonify_with_encoder(*args, **kwargs):
@@ -119,7 +207,99 @@ def jsonify_with_encoder(*args, **kwargs):
     else:
         data = args or kwargs
 
+    registry = _current_json_types()
+    data = registry.stringify_big_ints(data)
+
     return current_app.response_class(
-        dumps(data, indent=indent, separators=separators, cls=JSONEncoder) + "\n",
-        mimetype=current_app.config["JSONIFY_MIMETYPE"],
+        dumps(data, indent=indent, separators=separators, cls=JSONEncoder, json_types=registry)
+        + "\n",
+        mimetype=current_app.config.get("JSONIFY_MIMETYPE") or "application/json",
     )
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _stream_response(generate: Callable[[], Iterator[str]], mimetype: str) -> Response:
+    body = generate()
+    if has_request_context():
+        body = stream_with_context(body)
+    return current_app.response_class(body, mimetype=mimetype)
+
+
+def _success_head(status_message: str, status_code: int, data: dict) -> dict:
+    if status_code < 200 or status_code > 299:
+        raise ValueError("success status_code should be 200~299")
+    res_data = dict(
+        status_code=status_code,
+        status_message=status_message,
+        success=True,
+    )
+    res_data.update(data)
+    return res_data
+
+
+def stream_success(
+    items: Iterable,
+    status_message: str = "ok",
+    status_code: int = 200,
+    items_key: str = "items",
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    **data,
+) -> Tuple[Response, int]:
+    """以流的方式返回成功数据，items 逐个序列化，内存占用与条数无关"""
+    res_data = _success_head(status_message, status_code, data)
+    if items_key in res_data:
+        raise ValueError(f"`{items_key}` conflicts with envelope fields")
+    registry = _current_json_types()
+    encoder = JSONEncoder(separators=(",", ":"), json_types=registry)
+
+    def generate() -> Iterator[str]:
+        head = encoder.encode(registry.stringify_big_ints(res_data))
+        buffer = [head[:-1], ",", encoder.encode(items_key), ":["]
+        size = 0
+        sep = ""
+        for item in items:
+            chunk = encoder.encode(registry.stringify_big_ints(item))
+            buffer.append(sep)
+            buffer.append(chunk)
+            sep = ","
+            size += len(chunk)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+        buffer.append("]}\n")
+        yield "".join(buffer)
+
+    return _stream_response(generate, "application/json"), 200
+
+
+def stream_ndjson_success(
+    items: Iterable,
+    status_message: str = "ok",
+    status_code: int = 200,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    **data,
+) -> Tuple[Response, int]:
+    """以 NDJSON 流返回成功数据，首行为响应信封，之后每行一个 item"""
+    res_data = _success_head(status_message, status_code, data)
+    registry = _current_json_types()
+    encoder = JSONEncoder(separators=(",", ":"), json_types=registry)
+
+    def generate() -> Iterator[str]:
+        buffer = [encoder.encode(registry.stringify_big_ints(res_data)), "\n"]
+        size = 0
+        for item in items:
+            chunk = encoder.encode(registry.stringify_big_ints(item))
+            buffer.append(chunk)
+            buffer.append("\n")
+            size += len(chunk)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+
+    return _stream_response(generate, "application/x-ndjson"), 200
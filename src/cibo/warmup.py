@@ -0,0 +1,162 @@
+"""预热: 在接收流量之前完成一次性的计算，消除部署后第一批请求的延迟尖刺
+
+可以在 fork worker 之前调用（例如 gunicorn 的 `preload_app`），预热后的状态由 worker 写时复制共享:
+
+- 不启动线程，不打开文件和 socket，自请求在进程内执行且不经过 capture 中间件，
+  async handler 需要 asgiref 在另一个线程中运行事件循环，不发送自请求
+- 自请求结束后清空 metrics、profiler 和响应缓存中的数据，worker 从零开始统计
+- gc_freeze 时把现有对象移出 gc 的扫描范围，避免 worker 中的 gc 写入这些对象所在的内存页
+"""
+import gc
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from werkzeug.routing import Rule
+from werkzeug.test import Client
+
+from .handler import Handler
+
+if TYPE_CHECKING:
+    from .app import Flask
+
+__all__ = ["warmup", "STAGES"]
+
+STAGES = ("routing", "handlers", "spec", "docs", "requests", "gc_freeze")
+
+DOCS_PAGES = (
+    ("docs", "docs_path"),
+    ("oauth_redirect", "docs_oauth2_redirect_path"),
+    ("redoc", "redoc_path"),
+)
+
+
+def iter_handlers(app: "Flask") -> Iterator[Tuple[Rule, Type[Handler]]]:
+    """已注册的 Handler 及其路由，同一个 Handler 只返回第一条路由"""
+    seen = set()
+    for rule in app.url_map.iter_rules():
+        view_class = getattr(app.view_functions.get(rule.endpoint), "view_class", None)
+        if (
+            isinstance(view_class, type)
+            and issubclass(view_class, Handler)
+            and view_class not in seen
+        ):
+            seen.add(view_class)
+            yield rule, view_class
+
+
+def warm_handler(cls: Type[Handler]) -> None:
+    """参数绑定和序列化计划，正常情况下在 register_view 时已经生成，这里只是确保存在"""
+    binder = getattr(cls, "binder", None)
+    if binder is None:
+        return
+    if binder.path is not None:
+        binder.path._container_fields()
+    if binder.query is not None:
+        binder.query._query_decoders()
+    if binder.body is not None:
+        binder.body._container_fields()
+        binder.body._multipart_limits()
+
+
+def warmup(
+    app: "Flask",
+    *,
+    self_requests: bool = False,
+    methods: Iterable[str] = ("GET",),
+    headers: Optional[Dict[str, str]] = None,
+    seed: int = 0,
+    gc_freeze: bool = False,
+) -> Dict[str, float]:
+    """依次执行各 stage，返回每个 stage 的毫秒数，未执行的 stage 不在结果中
+
+    - routing: 编译路由匹配的状态机，否则在第一个请求中编译
+    - handlers: 各 Handler 的参数绑定和序列化计划
+    - spec: 生成 openapi spec 并序列化为字节
+    - docs: 渲染文档页面
+    - requests: self_requests 时用 `PayloadGenerator` 生成的参数对 methods 中的每个同步 Handler
+      请求一次，会执行 handle 和用户装饰器，只在它们没有副作用时开启，鉴权等需要的请求头通过 headers 传入
+    - gc_freeze: `gc.freeze()`，只在 fork 之前调用
+    """
+    times: Dict[str, float] = dict()
+
+    start = time.perf_counter()
+    app.url_map.update()
+    times["routing"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    handlers = list(iter_handlers(app))
+    for _, cls in handlers:
+        warm_handler(cls)
+    times["handlers"] = time.perf_counter() - start
+
+    if "_openapi" in app.blueprints:
+        if app.spec_path:
+            start = time.perf_counter()
+            app.build_spec()
+            times["spec"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with app.test_request_context():
+            for page, attr in DOCS_PAGES:
+                if getattr(app, attr):
+                    app.get_docs_response(page)
+        times["docs"] = time.perf_counter() - start
+
+    if self_requests:
+        start = time.perf_counter()
+        failures = _self_requests(app, handlers, {m.upper() for m in methods}, headers, seed)
+        times["requests"] = time.perf_counter() - start
+        for failure in failures:
+            app.logger.warning("warmup request failed: %s", failure)
+
+    if gc_freeze:
+        start = time.perf_counter()
+        gc.collect()
+        gc.freeze()
+        times["gc_freeze"] = time.perf_counter() - start
+
+    result = {stage: round(seconds * 1000, 2) for stage, seconds in times.items()}
+    app.logger.info(
+        "warmup finished: %s", ", ".join(f"{stage} {ms:.2f}ms" for stage, ms in result.items())
+    )
+    return result
+
+
+def _self_requests(
+    app: "Flask",
+    handlers: List[Tuple[Rule, Type[Handler]]],
+    methods: set,
+    headers: Optional[Dict[str, str]],
+    seed: int,
+) -> List[str]:
+    from .payloads import PayloadGenerator
+    from .replay import is_envelope_error
+
+    generator = PayloadGenerator(seed)
+    # 不经过 capture 中间件，预热请求不写入日志，也不会在 fork 之前打开日志文件
+    wsgi_app = app.capture.wsgi_app if app.capture is not None else app.wsgi_app
+    client = Client(wsgi_app, app.response_class)
+    failures: List[str] = []
+    for rule, cls in handlers:
+        if cls.is_async():
+            continue
+        for method in sorted(methods & set(cls.methods or ())):
+            request = generator.request(app, cls, method, rule=rule)
+            name = f"{method} {rule.rule}"
+            try:
+                resp = client.open(headers=headers, **request)
+            except Exception as e:
+                failures.append(f"{name}: {e!r}")
+                continue
+            if resp.status_code >= 400 or is_envelope_error(resp.status_code, resp.data):
+                failures.append(f"{name}: {resp.status_code} {resp.data[:200]!r}")
+
+    # 预热请求不计入统计，也不保留它们的缓存和 profile
+    if app.metrics is not None:
+        app.metrics.reset()
+    if app.profiler is not None:
+        app.profiler.clear()
+    for _, cls in handlers:
+        if cls.cache is not None:
+            cls.cache.clear()
+    return failures
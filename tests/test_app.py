@@ -0,0 +1,140 @@
+import copy
+import gc
+import gzip
+import json
+import logging
+
+from click.testing import CliRunner
+
+from cibo import BaseApiPath, Blueprint, Flask, Handler, SimpleContext
+from cibo.cli import main
+from demo import create_app
+
+
+def test_spec_is_served_as_prebuilt_bytes():
+    client = create_app().test_client()
+
+    resp = client.get("/openapi.json")
+    assert resp.status_code == 200
+    assert resp.cache_control.max_age == 86400
+    spec = json.loads(resp.data)
+    assert "/api/echo" in spec["paths"]
+
+    resp = client.get("/openapi.json", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+
+    resp = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(resp.data)) == spec
+
+
+def test_spec_force_update():
+    app = create_app()
+    spec = copy.deepcopy(app._get_spec())
+    assert app._get_spec(force_update=True) == spec
+
+
+def test_export_and_load_prebuilt_spec(tmp_path):
+    output = tmp_path / "openapi.json"
+    result = CliRunner().invoke(main, ["spec", "export", "demo:create_app", "-o", str(output)])
+    assert result.exit_code == 0, result.output
+
+    app = Flask(__name__, title="", version="0.1.0", prebuilt_spec=str(output))
+    resp = app.test_client().get("/openapi.json")
+    assert json.loads(resp.data) == json.loads(output.read_bytes())
+
+
+def test_docs_pages_are_rendered_once(monkeypatch):
+    app = create_app()
+    client = app.test_client()
+
+    resp = client.get("/docs", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert b"/openapi.json" in gzip.decompress(resp.data)
+
+    def _render(page):
+        raise AssertionError("docs page rendered twice")
+
+    monkeypatch.setattr(app, "_render_docs_page", _render)
+    resp = client.get("/docs")
+    assert b"/openapi.json" in resp.data
+    assert client.get("/docs", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+    assert (
+        client.get(
+            "/docs", headers={"If-Modified-Since": resp.headers["Last-Modified"]}
+        ).status_code
+        == 304
+    )
+
+
+def test_warmup(monkeypatch):
+    app = create_app()
+    times = app.warmup()
+    assert tuple(times) == ("routing", "handlers", "spec", "docs")
+    assert set(app._spec_responses) == {"json"}
+    assert {page for page, _ in app._docs_pages} == {"docs", "oauth_redirect", "redoc"}
+
+    def _fail(*args):
+        raise AssertionError("not warmed up")
+
+    monkeypatch.setattr(app, "_generate_spec", _fail)
+    monkeypatch.setattr(app, "_render_docs_page", _fail)
+    client = app.test_client()
+    assert "/api/echo" in client.get("/openapi.json").json["paths"]
+    assert client.get("/docs").status_code == 200
+    assert client.get("/redoc").status_code == 200
+
+
+def test_warmup_self_requests(tmp_path, caplog):
+    api = Blueprint("warmup_api", __name__)
+    calls = []
+
+    @api.get("/items/<int:id>")
+    class ItemHandler(Handler):
+        cache_config = {"ttl": 60}
+
+        class Path(BaseApiPath):
+            id: int
+
+        def handle(self, context: SimpleContext, path: Path):
+            calls.append(path.id)
+            return context.success(id=path.id)
+
+    @api.post("/items")
+    class CreateItemHandler(Handler):
+        def handle(self, context: SimpleContext):
+            calls.append("create")
+            return context.success()
+
+    @api.get("/broken")
+    class BrokenHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.error("broken")
+
+    @api.get("/async")
+    class AsyncHandler(Handler):
+        async def handle(self, context: SimpleContext):
+            calls.append("async")
+            return context.success()
+
+    capture_log = tmp_path / "capture.ndjson.gz"
+    app = Flask(
+        __name__, title="", version="0.1.0", metrics_path="/metrics", capture_log=str(capture_log)
+    )
+    app.register_blueprint(api)
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        times = app.warmup(self_requests=True, gc_freeze=True)
+    gc.unfreeze()
+    assert set(times) == {"routing", "handlers", "spec", "docs", "requests", "gc_freeze"}
+    # 默认只请求 GET，跳过 async handler，失败的请求只记录日志
+    assert len(calls) == 1 and isinstance(calls[0], int)
+    assert [r.getMessage() for r in caplog.records if "GET /broken" in r.getMessage()]
+
+    # 预热请求不计入统计、不写入 capture 日志、不保留缓存
+    assert ItemHandler.cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+    assert app.metrics.collect().statuses == {}
+    assert not list(tmp_path.glob("capture.ndjson.gz*"))
+
+    app.warmup(self_requests=True, methods=("GET", "POST"))
+    assert "create" in calls
@@ -1,9 +1,12 @@
-from typing import List
+from typing import Dict, List, Optional, Set
 
 import pytest
+from pydantic import BaseModel
 from pydantic.error_wrappers import ValidationError
+from werkzeug.datastructures import ImmutableMultiDict
 
-from cibo.args import BaseApiBody, BaseApiQuery
+from cibo.args import BaseApiArgs, BaseApiBody, BaseApiQuery
+from cibo.decoder import _JSON_SPECIAL_PATTERN
 
 
 def test_auto_trans_raise_base_api_body():
@@ -21,3 +24,70 @@ def test_auto_trans_type_base_api_query():
 
     query = Query(ids=["a", 2])
     assert query.ids[1] == "2"
+
+
+def test_query_decoder_styles():
+    class Query(BaseApiQuery):
+        a: str
+        b: Optional[List[int]]
+        c: Optional[Dict[str, int]]
+        d: Set[str] = set()
+
+    def parse(items):
+        return Query.parse_request_args(ImmutableMultiDict(items))
+
+    assert parse([("a", "x"), ("b", "1"), ("b", "2")]).b == [1, 2]
+    assert parse([("a", "x"), ("b", "1,2,3")]).b == [1, 2, 3]
+    assert parse([("a", "x"), ("b", "[1, 2]")]).b == [1, 2]
+    assert parse([("a", "x"), ("d", "['p', 'q']")]).d == {"p", "q"}
+    assert parse([("a", "x"), ("c[k]", "1"), ("c[v]", "2")]).c == {"k": 1, "v": 2}
+    assert parse([("a", "x"), ("c", '{"k": 1}')]).c == {"k": 1}
+    assert parse([("a", "1,2")]).a == "1,2"
+
+
+def test_query_decoder_limits(monkeypatch):
+    class Query(BaseApiQuery):
+        _max_items = 3
+
+        b: List[int] = []
+        c: Dict[str, str] = {}
+
+    def errors(items):
+        with pytest.raises(ValidationError) as excinfo:
+            Query.parse_request_args(ImmutableMultiDict(items))
+        return excinfo.value.errors()
+
+    assert errors([("b", "[" * 9 + "]" * 9)])[0]["loc"] == ("b",)
+    assert errors([("b", "1,2,3,4")])[0]["msg"] == "number of items exceeds 3"
+    assert errors([("b", "1" * 5000)])[0]["msg"] == "value length exceeds 4096"
+    assert errors([("c", "{bad}")])[0]["loc"] == ("c",)
+    # 字符串中的括号不计入嵌套深度
+    query = Query.parse_request_args(ImmutableMultiDict([("c", '{"k": "[[[[[[[[[["}')]))
+    assert query.c == {"k": "[" * 10}
+    # 未闭合的字符串中全是转义，不会回溯：每个字节最多被扫描一次
+    pattern = _JSON_SPECIAL_PATTERN
+    scanned = []
+
+    class CountingPattern:
+        def finditer(self, data):
+            for m in pattern.finditer(data):
+                assert m.end() - m.start() == 1
+                scanned.append(m.start())
+                yield m
+
+    monkeypatch.setattr("cibo.decoder._JSON_SPECIAL_PATTERN", CountingPattern())
+    b, c = "[" + '"\\' * 2000, "{" + '"\\' * 2000
+    errors([("b", b), ("c", c)])
+    assert len(b) < len(scanned) <= len(b) + len(c)
+
+
+def test_subclass_check_by_mro():
+    class Query(BaseApiQuery):
+        a: int
+
+    assert issubclass(Query, BaseApiArgs) and issubclass(Query, BaseModel)
+    assert isinstance(Query(a=1), BaseApiQuery)
+    assert not issubclass(BaseApiBody, BaseApiQuery)
+    assert not issubclass(int, BaseApiArgs) and not issubclass(int, BaseModel)
+    # 不在 MRO 中时交给 ABC 的默认检查（注册的虚拟子类）
+    assert BaseApiArgs.__subclasshook__(int) is NotImplemented
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+
+import pytest
+from flask import request
+
+from cibo import BaseApiBody, BaseApiPath, Blueprint, Flask, Handler, SimpleContext
+
+IO_WAIT = 0.1
+
+
+def _create_app():
+    api = Blueprint("asgi_api", __name__)
+
+    @api.get("/sleep/<int:id>")
+    class SleepHandler(Handler):
+        class Path(BaseApiPath):
+            id: int
+
+        async def handle(self, context: SimpleContext, path: Path):
+            await asyncio.sleep(IO_WAIT)
+            return context.success(id=path.id)
+
+    @api.post("/echo")
+    class EchoHandler(Handler):
+        class Body(BaseApiBody):
+            msg: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(msg=body.msg)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app.as_asgi(max_workers=4)
+
+
+async def _request(asgi_app, method: str, path: str, body: bytes = b"", headers=(), chunks=None):
+    if chunks is None:
+        chunks = [body]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": list(headers),
+        "http_version": "1.1",
+    }
+    await asgi_app(scope, receive, send)
+    status = sent[0]["status"]
+    return status, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_asgi_dispatch():
+    asgi_app = _create_app()
+
+    async def main():
+        status, body = await _request(
+            asgi_app,
+            "POST",
+            "/echo",
+            b'{"msg": "hi"}',
+            [(b"content-type", b"application/json")],
+        )
+        assert status == 200 and json.loads(body)["msg"] == "hi"
+
+        status, body = await _request(asgi_app, "GET", "/openapi.json")
+        assert status == 200 and "/echo" in json.loads(body)["paths"]
+
+        status, _ = await _request(asgi_app, "GET", "/missing")
+        assert status == 404
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_request(asgi_app, "GET", f"/sleep/{i}") for i in range(20))
+        )
+        assert time.perf_counter() - start < IO_WAIT * 5
+        assert [json.loads(body)["id"] for _, body in results] == list(range(20))
+
+    asyncio.run(main())
+
+
+def test_asgi_body_limits():
+    api = Blueprint("asgi_limits_api", __name__)
+
+    @api.post("/small")
+    class SmallHandler(Handler):
+        max_body_bytes = 16
+
+        class Body(BaseApiBody):
+            msg: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(msg=body.msg)
+
+    @api.post("/large")
+    class LargeHandler(Handler):
+        class Body(BaseApiBody):
+            msg: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(size=len(body.msg))
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    asgi_app = app.as_asgi(max_workers=1, max_body_bytes=64)
+    json_type = (b"content-type", b"application/json")
+
+    async def main():
+        status, body = await _request(asgi_app, "POST", "/small", b'{"msg": "hi"}', [json_type])
+        assert status == 200 and json.loads(body)["msg"] == "hi"
+
+        # 声明的长度超限时不读取请求体，Handler 返回与 binder 相同的错误信封
+        big = json.dumps({"msg": "x" * 100}).encode()
+        length = (b"content-length", str(len(big)).encode())
+        status, body = await _request(asgi_app, "POST", "/small", big, [json_type, length])
+        assert status == 200 and json.loads(body)["status_code"] == 413
+
+        # 没有 Content-Length 时累计超过 max_body_bytes 后停止读取
+        chunks = [big[i:][:10] for i in range(0, len(big), 10)]
+        status, body = await _request(
+            asgi_app, "POST", "/large", headers=[json_type], chunks=chunks
+        )
+        assert status == 200 and json.loads(body)["status_code"] == 413
+
+        status, _ = await _request(asgi_app, "POST", "/missing", big)
+        assert status == 413
+
+        app.config["MAX_CONTENT_LENGTH"] = 1024
+        status, body = await _request(asgi_app, "POST", "/large", big, [json_type])
+        assert json.loads(body)["size"] == 100
+
+        # Flask(max_body_bytes=...) 优先于 MAX_CONTENT_LENGTH
+        app.max_body_bytes = 32
+        status, body = await _request(asgi_app, "POST", "/large", big, [json_type])
+        assert status == 200 and json.loads(body)["status_code"] == 413
+
+    asyncio.run(main())
+    # WSGI 下 binder 同样使用 Flask(max_body_bytes=...)
+    resp = app.test_client().post("/large", json={"msg": "x" * 100})
+    assert resp.json["status_code"] == 413
+
+
+def test_asgi_client_disconnect_and_scopes():
+    calls = []
+    api = Blueprint("asgi_disconnect_api", __name__)
+
+    @api.post("/echo")
+    class EchoHandler(Handler):
+        class Body(BaseApiBody):
+            msg: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            calls.append(body.msg)
+            return context.success(msg=body.msg)
+
+    @api.get("/cookies")
+    class CookieHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.success(cookies=request.cookies.to_dict())
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    asgi_app = app.as_asgi(max_workers=1)
+    scope = {"type": "http", "method": "POST", "path": "/echo", "query_string": b"", "headers": []}
+
+    async def main():
+        # 请求体接收完之前断开，不调用 Handler 也不发送响应
+        messages = [
+            {"type": "http.request", "body": b'{"msg": "par', "more_body": True},
+            {"type": "http.disconnect"},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi_app(scope, receive, send)
+        assert sent == [] and calls == []
+
+        # 多个 Cookie 头用 "; " 合并
+        cookies = [(b"cookie", b"a=1"), (b"cookie", b"b=2")]
+        status, body = await _request(asgi_app, "GET", "/cookies", headers=cookies)
+        assert json.loads(body)["cookies"] == {"a": "1", "b": "2"}
+
+        # websocket 在握手时被拒绝，未知的 scope 抛出明确的错误
+        messages = [{"type": "websocket.connect"}]
+        await asgi_app({"type": "websocket", "path": "/"}, receive, send)
+        assert sent == [{"type": "websocket.close", "code": 1003}]
+        with pytest.raises(ValueError, match="unsupported ASGI scope type"):
+            await asgi_app({"type": "custom"}, receive, send)
+
+    asyncio.run(main())
+
+
+def test_asgi_lifespan_warmup():
+    app = Flask(__name__, title="", version="0.1.0", warmup_on_startup=True)
+    asgi_app = app.as_asgi(max_workers=1)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app({"type": "lifespan"}, receive, send))
+    assert [m["type"] for m in sent] == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert set(app._spec_responses) == {"json"}
@@ -0,0 +1,116 @@
+import gzip
+import json
+
+from cibo import BaseApiBody, BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.batch import batch_authorized
+
+
+class AuthException(Exception):
+    pass
+
+
+def _create_app(**kwargs):
+    api = Blueprint("batch_api", __name__)
+
+    @api.errorhandler(AuthException)
+    def handle_auth_exception(e: AuthException):
+        return SimpleContext.error("auth", 401)
+
+    def token_auth(fn):
+        def wrapper(*args, **kwargs):
+            from flask import request
+
+            if not batch_authorized() and request.headers.get("token", None) != "123":
+                raise AuthException()
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    @api.get("/add")
+    class AddHandler(Handler):
+        decorators = [token_auth]
+
+        class Query(BaseApiQuery):
+            a: int
+            b: int
+
+        def handle(self, context: SimpleContext, query: Query):
+            return context.success(sum=query.a + query.b)
+
+    @api.post("/echo")
+    class EchoHandler(Handler):
+        class Body(BaseApiBody):
+            msg: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(msg=body.msg)
+
+    app = Flask(__name__, title="", version="0.1.0", batch_path="/batch", **kwargs)
+    app.register_blueprint(api)
+    return app
+
+
+def test_batch():
+    client = _create_app().test_client()
+    resp = client.post(
+        "/batch",
+        json={
+            "requests": [{"path": "/add", "query": {"a": 1, "b": i}} for i in range(5)]
+            + [
+                {"method": "post", "path": "/echo", "body": {"msg": "hi"}},
+                {"path": "/missing"},
+                {"method": "post", "path": "/batch", "body": {"requests": []}},
+                {"method": "delete", "path": "/echo"},
+            ]
+        },
+        headers={"token": "123"},
+    )
+    responses = json.loads(resp.data)["responses"]
+    assert [r["body"]["sum"] for r in responses[:5]] == [1, 2, 3, 4, 5]
+    assert responses[5]["body"]["msg"] == "hi"
+    assert responses[6]["body"]["status_code"] == 404
+    assert responses[7]["body"]["status_code"] == 404
+    assert responses[8]["status"] == 405
+
+    resp = client.post("/batch", json={"requests": [{"path": "/add", "query": {"a": 1, "b": 1}}]})
+    assert json.loads(resp.data)["responses"][0]["body"]["status_code"] == 401
+
+
+def test_batch_limits_and_shared_auth():
+    calls = []
+
+    def batch_auth():
+        calls.append(1)
+
+    client = _create_app(batch_max_size=2, batch_auth=batch_auth).test_client()
+    resp = client.post("/batch", json={"requests": [{"path": "/echo"}] * 3})
+    assert json.loads(resp.data)["status_code"] == 413
+    assert calls == []
+
+    client.post("/batch", json={"requests": [{"path": "/echo"}] * 2})
+    assert calls == [1]
+
+    # batch_auth 通过后，检查 batch_authorized() 的鉴权装饰器不再重复鉴权
+    resp = client.post("/batch", json={"requests": [{"path": "/add", "query": {"a": 1, "b": 1}}]})
+    assert json.loads(resp.data)["responses"][0]["body"]["sum"] == 2
+    resp = client.get("/add?a=1&b=1")
+    assert json.loads(resp.data)["status_code"] == 401
+
+
+def test_batch_strips_encoding_and_conditional_headers():
+    client = _create_app(compress=True, compress_min_size=0, etag=True).test_client()
+    headers = {"token": "123", "Accept-Encoding": "gzip"}
+    etag = client.get("/add?a=1&b=1", headers={"token": "123"}).headers["ETag"]
+    resp = client.post(
+        "/batch",
+        json={"requests": [{"path": "/add", "query": {"a": 1, "b": 1}}]},
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert resp.headers["Content-Encoding"] == "gzip"
+    responses = json.loads(gzip.decompress(resp.data))["responses"]
+    assert responses == [
+        {
+            "status": 200,
+            "body": {"success": True, "status_code": 200, "status_message": "ok", "sum": 2},
+        }
+    ]
@@ -0,0 +1,35 @@
+from benchmarks.suite import compare, run_phases, run_pipeline
+
+
+def test_compare():
+    baseline = {
+        "pipeline": {"wsgi": {"ping": 1000.0, "echo": 1000.0}},
+        "phases": {"query_parsing": 10.0, "cors": 10.0},
+    }
+    current = {
+        "pipeline": {"wsgi": {"ping": 800.0, "echo": 950.0}},
+        "phases": {"query_parsing": 12.0, "cors": 10.5},
+    }
+    regressions = compare(baseline, current, threshold=0.15)
+    assert [r.metric for r in regressions] == [
+        "pipeline.wsgi.ping (req/s)",
+        "phases.query_parsing (us)",
+    ]
+    assert compare(baseline, baseline) == []
+
+
+def test_run():
+    pipeline = run_pipeline(min_time=0, min_iterations=1, cases=["ping", "large_body"])
+    assert set(pipeline) == {"client", "wsgi"}
+    assert set(pipeline["wsgi"]) == {"ping", "large_body"}
+    phases = run_phases(min_time=0, min_iterations=1, phases=["json_body_binding", "cors"])
+    assert set(phases) == {"json_body_binding", "cors"}
+    assert all(v > 0 for v in phases.values())
+
+
+def test_startup():
+    from benchmarks.startup import STAGES, run_startup
+
+    startup = run_startup(n=5, repeat=1)
+    assert tuple(startup) == STAGES
+    assert all(v > 0 for v in startup.values())
@@ -0,0 +1,134 @@
+import json
+from io import BytesIO
+from typing import Dict, List, Optional
+
+import pytest
+
+from cibo import BaseApiBody, BaseApiPath, BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.decoder import _JSON_SPECIAL_PATTERN, DecodeError, check_json_limits
+
+
+def _create_app():
+    api = Blueprint("binder_api", __name__)
+
+    @api.post("/items/<int:id>")
+    class ItemHandler(Handler):
+        class Path(BaseApiPath):
+            id: int
+
+        class Query(BaseApiQuery):
+            a: str
+            b: Optional[List[int]]
+
+        class Body(BaseApiBody):
+            c: Dict[str, int]
+
+        def handle(self, context: SimpleContext, path: Path, query: Query, body: Body):
+            return context.success(id=path.id, a=query.a, b=query.b, c=body.c)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app, ItemHandler
+
+
+def test_binder_is_compiled_at_registration():
+    _, ItemHandler = _create_app()
+
+    binder = ItemHandler.binder
+    assert binder.query is ItemHandler.Query
+    assert binder.body is ItemHandler.Body
+    assert binder.path is ItemHandler.Path
+    assert ItemHandler.Query._container_fields() == ("b",)
+
+
+def test_binder_parses_json_and_form_body():
+    app, _ = _create_app()
+    client = app.test_client()
+
+    resp = client.post(
+        "/items/1?a=x&b=[1,2]",
+        data='{"c": {"k": 1}}',
+        content_type="application/json; charset=utf-8",
+    )
+    assert json.loads(resp.data) == {
+        "id": 1,
+        "a": "x",
+        "b": [1, 2],
+        "c": {"k": 1},
+        "status_code": 200,
+        "status_message": "ok",
+        "success": True,
+    }
+
+    resp = client.post("/items/2?a=y", data={"c": '{"k": 2}'})
+    assert json.loads(resp.data)["c"] == {"k": 2}
+
+
+def _create_limited_app():
+    api = Blueprint("limited_api", __name__, max_body_bytes=64, max_body_depth=2)
+
+    @api.post("/limited")
+    class LimitedHandler(Handler):
+        max_body_items = 3
+
+        class Body(BaseApiBody):
+            a: List = []
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(a=body.a)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app, LimitedHandler
+
+
+def test_body_limits():
+    app, LimitedHandler = _create_limited_app()
+    assert LimitedHandler.binder.max_body_bytes == 64
+    assert LimitedHandler.binder.max_body_items == 3
+    client = app.test_client()
+
+    resp = client.post("/limited", json={"a": [[1], 2, 3]})
+    assert resp.status_code == 200
+
+    for payload in ({"a": [[[1]]]}, {"a": [1, 2, 3, 4]}, {"a": ["x" * 64]}):
+        resp = client.post("/limited", json=payload)
+        data = json.loads(resp.data)
+        assert data["success"] is False and data["status_code"] == 413
+
+    # 没有 Content-Length 时读取过程中计数
+    resp = client.post(
+        "/limited",
+        input_stream=BytesIO(json.dumps({"a": ["x" * 64]}).encode()),
+        content_type="application/json",
+        environ_overrides={"wsgi.input_terminated": True},
+    )
+    assert json.loads(resp.data)["status_code"] == 413
+
+
+def test_json_limits_scan_is_linear(monkeypatch):
+    # 字符串中的括号、逗号和转义的引号不计数
+    check_json_limits(b'[["a,b,c,d", "\\"]]"], "[[[["]', max_depth=2, max_items=2)
+    # 转义的反斜杠之后引号结束字符串
+    with pytest.raises(DecodeError):
+        check_json_limits(b'["\\\\", [[1]]]', max_depth=2, max_items=2)
+
+    # 未闭合的字符串中全是转义，不会回溯：每个字节最多被扫描一次
+    pattern = _JSON_SPECIAL_PATTERN
+    scanned = []
+
+    class CountingPattern:
+        def finditer(self, data):
+            for m in pattern.finditer(data):
+                scanned.append(m.end() - m.start())
+                yield m
+
+    data = b"[" + b'"\\' * 200_000
+    with monkeypatch.context() as m:
+        m.setattr("cibo.decoder._JSON_SPECIAL_PATTERN", CountingPattern())
+        check_json_limits(data, max_depth=8, max_items=1000)
+    assert len(scanned) == len(data) and set(scanned) == {1}
+
+    app, _ = _create_limited_app()
+    resp = app.test_client().post("/limited", data=data[:60], content_type="application/json")
+    assert resp.status_code == 400
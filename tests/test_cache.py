@@ -0,0 +1,122 @@
+import json
+from functools import wraps
+from typing import Set
+
+import pytest
+from flask import request
+
+from cibo import BaseApiPath, BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.cache import CacheBackend, CachedResponse, LRUCache, _digest
+
+
+def _create_app():
+    api = Blueprint("cache_api", __name__)
+    calls = {"handle": 0, "auth": 0}
+
+    def token_auth(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            calls["auth"] += 1
+            if request.headers.get("Authorization") != "token":
+                return SimpleContext.error("auth", 401)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    @api.get("/users/<int:id>")
+    class UserHandler(Handler):
+        decorators = [token_auth]
+        cache_config = {"ttl": 30, "vary_headers": ["Accept-Language"]}
+
+        class Path(BaseApiPath):
+            id: int
+
+        class Query(BaseApiQuery):
+            fields: str = "all"
+
+        def handle(self, context: SimpleContext, path: Path, query: Query):
+            calls["handle"] += 1
+            if path.id == 0:
+                return context.error("not found", 404)
+            return context.success(id=path.id, fields=query.fields, n=calls["handle"])
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app, UserHandler, calls
+
+
+def test_cache_hit_skips_handle():
+    app, UserHandler, calls = _create_app()
+    client = app.test_client()
+    headers = {"Authorization": "token"}
+
+    first = client.get("/users/1?fields=name", headers=headers)
+    second = client.get("/users/1?fields=name", headers=headers)
+    assert first.data == second.data
+    assert second.headers["Cache-Control"] == "max-age=30"
+    assert first.headers["Vary"] == second.headers["Vary"] == "Accept-Language"
+    assert calls == {"handle": 1, "auth": 2}
+    assert UserHandler.cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    # 鉴权在缓存之前执行
+    resp = client.get("/users/1?fields=name")
+    assert json.loads(resp.data)["status_code"] == 401
+    # vary_headers 不同不命中
+    client.get("/users/1?fields=name", headers={**headers, "Accept-Language": "en"})
+    assert calls["handle"] == 2
+
+    # 错误信封不缓存
+    client.get("/users/0", headers=headers)
+    client.get("/users/0", headers=headers)
+    assert calls["handle"] == 4
+
+
+def test_cache_invalidate():
+    app, UserHandler, calls = _create_app()
+    client = app.test_client()
+    headers = {"Authorization": "token"}
+
+    client.get("/users/1?fields=name", headers=headers)
+    client.get("/users/2", headers=headers)
+    assert UserHandler.invalidate(query={"fields": "name"}, path={"id": 1}) == 1
+    client.get("/users/1?fields=name", headers=headers)
+    assert calls["handle"] == 3
+
+    with pytest.raises(ValueError):
+        UserHandler.invalidate(query={"fields": "name"})
+    assert UserHandler.invalidate() == 2
+
+
+def test_lru_cache_eviction_and_ttl():
+    cache = LRUCache(max_entries=2)
+    value = CachedResponse(b"", 200, [])
+    cache.set("a", value, 60)
+    cache.set("b", value, 60)
+    cache.get("a")
+    cache.set("c", value, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") is value
+
+    # 过期的条目在访问时删除
+    cache.set("d", value, -1)
+    assert cache.get("d") is None
+    assert len(cache) == 1
+
+
+def test_cache_key_ignores_set_order():
+    class Query(BaseApiQuery):
+        tags: Set[str]
+
+    # 字符串的 hash 随机化后 set 的迭代顺序不同，插入顺序不同也可能不同
+    tags = [f"tag{i}" for i in range(50)]
+    assert _digest(Query(tags=tags)) == _digest(Query(tags=list(reversed(tags))))
+    assert _digest(Query(tags=tags)) != _digest(Query(tags=tags[1:]))
+
+
+def test_cache_backend_is_abstract():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,74 @@
+import gzip
+import json
+import zlib
+
+from cibo import Blueprint, Flask, Handler, SimpleContext
+
+
+def _create_app():
+    api = Blueprint("compress_api", __name__)
+
+    @api.get("/big")
+    class BigHandler(Handler):
+        cache_config = {"ttl": 60}
+
+        def handle(self, context: SimpleContext):
+            return context.success(rows=[{"id": i, "name": "name"} for i in range(100)])
+
+    @api.get("/small")
+    class SmallHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.success()
+
+    @api.get("/stream")
+    class StreamHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.stream_success(items=({"id": i} for i in range(100)))
+
+    app = Flask(__name__, title="", version="0.1.0", compress=True, etag=True)
+    app.register_blueprint(api)
+    return app, BigHandler
+
+
+def test_compress_negotiation():
+    app, _ = _create_app()
+    client = app.test_client()
+
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert len(json.loads(gzip.decompress(resp.data))["rows"]) == 100
+
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+    assert resp.headers["Content-Encoding"] == "deflate"
+    assert len(json.loads(zlib.decompress(resp.data))["rows"]) == 100
+
+    resp = client.get("/big")
+    assert "Content-Encoding" not in resp.headers
+
+    resp = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_compress_stream():
+    app, _ = _create_app()
+    resp = app.test_client().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in resp.headers
+    assert len(json.loads(gzip.decompress(resp.data))["items"]) == 100
+
+
+def test_compress_cached_and_etag():
+    app, BigHandler = _create_app()
+    client = app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/big", headers=headers)
+    second = client.get("/big", headers=headers)
+    assert BigHandler.cache.stats()["hits"] == 1
+    assert first.data == second.data
+    entry = next(iter(BigHandler.cache.backend._data.values()))[1]
+    assert entry.encoded["gzip"] == second.data
+
+    resp = client.get("/big", headers={**headers, "If-None-Match": second.headers["ETag"]})
+    assert resp.status_code == 304
@@ -0,0 +1,97 @@
+import json
+
+from cibo import Blueprint, Flask, Handler, SimpleContext
+
+
+def _create_app():
+    api = Blueprint("context_api", __name__)
+
+    @api.get("/rows")
+    class RowsHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.stream_success(items=({"id": i} for i in range(3)), total=3)
+
+    @api.get("/rows.ndjson")
+    class NdjsonRowsHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.stream_ndjson(items=({"id": i} for i in range(3)))
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app
+
+
+def test_stream_success():
+    client = _create_app().test_client()
+    resp = client.get("/rows")
+    assert resp.is_streamed
+    assert json.loads(resp.data) == {
+        "status_code": 200,
+        "status_message": "ok",
+        "success": True,
+        "total": 3,
+        "items": [{"id": 0}, {"id": 1}, {"id": 2}],
+    }
+
+
+def test_stream_ndjson():
+    client = _create_app().test_client()
+    resp = client.get("/rows.ndjson")
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert lines[0] == {"status_code": 200, "status_message": "ok", "success": True}
+    assert lines[1:] == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def _create_etag_app():
+    api = Blueprint("etag_api", __name__)
+    calls = {"load": 0}
+
+    @api.get("/article")
+    class ArticleHandler(Handler):
+        def handle(self, context: SimpleContext):
+            return context.success(title="hello")
+
+    @api.get("/versioned")
+    class VersionedHandler(Handler):
+        etag = False
+
+        def handle(self, context: SimpleContext):
+            rv = context.if_none_match(version=3)
+            if rv is not None:
+                return rv
+            calls["load"] += 1
+            return context.success(title="hello")
+
+    app = Flask(__name__, title="", version="0.1.0", etag=True)
+    app.register_blueprint(api)
+    return app, calls
+
+
+def test_etag_conditional_get():
+    app, _ = _create_etag_app()
+    client = app.test_client()
+
+    resp = client.get("/article")
+    etag = resp.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert json.loads(resp.data)["title"] == "hello"
+
+    resp = client.get("/article", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+
+    resp = client.get("/article", headers={"If-None-Match": 'W/"other"'})
+    assert resp.status_code == 200
+
+
+def test_etag_version_token():
+    app, calls = _create_etag_app()
+    client = app.test_client()
+
+    resp = client.get("/versioned")
+    etag = resp.headers["ETag"]
+    resp = client.get("/versioned", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert calls["load"] == 1
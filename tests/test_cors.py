@@ -0,0 +1,91 @@
+from functools import wraps
+
+from cibo import BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.cors import CorsPolicy
+
+
+def _create_app():
+    api = Blueprint("cors_api", __name__)
+    calls = {"auth": 0}
+
+    def token_auth(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            calls["auth"] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    @api.post("/items")
+    class ItemHandler(Handler):
+        decorators = [token_auth]
+        cors_config = {
+            "Access-Control-Allow-Origin": ["https://app.example.com", "https://*.example.org"],
+            "Access-Control-Allow-Methods": ["POST", "OPTIONS"],
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Max-Age": 3600,
+        }
+
+        class Query(BaseApiQuery):
+            n: int
+
+        def handle(self, context: SimpleContext, query: Query):
+            return context.success(n=query.n)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app, calls
+
+
+def test_preflight_is_answered_directly():
+    app, calls = _create_app()
+    resp = app.test_client().options(
+        "/items",
+        headers={"Origin": "https://app.example.com", "Access-Control-Request-Method": "POST"},
+    )
+    assert resp.status_code == 204
+    assert resp.headers["Access-Control-Allow-Origin"] == "https://app.example.com"
+    assert resp.headers["Access-Control-Allow-Methods"] == "POST,OPTIONS"
+    assert resp.headers["Access-Control-Allow-Headers"] == "Content-Type"
+    assert resp.headers["Access-Control-Max-Age"] == "3600"
+    assert "Origin" in resp.headers["Vary"]
+    # 没有执行用户装饰器和参数绑定（缺少必填的 n）
+    assert calls["auth"] == 0
+
+
+def test_cors_origin_allow_list():
+    app, _ = _create_app()
+    client = app.test_client()
+
+    resp = client.post("/items?n=1", json={}, headers={"Origin": "https://a.example.org"})
+    assert resp.headers["Access-Control-Allow-Origin"] == "https://a.example.org"
+    assert "Access-Control-Max-Age" not in resp.headers
+
+    resp = client.post("/items?n=1", json={}, headers={"Origin": "https://evil.com"})
+    assert "Access-Control-Allow-Origin" not in resp.headers
+    resp = client.post("/items?n=1", json={}, headers={"Origin": "https://a.b.example.org"})
+    assert "Access-Control-Allow-Origin" not in resp.headers
+
+
+def test_cors_policy_credentials():
+    policy = CorsPolicy({"Access-Control-Allow-Credentials": True})
+    assert policy.allow_origin("https://a.com") == "https://a.com"
+    assert ("Access-Control-Allow-Credentials", "true") in policy.headers
+    assert CorsPolicy({}).allow_origin(None) == "*"
+
+
+def test_empty_cors_config_adds_no_headers():
+    api = Blueprint("cors_empty", __name__)
+
+    @api.get("/plain")
+    class PlainHandler(Handler):
+        cors_config = {}
+
+        def handle(self, context: SimpleContext):
+            return context.success()
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    resp = app.test_client().get("/plain", headers={"Origin": "https://a.com"})
+    assert resp.status_code == 200
+    assert "Access-Control-Allow-Origin" not in resp.headers
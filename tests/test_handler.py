@@ -0,0 +1,99 @@
+import asyncio
+import json
+import time
+from functools import wraps
+
+import pytest
+
+from cibo import BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+
+pytest.importorskip("asgiref")
+
+N = 10
+IO_WAIT = 0.1
+
+
+class AuthException(Exception):
+    pass
+
+
+def token_auth(fn):
+    def wrapper(*args, **kwargs):
+        from flask import request
+
+        if request.headers.get("token", None) != "123":
+            raise AuthException()
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def async_token_auth(fn):
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        from flask import request
+
+        await asyncio.sleep(0)
+        if request.headers.get("token", None) != "123":
+            raise AuthException()
+        return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _create_app():
+    api = Blueprint("async_api", __name__)
+
+    @api.errorhandler(AuthException)
+    def handle_auth_exception(e: AuthException):
+        return SimpleContext.error("auth", 401)
+
+    @api.get("/fan-out")
+    class FanOutHandler(Handler):
+        decorators = [token_auth]
+
+        class Query(BaseApiQuery):
+            n: int
+
+        async def handle(self, context: SimpleContext, query: Query):
+            async def backend(i: int) -> int:
+                await asyncio.sleep(IO_WAIT)
+                return i
+
+            results = await asyncio.gather(*(backend(i) for i in range(query.n)))
+            return context.success(results=results)
+
+    @api.get("/async-auth")
+    class AsyncAuthHandler(Handler):
+        decorators = [async_token_auth]
+        cors_config = {"Access-Control-Allow-Origin": ["*"]}
+
+        async def handle(self, context: SimpleContext):
+            return context.success()
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app
+
+
+def test_async_handler_awaits_concurrently():
+    client = _create_app().test_client()
+
+    start = time.perf_counter()
+    resp = client.get(f"/fan-out?n={N}", headers={"token": "123"})
+    elapsed = time.perf_counter() - start
+
+    assert json.loads(resp.data)["results"] == list(range(N))
+    # N 次模拟 I/O 并发等待，耗时接近一次而不是 N 次
+    assert elapsed < IO_WAIT * N / 2
+
+
+def test_async_aware_decorators():
+    client = _create_app().test_client()
+
+    assert json.loads(client.get("/fan-out?n=1").data)["status_code"] == 401
+    assert json.loads(client.get("/async-auth").data)["status_code"] == 401
+
+    resp = client.get("/async-auth", headers={"token": "123"})
+    assert json.loads(resp.data)["success"] is True
+    assert resp.headers["Access-Control-Allow-Origin"] == "*"
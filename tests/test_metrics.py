@@ -0,0 +1,109 @@
+import threading
+from time import perf_counter
+
+from cibo import BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.metrics import Metrics, _Request
+
+
+def _create_app(**kwargs):
+    api = Blueprint("metrics_api", __name__)
+
+    @api.get("/echo")
+    class EchoHandler(Handler):
+        cors_config = {"Access-Control-Allow-Origin": "*"}
+
+        class Query(BaseApiQuery):
+            a: int
+
+        def handle(self, context: SimpleContext, query: Query):
+            if query.a < 0:
+                return context.error("negative", 400)
+            return context.success(a=query.a)
+
+    app = Flask(__name__, title="", version="0.1.0", **kwargs)
+    app.register_blueprint(api)
+    return app
+
+
+def test_metrics_endpoint():
+    app = _create_app(metrics_path="/metrics")
+    client = app.test_client()
+    client.get("/echo?a=1")
+    client.get("/echo?a=-1")
+
+    resp = client.get("/metrics")
+    assert resp.mimetype == "text/plain"
+    text = resp.data.decode()
+    for phase in ("bind", "handle", "serialize", "cors", "decorators", "total"):
+        assert (
+            f'cibo_phase_duration_seconds_count{{endpoint="metrics_api.EchoHandler",phase="{phase}"}} 2'
+            in text
+        )
+    assert 'cibo_responses_total{endpoint="metrics_api.EchoHandler",status="200"} 2' in text
+    assert 'cibo_envelope_errors_total{endpoint="metrics_api.EchoHandler"} 1' in text
+    assert 'cibo_requests_in_flight{endpoint="metrics_api.EchoHandler"} 0' in text
+
+
+def test_metrics_disabled():
+    app = _create_app()
+    assert app.metrics is None
+    assert app.test_client().get("/echo?a=1").status_code == 200
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_metrics_shards_are_merged():
+    metrics = Metrics(buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(100):
+            metrics.observe("e", "total", 0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert metrics.collect().histograms[("e", "total")] == [0, 400, 0, 200.0]
+    assert 'cibo_phase_duration_seconds_bucket{endpoint="e",phase="total",le="+Inf"} 400' in (
+        metrics.render()
+    )
+
+
+def test_metrics_shards_of_finished_threads_are_retired():
+    metrics = Metrics(buckets=(0.1, 1.0))
+
+    def work():
+        metrics.observe("e", "total", 0.5)
+        metrics.count_status("e", 200, False)
+
+    for _ in range(50):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    assert len(metrics._shards) <= 1
+    merged = metrics.collect()
+    assert merged.histograms[("e", "total")] == [0, 50, 0, 25.0]
+    assert merged.statuses[("e", 200)] == 50
+
+    metrics.reset()
+    assert metrics.collect().histograms == {}
+
+
+def test_metrics_internal_blueprints_have_no_tags():
+    app = _create_app(metrics_path="/metrics")
+    tags = [tag["name"] for tag in app._make_tags()]
+    assert tags == ["metrics_api"]
+
+
+def test_metrics_serialize_outside_handle_not_in_decorators():
+    app = _create_app()
+    metrics = Metrics(buckets=(0.1, 1.0))
+    with app.test_request_context("/echo"):
+        req = _Request(metrics)
+        # 例如鉴权装饰器中 context.error 的序列化，不在 handle 之内
+        req.times["serialize"] = 0.2
+        req.start = perf_counter() - 0.25
+        req.finish(None)
+    histograms = metrics.collect().histograms
+    assert histograms[("metrics_api.EchoHandler", "serialize")][:3] == [0, 1, 0]
+    assert histograms[("metrics_api.EchoHandler", "decorators")][:3] == [1, 0, 0]
@@ -0,0 +1,101 @@
+import json
+from io import BytesIO
+from typing import List
+
+import pytest
+from pydantic import Field
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from cibo import BaseApiBody, Blueprint, Flask, Handler, SimpleContext, UploadFile
+from cibo.multipart import parse_multipart
+
+
+def _create_app():
+    api = Blueprint("upload_api", __name__)
+
+    @api.post("/upload")
+    class UploadHandler(Handler):
+        class Body(BaseApiBody):
+            """upload files"""
+
+            title: str
+            tags: List[str] = []
+            avatar: UploadFile = Field(max_bytes=8)
+            attachments: List[UploadFile] = []
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(
+                title=body.title,
+                tags=body.tags,
+                avatar=body.avatar.read().decode(),
+                attachments=[f.filename for f in body.attachments],
+            )
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app
+
+
+def test_multipart_body_binding():
+    pytest.importorskip("werkzeug.sansio.multipart")
+    app = _create_app()
+    resp = app.test_client().post(
+        "/upload",
+        data={
+            "title": "hi",
+            "tags": '["a", "b"]',
+            "avatar": (BytesIO(b"avatar"), "a.png"),
+            "attachments": [(BytesIO(b"1"), "1.txt"), (BytesIO(b"2"), "2.txt")],
+            "unknown": (BytesIO(b"x" * 1024), "x.bin"),
+        },
+    )
+    assert resp.status_code == 200
+    data = json.loads(resp.data)
+    assert data["title"] == "hi"
+    assert data["tags"] == ["a", "b"]
+    assert data["avatar"] == "avatar"
+    assert data["attachments"] == ["1.txt", "2.txt"]
+
+
+def test_multipart_field_limit():
+    pytest.importorskip("werkzeug.sansio.multipart")
+    app = _create_app()
+    resp = app.test_client().post(
+        "/upload", data={"title": "hi", "avatar": (BytesIO(b"x" * 9), "a.png")}
+    )
+    data = json.loads(resp.data)
+    assert data["success"] is False and data["status_code"] == 413
+
+
+def test_multipart_max_parts():
+    pytest.importorskip("werkzeug.sansio.multipart")
+    body = b"".join(
+        b'--x\r\nContent-Disposition: form-data; name="f%d"\r\n\r\nv\r\n' % i for i in range(4)
+    )
+    with pytest.raises(RequestEntityTooLarge):
+        parse_multipart(BytesIO(body + b"--x--\r\n"), b"x", {}, max_parts=3)
+    form, _ = parse_multipart(BytesIO(body + b"--x--\r\n"), b"x", {"f0": 10}, max_parts=4)
+    assert form.to_dict() == {"f0": "v"}
+
+
+def test_multipart_rejects_large_body_before_reading():
+    class Stream(BytesIO):
+        def read(self, *args):
+            raise AssertionError("body should not be read")
+
+    with pytest.raises(RequestEntityTooLarge):
+        parse_multipart(Stream(), b"x", {}, max_size=10, content_length=11)
+
+
+def test_multipart_request_body_schema():
+    app = _create_app()
+    spec = app._get_spec("json")
+    request_body = spec["components"]["requestBodies"]["UploadHandler$Body"]
+    schema = request_body["content"]["multipart/form-data"]["schema"]
+    assert schema["properties"]["avatar"] == {
+        "title": "Avatar",
+        "max_bytes": 8,
+        "type": "string",
+        "format": "binary",
+    }
+    assert schema["properties"]["attachments"]["items"] == {"type": "string", "format": "binary"}
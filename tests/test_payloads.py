@@ -0,0 +1,155 @@
+import enum
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, conlist
+from typing_extensions import Literal
+
+from cibo import (
+    BaseApiBody,
+    BaseApiPath,
+    BaseApiQuery,
+    Blueprint,
+    Flask,
+    Handler,
+    SimpleContext,
+    UploadFile,
+)
+from cibo.payloads import PayloadGenerator, encode_query
+from demo import create_app
+from demo.handlers.echo_handler import EchoHandler
+from demo.handlers.user_handler import GetCallBackHandler, UnionHandler, UserHandler
+
+
+class Color(enum.Enum):
+    red = "red"
+    blue = "blue"
+
+
+class Point(BaseModel):
+    x: float = Field(ge=-1.5, le=1.5)
+    y: int = Field(gt=0, lt=3)
+
+
+class Shape(BaseModel):
+    kind: Literal["line", "polygon"]
+    color: Color
+    points: conlist(Point, min_items=2, max_items=4)  # type: ignore
+    label: Optional[str] = Field(None, min_length=2, max_length=4)
+    children: List["Shape"] = []
+
+
+Shape.update_forward_refs()
+
+
+def test_generate_is_deterministic():
+    a = list(PayloadGenerator(seed=7).iter_payloads(UserHandler.Body, 20))
+    b = list(PayloadGenerator(seed=7).iter_payloads(UserHandler.Body, 20))
+    c = list(PayloadGenerator(seed=8).iter_payloads(UserHandler.Body, 20))
+    assert a == b
+    assert a != c
+
+
+def test_generated_payloads_are_valid():
+    create_app()
+    gen = PayloadGenerator(seed=1)
+    for model in (
+        EchoHandler.Query,
+        EchoHandler.Body,
+        UserHandler.Body,
+        GetCallBackHandler.Path,
+        Shape,
+    ):
+        for payload in gen.iter_payloads(model, 200):
+            assert gen.is_valid(model, payload), (model, payload)
+
+
+def test_constraints_and_union():
+    gen = PayloadGenerator(seed=2, max_items=50, max_depth=3)
+    shapes = list(gen.iter_payloads(Shape, 100))
+    for shape in shapes:
+        assert 2 <= len(shape["points"]) <= 4
+        assert all(-1.5 <= p["x"] <= 1.5 and 0 < p["y"] < 3 for p in shape["points"])
+        assert shape.get("label") is None or 2 <= len(shape["label"]) <= 4
+    assert {s["kind"] for s in shapes} == {"line", "polygon"}
+    assert {s["color"] for s in shapes} == {"red", "blue"}
+    assert any(s.get("children") for s in shapes)
+
+    members = {tuple(sorted(p["data"])) for p in gen.iter_payloads(UnionHandler.Body, 50)}
+    assert members == {("name", "passwd"), ("age", "owner")}
+
+
+def test_edge_cases():
+    gen = PayloadGenerator(seed=3)
+    cases = {(c.loc, c.kind): c for c in gen.edge_cases(Shape)}
+    assert not cases[(("kind",), "missing")].valid
+    assert not cases[(("kind",), "not_allowed")].valid
+    assert cases[(("label",), "max_length")].valid
+    assert not cases[(("label",), "max_length+1")].valid
+    assert not cases[(("label",), "min_length-1")].valid
+    assert cases[(("points",), "max_items")].valid
+    assert not cases[(("points",), "max_items+1")].valid
+    assert not cases[(("points",), "min_items-1")].valid
+    assert cases[(("points", 0, "y"), "gt+step")].valid
+    assert not cases[(("points", 0, "y"), "gt")].valid
+    assert cases[(("points", 0, "x"), "le")].valid
+    assert not cases[(("points", 0, "x"), "le+step")].valid
+    for case in cases.values():
+        assert case.valid == gen.is_valid(Shape, case.payload)
+
+    echo = {(c.loc, c.kind): c for c in gen.edge_cases(EchoHandler.Query)}
+    assert echo[(("a",), "max_length")].valid
+    assert not echo[(("a",), "max_length+1")].valid
+
+    user = {(c.loc, c.kind) for c in gen.edge_cases(UserHandler.Body)}
+    assert (("teacher", "name"), "wrong_type") in user
+
+
+def test_encode_query():
+    assert encode_query(
+        {"a": "x", "b": [1, 2], "c": {"k": 1}, "d": None, "e": True, "f": [[1]]}
+    ) == [
+        ("a", "x"),
+        ("b", "1"),
+        ("b", "2"),
+        ("c[k]", "1"),
+        ("e", "true"),
+        ("f", "[[1]]"),
+    ]
+
+
+def test_request():
+    app = create_app()
+    client = app.test_client()
+    gen = PayloadGenerator(seed=4)
+    for handler in (EchoHandler, UserHandler, UnionHandler, GetCallBackHandler):
+        for _ in range(20):
+            resp = client.open(headers={"token": "123"}, **gen.request(app, handler))
+            assert resp.json["success"], resp.json
+
+
+def test_request_multipart():
+    api = Blueprint("payload_upload_api", __name__)
+
+    @api.post("/upload/<int:id>")
+    class UploadHandler(Handler):
+        class Path(BaseApiPath):
+            id: int
+
+        class Query(BaseApiQuery):
+            tags: List[str]
+
+        class Body(BaseApiBody):
+            file: UploadFile
+            meta: Dict[str, int]
+            note: Union[int, str]
+
+        def handle(self, context: SimpleContext, path: Path, query: Query, body: Body):
+            return context.success(size=len(body.file.read()), tags=query.tags)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    request = PayloadGenerator(seed=5).request(app, UploadHandler)
+    assert request["content_type"] == "multipart/form-data"
+    resp = app.test_client().open(**request)
+    assert resp.json["success"], resp.json
+    assert resp.json["size"] > 0
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from cibo import BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+
+
+def _create_app(**kwargs):
+    api = Blueprint("profile_api", __name__)
+
+    @api.get("/slow")
+    class SlowHandler(Handler):
+        class Query(BaseApiQuery):
+            n: int = 1000
+
+        def handle(self, context: SimpleContext, query: Query):
+            return context.success(total=sum(range(query.n)))
+
+    @api.get("/sampled")
+    class SampledHandler(Handler):
+        profile_sample_rate = 1.0
+
+        def handle(self, context: SimpleContext):
+            return context.success()
+
+    app = Flask(__name__, title="", version="0.1.0", **kwargs)
+    app.register_blueprint(api)
+    return app
+
+
+def test_profile_signed_header():
+    app = _create_app(profile_path="/_profiles", profile_secret="s3cret")
+    client = app.test_client()
+    profiler = app.profiler
+
+    client.get("/slow", headers={"X-Cibo-Profile": "1.bad"})
+    client.get("/slow", headers={"X-Cibo-Profile": profiler.sign("GET", "/slow")})
+    assert client.get("/_profiles").status_code == 403
+
+    headers = {"X-Cibo-Profile": profiler.sign("GET", "/_profiles")}
+    records = json.loads(client.get("/_profiles", headers=headers).data)
+    assert len(records["profile_api.SlowHandler"]) == 1
+    assert "bind" in records["profile_api.SlowHandler"][0]["phases"]
+
+    path = "/_profiles/profile_api.SlowHandler/-1"
+    resp = client.get(path, headers={"X-Cibo-Profile": profiler.sign("GET", path)})
+    assert b"function calls" in resp.data
+    resp = client.get(path + "?phase=bind", headers={"X-Cibo-Profile": profiler.sign("GET", path)})
+    assert b"binder.py" in resp.data
+    resp = client.get(path + "?sort=bogus", headers={"X-Cibo-Profile": profiler.sign("GET", path)})
+    assert resp.status_code == 400 and b"cumulative" in resp.data
+
+
+def test_profile_sampling_and_ring():
+    app = _create_app(profile_path="/_profiles", profile_secret="s3cret", profile_ring_size=2)
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/sampled")
+    client.get("/slow")
+
+    def signed_get(path, **kwargs):
+        headers = {"X-Cibo-Profile": app.profiler.sign("GET", path)}
+        return client.get(path, headers=headers, **kwargs)
+
+    records = json.loads(signed_get("/_profiles").data)
+    assert len(records["profile_api.SampledHandler"]) == 2
+    assert "profile_api.SlowHandler" not in records
+    resp = signed_get("/_profiles/profile_api.SampledHandler/0", query_string={"format": "prof"})
+    assert resp.mimetype == "application/octet-stream"
+
+
+def test_profile_path_requires_secret():
+    with pytest.raises(ValueError):
+        _create_app(profile_path="/_profiles")
+
+
+def test_profile_disabled_has_no_hook():
+    app = Flask(__name__, title="", version="0.1.0")
+    assert app.profiler is None
+    assert "dispatch_request" not in vars(app)
+
+
+def test_profile_sampling_without_secret():
+    # 没有 profile_secret 时，注册了 profile_sample_rate 的 Handler 也会开启采样
+    app = _create_app()
+    app.test_client().get("/sampled")
+    assert app.profiler.secret is None
+    assert len(app.profiler.records()["profile_api.SampledHandler"]) == 1
@@ -0,0 +1,169 @@
+import gzip
+import json
+import os
+import threading
+
+from click.testing import CliRunner
+from werkzeug.serving import make_server
+
+from cibo import BaseApiBody, BaseApiQuery, Blueprint, Flask, Handler, SimpleContext
+from cibo.capture import REDACTED, capture_log_paths, read_capture_log
+from cibo.cli import main
+from cibo.replay import HttpTarget, InProcessTarget, percentile, replay
+
+
+def create_app(**kwargs):
+    api = Blueprint("replay_api", __name__)
+
+    @api.get("/items")
+    class ItemsHandler(Handler):
+        class Query(BaseApiQuery):
+            n: int
+
+        def handle(self, context: SimpleContext, query: Query):
+            if query.n < 0:
+                return context.error("n must be positive", 400)
+            return context.success(items=list(range(query.n)))
+
+    @api.post("/items")
+    class CreateItemHandler(Handler):
+        class Body(BaseApiBody):
+            name: str
+
+        def handle(self, context: SimpleContext, body: Body):
+            from flask import request
+
+            if request.headers.get("Authorization") != "Bearer ok":
+                return context.error("unauthorized", 401)
+            return context.success(name=body.name)
+
+    app = Flask(__name__, title="", version="0.1.0", **kwargs)
+    app.register_blueprint(api, url_prefix="/api")
+    return app
+
+
+def _capture(path, **kwargs):
+    app = create_app(capture_log=str(path), **kwargs)
+    client = app.test_client()
+    assert client.get("/api/items?n=3&access_token=s3cret").json["items"] == [0, 1, 2]
+    assert client.get("/api/items?n=-1").json["status_code"] == 400
+    resp = client.post("/api/items", json={"name": "a"}, headers={"Authorization": "Bearer ok"})
+    assert resp.json["name"] == "a"
+    app.capture.close()
+    return app
+
+
+def test_capture(tmp_path):
+    path = tmp_path / "capture.ndjson.gz"
+    _capture(path, capture_max_body_size=100)
+    records = list(read_capture_log(str(path)))
+    assert [r["endpoint"] for r in records] == [
+        "replay_api.ItemsHandler",
+        "replay_api.ItemsHandler",
+        "replay_api.CreateItemHandler",
+    ]
+    assert records[0]["query"] == "n=3&access_token=%5Bredacted%5D"
+    assert records[1]["query"] == "n=-1"
+    assert records[2]["body"] == '{"name": "a"}'
+    assert records[2]["headers"]["Authorization"] == REDACTED
+    assert records[2]["headers"]["Content-Type"] == "application/json"
+
+    # 超过大小的请求体不记录，请求本身不受影响
+    app = create_app(capture_log=str(path), capture_max_body_size=10)
+    resp = app.test_client().post(
+        "/api/items", json={"name": "a" * 20}, headers={"Authorization": "Bearer ok"}
+    )
+    assert resp.json["name"] == "a" * 20
+    app.capture.close()
+    record = list(read_capture_log(str(path)))[-1]
+    assert "body" not in record and record["body_omitted"] > 10
+
+    # 每个进程一个文件，追加的 gzip member 和被截断的末尾
+    log_path = tmp_path / f"capture.ndjson.gz.{os.getpid()}"
+    assert capture_log_paths(str(path)) == [str(log_path)]
+    data = log_path.read_bytes()
+    log_path.write_bytes(data + gzip.compress(b'{"method":"GET","path":"/x"}\n')[:-12])
+    assert len(list(read_capture_log(str(path)))) == 4
+    # 其它 worker 的日志
+    other_path = tmp_path / "capture.ndjson.gz.1"
+    other_path.write_bytes(gzip.compress(b'{"method":"GET","path":"/y"}\n'))
+    assert len(list(read_capture_log(str(path)))) == 5
+    assert len(list(read_capture_log(str(tmp_path / "*.gz.1")))) == 1
+    assert len(list(read_capture_log(str(log_path)))) == 4
+
+
+def test_capture_sampling(tmp_path):
+    path = tmp_path / "capture.ndjson.gz"
+    app = create_app(capture_log=str(path), capture_sample_rate=0)
+    app.test_client().get("/api/items?n=1")
+    app.capture.close()
+    assert capture_log_paths(str(path)) == []
+
+
+def test_replay_in_process(tmp_path):
+    path = tmp_path / "capture.ndjson.gz"
+    _capture(path)
+    records = list(read_capture_log(str(path))) * 5
+
+    report = replay(records, InProcessTarget(create_app()), concurrency=4)
+    assert report["requests"] == 15
+    items = report["endpoints"]["replay_api.ItemsHandler"]
+    assert items["count"] == 10
+    assert items["envelope_errors"] == 5
+    assert items["p50_ms"] <= items["p95_ms"] <= items["p99_ms"]
+    # 脱敏的认证头没有发送
+    assert report["endpoints"]["replay_api.CreateItemHandler"]["envelope_errors"] == 5
+
+    report = replay(
+        records, InProcessTarget(create_app()), headers={"Authorization": "Bearer ok"}, limit=3
+    )
+    assert report["requests"] == 3
+    assert report["endpoints"]["replay_api.CreateItemHandler"]["envelope_errors"] == 0
+
+
+def test_replay_over_socket(tmp_path):
+    path = tmp_path / "capture.ndjson.gz"
+    _capture(path)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        target = HttpTarget(f"http://127.0.0.1:{server.server_port}")
+        report = replay(read_capture_log(str(path)), target, concurrency=2, rate=200)
+    finally:
+        server.shutdown()
+    assert report["requests"] == 3
+    assert report["endpoints"]["replay_api.ItemsHandler"]["statuses"] == {"200": 2}
+    assert report["endpoints"]["replay_api.ItemsHandler"]["envelope_errors"] == 1
+
+
+def test_replay_cli(tmp_path):
+    path = tmp_path / "capture.ndjson.gz"
+    _capture(path)
+    result = CliRunner().invoke(
+        main,
+        [
+            "replay",
+            str(path),
+            "tests.test_replay:create_app",
+            "-c",
+            "2",
+            "-H",
+            "Authorization: Bearer ok",
+            "--json",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    assert report["endpoints"]["replay_api.CreateItemHandler"]["envelope_errors"] == 0
+
+    result = CliRunner().invoke(main, ["replay", str(path)])
+    assert result.exit_code != 0
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([1.0], 95) == 1.0
+    assert percentile([], 50) == 0.0
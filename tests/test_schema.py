@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from pydantic import BaseModel
+
+from cibo import BaseApiBody, BaseApiSuccessResp, Blueprint, Flask, Handler, SimpleContext
+from demo import create_app
+
+
+def _create_app(name: str):
+    api = Blueprint(name, __name__)
+
+    @api.post(f"/{name}")
+    class NamedHandler(Handler):
+        class Body(BaseApiBody):
+            class Inner(BaseModel):
+                id: int
+
+            inner: Inner
+
+        class Resp(BaseApiSuccessResp):
+            id: int
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success(id=body.inner.id)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    return app
+
+
+def test_schema_registry_is_per_app():
+    app_a = _create_app("a")
+    app_b = _create_app("b")
+
+    components_a = app_a._make_components()
+    components_b = app_b._make_components()
+    assert set(components_a["requestBodies"]) == {"NamedHandler$Body"}
+    assert set(components_a["schemas"]) == {"NamedHandler$Body$Inner"}
+    assert set(components_b["responses"]) == {"NamedHandler$Resp"}
+    assert app_a.schema_registry is not app_b.schema_registry
+    assert "/a" in app_a._make_paths() and "/a" not in app_b._make_paths()
+
+
+def test_schema_registry_memoizes_translation():
+    app = create_app()
+    registry = app.schema_registry
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: registry.make_components(), range(16)))
+    assert all(result == results[0] for result in results)
+
+    translated = dict(registry._translated)
+    app._get_spec(force_update=True)
+    assert registry._translated == translated
+
+
+def test_dedupe_schemas():
+    api = Blueprint("dedupe", __name__)
+
+    class Teacher(BaseModel):
+        id: int
+        name: str
+
+    def _make_handler(name: str):
+        class Body(BaseApiBody):
+            class Teacher(BaseModel):
+                id: int
+                name: str
+
+            class Class(BaseModel):
+                teacher: "Teacher"
+
+            teacher: Teacher
+            classes: List[Class]
+
+        Body.Class.update_forward_refs(Teacher=Body.Teacher)
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success()
+
+        return api.post(f"/{name}")(type(name, (Handler,), {"Body": Body, "handle": handle}))
+
+    _make_handler("A")
+    _make_handler("B")
+
+    class CHandler(Handler):
+        class Body(BaseApiBody):
+            teacher: Teacher
+
+        def handle(self, context: SimpleContext, body: Body):
+            return context.success()
+
+    api.post("/C")(CHandler)
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    plain = app._make_components()
+    assert len(plain["schemas"]) == 5
+
+    app.dedupe_schemas = True
+    components = app._make_components()
+    assert set(components["schemas"]) == {"Teacher", "A$Body$Class"}
+    assert app.spec_dedupe_stats["merged"] == 3
+    assert app.spec_dedupe_stats["bytes_saved"] > 0
+    properties = components["requestBodies"]["B$Body"]["content"]["application/json"]["schema"]
+    assert properties["properties"]["teacher"]["$ref"] == "#/components/schemas/Teacher"
+    assert (
+        properties["properties"]["classes"]["items"]["$ref"] == "#/components/schemas/A$Body$Class"
+    )
+    assert app.schema_registry.make_components() == plain
+
+
+def test_openapi_fragments_are_lazy():
+    app = _create_app("lazy")
+    handler = app.view_functions["lazy.NamedHandler"].view_class
+    assert "_cibo_openapi_fragments" not in vars(handler)
+
+    paths = app._make_paths()
+    assert paths["/lazy"]["post"]["requestBody"] == {
+        "$ref": "#/components/requestBodies/NamedHandler$Body"
+    }
+    assert paths["/lazy"]["post"]["responses"] == {
+        "200": {"$ref": "#/components/responses/NamedHandler$Resp"}
+    }
+    assert "_cibo_openapi_fragments" in vars(handler)
+    # 每个类只读取自己的缓存，基类的空片段不会被子类继承
+    assert Handler.parameters == []
+    assert _create_app("lazy2")._make_paths()["/lazy2"]["post"]["responses"]
+
+
+def test_issubclass_does_not_walk_handler_models():
+    from cibo.args import BaseApiArgs
+
+    models = [
+        type(f"Model{i}", (BaseApiBody,), {"__annotations__": {"a": int}}) for i in range(200)
+    ]
+    constrained = type("Constrained", (int,), {})
+    assert not issubclass(constrained, BaseModel)
+    assert not issubclass(constrained, BaseApiArgs)
+    assert issubclass(models[-1], BaseModel) and issubclass(models[-1], BaseApiArgs)
+    assert not issubclass(BaseApiSuccessResp, BaseApiBody)
+
+
+def test_import_is_lazy():
+    import subprocess
+    import sys
+
+    code = "import sys, cibo; print(sorted(m for m in ('apispec', 'cibo.ui_templates', 'cibo.profiler', 'cibo.capture') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE).stdout
+    assert output.strip() == b"[]"
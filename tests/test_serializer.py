@@ -0,0 +1,120 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import pytest
+from pydantic import BaseModel, Field, ValidationError
+
+from cibo import BaseApiSuccessResp, Blueprint, Flask, Handler, SimpleContext
+from cibo.serializer import RespPlan
+
+
+class Teacher(BaseModel):
+    id: int
+    name: str
+
+
+class Resp(BaseApiSuccessResp):
+    teacher: Teacher
+    teachers: List[Dict[str, Teacher]]
+    ids: Set[int]
+    at: datetime
+    note: Optional[Teacher]
+
+
+def test_resp_plan_compiles_fields():
+    plan = RespPlan(Resp)
+    assert [name for name, _, _ in plan.fields] == ["teacher", "teachers", "ids", "at", "note"]
+
+
+def test_fast_resp_handler():
+    api = Blueprint("serializer_api", __name__)
+
+    @api.get("/teacher")
+    class TeacherHandler(Handler):
+        fast_resp = True
+        Resp = Resp
+
+        def handle(self, context: SimpleContext):
+            teacher = Teacher(id=1, name="a")
+            return context.success(
+                teacher=teacher,
+                teachers=[{"a": teacher}],
+                ids={1},
+                at=datetime(2021, 1, 2, 3, 4, 5),
+                note=None,
+            )
+
+    @api.get("/trusted")
+    class TrustedHandler(Handler):
+        fast_resp = True
+        validate_resp = False
+        Resp = Resp
+
+        def handle(self, context: SimpleContext):
+            return context.success(teacher={"id": 1, "name": "a", "extra": 1}, other=1)
+
+    @api.get("/invalid")
+    class InvalidHandler(Handler):
+        fast_resp = True
+        validate_resp = True
+        Resp = Resp
+
+        def handle(self, context: SimpleContext):
+            return context.success(teacher={"id": "x"})
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.testing = True
+    app.register_blueprint(api)
+    client = app.test_client()
+
+    assert json.loads(client.get("/teacher").data) == {
+        "status_code": 200,
+        "status_message": "ok",
+        "success": True,
+        "teacher": {"id": 1, "name": "a"},
+        "teachers": [{"a": {"id": 1, "name": "a"}}],
+        "ids": [1],
+        "at": "2021-01-02 03:04:05",
+        "note": None,
+    }
+    assert json.loads(client.get("/trusted").data) == {
+        "status_code": 200,
+        "status_message": "ok",
+        "success": True,
+        "teacher": {"id": 1, "name": "a"},
+        "other": 1,
+    }
+    with pytest.raises(ValidationError):
+        client.get("/invalid")
+
+
+class Member(BaseModel):
+    user_id: int = Field(alias="userId")
+
+
+class AliasResp(BaseApiSuccessResp):
+    member: Member
+    nick_name: str = Field(alias="nickName")
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_resp_plan_outputs_aliases(validate):
+    api = Blueprint(f"alias_api_{validate}", __name__)
+
+    @api.get("/member")
+    class MemberHandler(Handler):
+        fast_resp = True
+        validate_resp = validate
+        Resp = AliasResp
+
+        def handle(self, context: SimpleContext):
+            return context.success(member=Member(userId=1), nickName="a")
+
+    app = Flask(__name__, title="", version="0.1.0")
+    app.register_blueprint(api)
+    data = json.loads(app.test_client().get("/member").data)
+    # 与 `dict(by_alias=True)` 一致
+    assert data["member"] == Member(userId=1).dict(by_alias=True) == {"userId": 1}
+    assert data["nickName"] == "a"
+    assert set(data) == {"success", "status_code", "status_message", "member", "nickName"}
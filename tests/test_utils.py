@@ -0,0 +1,74 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from pydantic import BaseModel
+
+from cibo import Flask
+from cibo.utils import MAX_SAFE_INTEGER, JSONTypeRegistry, jsonify_with_encoder
+
+
+class Point:
+    def __init__(self, x: int, y: int) -> None:
+        self.x = x
+        self.y = y
+
+
+@dataclass
+class Pair:
+    a: int
+    b: int
+
+
+class Item(BaseModel):
+    id: int
+    price: Decimal
+
+
+def test_json_types_resolve_is_cached_per_type():
+    registry = JSONTypeRegistry()
+    assert registry.resolve(UUID) is str
+    assert registry.resolve(Item) is registry.resolve(Item)
+    assert registry.resolve(Point) is None
+
+    registry.register(Point, lambda p: [p.x, p.y])
+    assert registry.resolve(Point)(Point(1, 2)) == [1, 2]
+
+
+def test_jsonify_with_encoder_uses_app_json_types():
+    app = Flask(__name__, title="", version="0.1.0", big_int_policy="string")
+
+    @app.json_types.register(Point)
+    def _encode_point(p: Point):
+        return {"x": p.x, "y": p.y}
+
+    with app.app_context():
+        resp = jsonify_with_encoder(
+            point=Point(1, 2),
+            pair=Pair(1, 2),
+            items=[Item(id=1, price=Decimal("1.5"))],
+            uuid=UUID(int=1),
+            at=datetime(2021, 1, 2, 3, 4, 5),
+            big=MAX_SAFE_INTEGER + 1,
+            small=[0, -1, -MAX_SAFE_INTEGER - 1],
+        )
+
+    assert resp.mimetype == "application/json"
+    assert json.loads(resp.data) == {
+        "point": {"x": 1, "y": 2},
+        "pair": {"a": 1, "b": 2},
+        "items": [{"id": 1, "price": 1.5}],
+        "uuid": "00000000-0000-0000-0000-000000000001",
+        "at": "2021-01-02 03:04:05",
+        "big": str(MAX_SAFE_INTEGER + 1),
+        "small": [0, -1, str(-MAX_SAFE_INTEGER - 1)],
+    }
+
+
+def test_json_types_big_int_policy_validation():
+    assert JSONTypeRegistry().stringify_big_ints(MAX_SAFE_INTEGER * 2) == MAX_SAFE_INTEGER * 2
+    with pytest.raises(ValueError):
+        JSONTypeRegistry(big_int_policy="float")